@@ -16,6 +16,7 @@ import pytz
 import streamlit as st
 from google.oauth2 import service_account
 import gspread
+from gspread.utils import rowcol_to_a1
 from reportlab.lib.pagesizes import A4
 from reportlab.pdfgen import canvas
 from streamlit_lottie import st_lottie
@@ -31,13 +32,19 @@ from config.settings import (
     COLUMNAS_CLIENTES,
     COLUMNAS_USUARIOS,
     WORKSHEET_NOTIFICACIONES,
+    WORKSHEET_NOTIFICACIONES_LEIDAS,
     NOTIFICATION_TYPES,
     COLUMNAS_NOTIFICACIONES,
+    COLUMNAS_NOTIFICACIONES_LEIDAS,
     SECTORES_DISPONIBLES,
     TIPOS_RECLAMO,
     TECNICOS_DISPONIBLES,
     MATERIALES_POR_RECLAMO,
     ROUTER_POR_SECTOR,
+    COLUMNA_ID_RECLAMO,
+    COLUMNA_ID_CLIENTE,
+    ARCHIVE_INTERVAL,
+    DATA_STALE_AFTER,
     DEBUG_MODE
 )
 
@@ -58,9 +65,10 @@ from components.ui import breadcrumb, metric_card, card, badge, loading_indicato
 from utils.helpers import show_warning, show_error, show_success, show_info, format_phone_number, format_dni, get_current_datetime, format_datetime, truncate_text, is_valid_email, safe_float_conversion, safe_int_conversion, get_status_badge, format_currency, get_breadcrumb_icon
 
 # Utils
-from utils.styles import get_main_styles_v2, get_loading_spinner, loading_indicator
-from utils.data_manager import safe_get_sheet_data, safe_normalize, update_sheet_data, batch_update_sheet
+from utils.styles import get_main_styles_v2, loading_indicator
+from utils.data_manager import load_bootstrap_data, get_background_refresher, get_or_create_worksheet, get_data_timestamp, get_data_versions, invalidate, column_letter, safe_normalize, update_sheet_data, batch_update_sheet
 from utils.api_manager import api_manager, init_api_session_state
+from utils.claim_archive import archive_resolved_claims, count_archived_claims
 from utils.pdf_utils import agregar_pie_pdf
 from utils.date_utils import parse_fecha, es_fecha_valida, format_fecha, ahora_argentina
 from utils.permissions import has_permission
@@ -134,10 +142,13 @@ def persist_modo_oscuro(new_value: bool):
             if col_idx is None:
                 return False
             try:
-                def _op(ws):
-                    ws.update_cell(idx + 2, col_idx + 1, "TRUE" if new_value else "FALSE")
-                api_manager.safe_sheet_operation(sheet_usuarios, _op)
-                return True
+                success, error = batch_update_sheet(
+                    sheet_usuarios,
+                    [{"range": rowcol_to_a1(idx + 2, col_idx + 1), "values": [["TRUE" if new_value else "FALSE"]]}]
+                )
+                if not success:
+                    logging.error("Error persistiendo modo oscuro: %s", error)
+                return success
             except Exception as e:
                 logging.exception("Error persistiendo modo oscuro")
     return False
@@ -187,15 +198,16 @@ def migrar_uuids_existentes(sheet_reclamos, sheet_clientes):
         if not reclamos_sin_uuid.empty:
             with st.status("Generando UUIDs para reclamos...", expanded=True) as status:
                 st.write(f"📋 {len(reclamos_sin_uuid)} reclamos sin UUID encontrados")
+                col_id = column_letter(WORKSHEET_RECLAMOS, COLUMNA_ID_RECLAMO)
                 
                 for _, row in reclamos_sin_uuid.iterrows():
                     nuevo_uuid = generar_id_unico()
                     updates_reclamos.append({
-                        "range": f"P{row.name + 2}",  # Usando row.name para precisión
+                        "range": f"{col_id}{row.name + 2}",  # Sin ID todavía: se usa la posición en el snapshot
                         "values": [[nuevo_uuid]]
                     })
                 
-                batch_size = 50
+                batch_size = 500  # Las celdas contiguas viajan como un solo rango
                 total_batches = (len(updates_reclamos) // batch_size) + 1
                 
                 for i in range(0, len(updates_reclamos), batch_size):
@@ -203,12 +215,7 @@ def migrar_uuids_existentes(sheet_reclamos, sheet_clientes):
                     progress = min((i + batch_size) / len(updates_reclamos), 1.0)
                     status.update(label=f"Actualizando reclamos... {progress:.0%}", state="running")
                     
-                    success, error = api_manager.safe_sheet_operation(
-                        batch_update_sheet,
-                        sheet_reclamos,
-                        batch,
-                        is_batch=True
-                    )
+                    success, error = batch_update_sheet(sheet_reclamos, batch)
                     if not success:
                         st.error(f"Error al actualizar lote de reclamos: {error}")
                         return False
@@ -228,15 +235,16 @@ def migrar_uuids_existentes(sheet_reclamos, sheet_clientes):
         if not clientes_sin_uuid.empty:
             with st.status("Generando UUIDs para clientes...", expanded=True) as status:
                 st.write(f"👥 {len(clientes_sin_uuid)} clientes sin UUID encontrados")
+                col_id = column_letter(WORKSHEET_CLIENTES, COLUMNA_ID_CLIENTE)
                 
                 for _, row in clientes_sin_uuid.iterrows():
                     nuevo_uuid = generar_id_unico()
                     updates_clientes.append({
-                        "range": f"G{row.name + 2}",  # Usando row.name para precisión
+                        "range": f"{col_id}{row.name + 2}",  # Sin ID todavía: se usa la posición en el snapshot
                         "values": [[nuevo_uuid]]
                     })
                 
-                batch_size = 50
+                batch_size = 500  # Las celdas contiguas viajan como un solo rango
                 total_batches = (len(updates_clientes) // batch_size) + 1
                 
                 for i in range(0, len(updates_clientes), batch_size):
@@ -244,12 +252,7 @@ def migrar_uuids_existentes(sheet_reclamos, sheet_clientes):
                     progress = min((i + batch_size) / len(updates_clientes), 1.0)
                     status.update(label=f"Actualizando clientes... {progress:.0%}", state="running")
                     
-                    success, error = api_manager.safe_sheet_operation(
-                        batch_update_sheet,
-                        sheet_clientes,
-                        batch,
-                        is_batch=True
-                    )
+                    success, error = batch_update_sheet(sheet_clientes, batch)
                     if not success:
                         st.error(f"Error al actualizar lote de clientes: {error}")
                         return False
@@ -261,8 +264,9 @@ def migrar_uuids_existentes(sheet_reclamos, sheet_clientes):
             return False
 
         # Actualizar los DataFrames en caché
-        st.session_state.df_reclamos = safe_get_sheet_data(sheet_reclamos, COLUMNAS_RECLAMOS)
-        st.session_state.df_clientes = safe_get_sheet_data(sheet_clientes, COLUMNAS_CLIENTES)
+        datos = load_bootstrap_data(sheet_reclamos.spreadsheet, force=True)
+        st.session_state.df_reclamos = datos.reclamos
+        st.session_state.df_clientes = datos.clientes
         
         return True
 
@@ -285,13 +289,13 @@ def init_google_sheets():
             scopes=["https://www.googleapis.com/auth/spreadsheets", "https://www.googleapis.com/auth/drive"]
         )
         client = gspread.authorize(creds)
-        sheet_notifications = client.open_by_key(SHEET_ID).worksheet(WORKSHEET_NOTIFICACIONES)
-        init_notification_manager(sheet_notifications)
+        spreadsheet = client.open_by_key(SHEET_ID)
         return (
-            client.open_by_key(SHEET_ID).worksheet(WORKSHEET_RECLAMOS),
-            client.open_by_key(SHEET_ID).worksheet(WORKSHEET_CLIENTES),
-            client.open_by_key(SHEET_ID).worksheet(WORKSHEET_USUARIOS),
-            sheet_notifications
+            spreadsheet.worksheet(WORKSHEET_RECLAMOS),
+            spreadsheet.worksheet(WORKSHEET_CLIENTES),
+            spreadsheet.worksheet(WORKSHEET_USUARIOS),
+            spreadsheet.worksheet(WORKSHEET_NOTIFICACIONES),
+            get_or_create_worksheet(spreadsheet, WORKSHEET_NOTIFICACIONES_LEIDAS, COLUMNAS_NOTIFICACIONES_LEIDAS)
         )
     try:
         return _connect()
@@ -299,20 +303,18 @@ def init_google_sheets():
         st.error(f"Error de conexión: {str(e)}")
         st.stop()
 
-def precache_all_data(sheet_reclamos, sheet_clientes, sheet_usuarios, sheet_notifications):
-    _ = safe_get_sheet_data(sheet_reclamos, COLUMNAS_RECLAMOS)
-    _ = safe_get_sheet_data(sheet_clientes, COLUMNAS_CLIENTES)
-    _ = safe_get_sheet_data(sheet_usuarios, COLUMNAS_USUARIOS)
-    _ = safe_get_sheet_data(sheet_notifications, COLUMNAS_NOTIFICACIONES)
-
-loading_placeholder = st.empty()
-loading_placeholder.markdown(get_loading_spinner(), unsafe_allow_html=True)
-try:
-    sheet_reclamos, sheet_clientes, sheet_usuarios, sheet_notifications = init_google_sheets()
-    if not all([sheet_reclamos, sheet_clientes, sheet_usuarios, sheet_notifications]):
-        st.stop()
-finally:
-    loading_placeholder.empty()
+sheet_reclamos, sheet_clientes, sheet_usuarios, sheet_notifications, sheet_lecturas = init_google_sheets()
+if not all([sheet_reclamos, sheet_clientes, sheet_usuarios, sheet_notifications, sheet_lecturas]):
+    st.stop()
+
+# Los datos se leen del caché compartido que actualiza el hilo en segundo plano:
+# el rerun no espera a la API (salvo la primera carga sin snapshot en disco)
+spreadsheet = sheet_reclamos.spreadsheet
+datos_hojas = load_bootstrap_data(spreadsheet)
+# Los resueltos viejos pasan al archivo en el mismo hilo, así la hoja de reclamos no crece sin límite
+get_background_refresher(spreadsheet).schedule(
+    "archivo_reclamos", ARCHIVE_INTERVAL, lambda: archive_resolved_claims(sheet_reclamos)[1]
+)
 
 if not check_authentication():
     render_login(sheet_usuarios)
@@ -322,12 +324,15 @@ if not check_authentication():
 user_info = st.session_state.auth.get('user_info', {})
 user_role = user_info.get('rol', '')
 
-precache_all_data(sheet_reclamos, sheet_clientes, sheet_usuarios, sheet_notifications)
+# Los DataFrames se comparten entre sesiones; cada sesión guarda solo la referencia y la versión
+st.session_state.versiones_hojas = get_data_versions()
+st.session_state.datos_al = get_data_timestamp()
+st.session_state.df_reclamos = datos_hojas.reclamos
+st.session_state.df_clientes = datos_hojas.clientes
+st.session_state.df_usuarios = datos_hojas.usuarios
 
-df_reclamos, df_clientes, df_usuarios = safe_get_sheet_data(sheet_reclamos, COLUMNAS_RECLAMOS), safe_get_sheet_data(sheet_clientes, COLUMNAS_CLIENTES), safe_get_sheet_data(sheet_usuarios, COLUMNAS_USUARIOS)
-st.session_state.df_reclamos = df_reclamos
-st.session_state.df_clientes = df_clientes
-st.session_state.df_usuarios = df_usuarios
+# Uno por sesión (no dentro de init_google_sheets, que se ejecuta una vez por proceso)
+init_notification_manager(sheet_notifications, sheet_lecturas)
 
 # --------------------------
 # CONFIGURACIÓN DE PÁGINA
@@ -377,6 +382,14 @@ with st.sidebar:
     # Notificaciones
     if st.session_state.auth.get("logged_in", False):
         render_notification_bell()
+
+    # Antigüedad de los datos que muestra esta página (los actualiza el hilo en segundo plano)
+    datos_al = st.session_state.get("datos_al")
+    if datos_al:
+        st.caption(f"🕒 Datos al {datetime.fromtimestamp(datos_al, ahora_argentina().tzinfo):%H:%M:%S}")
+    ultimo_error = get_background_refresher(spreadsheet).last_error
+    if ultimo_error and time.time() - (datos_al or 0) > DATA_STALE_AFTER:
+        st.warning(f"⚠️ No se pudieron actualizar los datos: {ultimo_error}")
     
     st.markdown("---")
     
@@ -457,93 +470,24 @@ app_state = AppState()
 # CARGA DE DATOS OPTIMIZADA
 # --------------------------
 
-@st.cache_data(ttl=30, show_spinner=False)
-def cargar_datos():
-    """Carga datos de Google Sheets con manejo robusto de nombres y fechas."""
-    try:
-        loading_placeholder = st.empty()
-        loading_placeholder.markdown(get_loading_spinner(), unsafe_allow_html=True)
-
-        df_reclamos = safe_get_sheet_data(sheet_reclamos, COLUMNAS_RECLAMOS)
-        df_clientes = safe_get_sheet_data(sheet_clientes, COLUMNAS_CLIENTES)
-        df_usuarios = safe_get_sheet_data(sheet_usuarios, COLUMNAS_USUARIOS)
-
-        if df_reclamos.empty:
-            show_warning("La hoja de reclamos está vacía o no se pudo cargar")
-        if df_clientes.empty:
-            show_warning("La hoja de clientes está vacía o no se pudo cargar")
-        if df_reclamos.empty or df_clientes.empty:
-            return pd.DataFrame(), pd.DataFrame(), pd.DataFrame()
-
-        # --- Normalizar nombres de columnas (quitar espacios)
-        df_reclamos.columns = [str(c).strip() for c in df_reclamos.columns]
-        df_clientes.columns = [str(c).strip() for c in df_clientes.columns]
-        df_usuarios.columns = [str(c).strip() for c in df_usuarios.columns]
-
-        # --- Detectar variantes y renombrar ---
-        import re
-        def _canon(colname):
-            return re.sub(r'[^a-z0-9]', '', str(colname).lower())
-
-        # Mapeo a "Fecha_formateada"
-        for col in list(df_reclamos.columns):
-            if _canon(col) in ("fechaformateada","fechadecierre","fechacierre","fecha_cierre","fechacierrehora"):
-                if col != "Fecha_formateada":
-                    df_reclamos.rename(columns={col: "Fecha_formateada"}, inplace=True)
-                break
-
-        # Mapeo a "Fecha y hora"
-        for col in list(df_reclamos.columns):
-            if _canon(col) in ("fechayhora","fechahora","fechaingreso","fechaingresohora","fecha_hora"):
-                if col != "Fecha y hora":
-                    df_reclamos.rename(columns={col: "Fecha y hora"}, inplace=True)
-                break
-
-        # Normalizaciones simples
-        for col in ["Nº Cliente", "N° de Precinto"]:
-            if col in df_clientes.columns:
-                df_clientes[col] = df_clientes[col].astype(str).str.strip()
-            if col in df_reclamos.columns:
-                df_reclamos[col] = df_reclamos[col].astype(str).str.strip()
-
-        # Parseo seguro: Fecha y hora (ingreso)
-        if "Fecha y hora" in df_reclamos.columns:
-            df_reclamos["Fecha y hora"] = df_reclamos["Fecha y hora"].apply(
-                lambda x: parse_fecha(x) if not pd.isna(x) else pd.NaT
-            )
-
-        # Parseo robusto: Fecha_formateada (cierre)
-        import numpy as np
-        if "Fecha_formateada" in df_reclamos.columns:
-            raw = df_reclamos["Fecha_formateada"].copy()
-            # Limpieza inicial
-            df_reclamos["Fecha_formateada"] = (
-                raw.astype(str)
-                .str.replace(r"\s+", " ", regex=True)
-                .str.strip()
-                .replace({"": np.nan, "nan": np.nan, "NaN": np.nan})
-            )
-            # Intentar parseo con pandas
-            df_reclamos["Fecha_formateada"] = pd.to_datetime(
-                df_reclamos["Fecha_formateada"],
-                errors="coerce",
-                dayfirst=True,
-                infer_datetime_format=True
-            )
-        else:
-            df_reclamos["Fecha_formateada"] = pd.NaT
-
-        return df_reclamos, df_clientes, df_usuarios
-
-    except Exception as e:
-        show_error(f"Error al cargar datos: {str(e)}")
-        if DEBUG_MODE:
-            st.exception(e)
+def cargar_datos(datos):
+    """
+    Devuelve los DataFrames de reclamos, clientes y usuarios listos para usar.
+
+    Las hojas ya llegan normalizadas desde el caché compartido (identificadores
+    sin espacios, Estado/Sector/Tipo/Técnico como category y fechas como
+    datetime64), así que no se copian ni se vuelven a limpiar: son de solo
+    lectura.
+    """
+    if datos.reclamos.empty:
+        show_warning("La hoja de reclamos está vacía o no se pudo cargar")
+    if datos.clientes.empty:
+        show_warning("La hoja de clientes está vacía o no se pudo cargar")
+    if datos.reclamos.empty or datos.clientes.empty:
         return pd.DataFrame(), pd.DataFrame(), pd.DataFrame()
-    finally:
-        loading_placeholder.empty()
+    return datos.reclamos, datos.clientes, datos.usuarios
 
-df_reclamos, df_clientes, df_usuarios = cargar_datos()
+df_reclamos, df_clientes, df_usuarios = cargar_datos(datos_hojas)
 st.session_state.df_reclamos = df_reclamos
 st.session_state.df_clientes = df_clientes
 st.session_state.df_usuarios = df_usuarios
@@ -565,8 +509,11 @@ st.markdown("""
 </div>
 """, unsafe_allow_html=True)
 
-# Dashboard de métricas
-render_metrics_dashboard(df_reclamos, is_mobile=is_mobile())
+# Dashboard de métricas (los totales incluyen los reclamos ya archivados)
+archivados, error_archivo = count_archived_claims(spreadsheet)
+if error_archivo:
+    st.caption(f"⚠️ Los totales no incluyen el archivo: {error_archivo}")
+render_metrics_dashboard(df_reclamos, is_mobile=is_mobile(), archivados=archivados)
 
 # BREADCRUMB DE NAVEGACIÓN mejorado
 st.markdown(f"""
@@ -605,6 +552,7 @@ COMPONENTES = {
     "Inicio": {
         "render": render_nuevo_reclamo,
         "permiso": "inicio",
+        "hojas": [WORKSHEET_RECLAMOS, WORKSHEET_CLIENTES],  # Hojas en las que escribe el componente
         "params": {
             "df_reclamos": df_reclamos,
             "df_clientes": df_clientes,
@@ -616,6 +564,7 @@ COMPONENTES = {
     "Reclamos cargados": {
         "render": render_gestion_reclamos,
         "permiso": "reclamos_cargados",
+        "hojas": [WORKSHEET_RECLAMOS],
         "params": {
             "df_reclamos": df_reclamos,
             "df_clientes": df_clientes,
@@ -626,6 +575,7 @@ COMPONENTES = {
     "Gestión de clientes": {
         "render": render_gestion_clientes,
         "permiso": "gestion_clientes",
+        "hojas": [WORKSHEET_CLIENTES],
         "params": {
             "df_clientes": df_clientes,
             "df_reclamos": df_reclamos,
@@ -636,6 +586,7 @@ COMPONENTES = {
     "Imprimir reclamos": {
         "render": render_impresion_reclamos,
         "permiso": "imprimir_reclamos",
+        "hojas": [],
         "params": {
             "df_clientes": df_clientes,
             "df_reclamos": df_reclamos,
@@ -645,8 +596,10 @@ COMPONENTES = {
     "Seguimiento técnico": {
         "render": render_planificacion_grupos,
         "permiso": "seguimiento_tecnico",
+        "hojas": [WORKSHEET_RECLAMOS],
         "params": {
             "df_reclamos": df_reclamos,
+            "df_clientes": df_clientes,
             "sheet_reclamos": sheet_reclamos,
             "user": user_info
         }
@@ -654,6 +607,7 @@ COMPONENTES = {
     "Cierre de Reclamos": {
         "render": render_cierre_reclamos,
         "permiso": "cierre_reclamos",
+        "hojas": [WORKSHEET_RECLAMOS, WORKSHEET_CLIENTES],
         "params": {
             "df_reclamos": df_reclamos,
             "df_clientes": df_clientes,
@@ -671,8 +625,10 @@ if opcion in COMPONENTES and has_permission(COMPONENTES[opcion]["permiso"]):
         resultado = COMPONENTES[opcion]["render"](**COMPONENTES[opcion]["params"])
         
         if resultado and resultado.get('needs_refresh'):
-            st.cache_data.clear()
-            time.sleep(1)
+            # Las escrituras ya se aplicaron sobre los datos compartidos: solo se
+            # vuelve a leer la hoja si el componente pidió refrescar sin escribir
+            if not resultado.get('data_updated'):
+                invalidate(*COMPONENTES[opcion]["hojas"])
             st.rerun()
 
 # --------------------------
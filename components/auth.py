@@ -3,7 +3,7 @@ Componente de autenticación profesional estilo CRM
 Versión mejorada con diseño elegante
 """
 import streamlit as st
-from utils.data_manager import safe_get_sheet_data
+from utils.data_manager import get_current_frame, safe_get_sheet_data
 from config.settings import (
     WORKSHEET_USUARIOS,
     COLUMNAS_USUARIOS,
@@ -23,11 +23,18 @@ def init_auth_session():
 def logout():
     """Cierra la sesión del usuario"""
     st.session_state.auth = {'logged_in': False, 'user_info': None}
-    st.cache_data.clear()  # Limpiar caché de datos
+    # Los datos de las hojas se comparten entre sesiones: solo se sueltan las referencias de esta sesión
+    for key in ('df_reclamos', 'df_clientes', 'df_usuarios', 'versiones_hojas', 'datos_al'):
+        st.session_state.pop(key, None)
 
 def verify_credentials(username, password, sheet_usuarios):
     try:
-        df_usuarios = safe_get_sheet_data(sheet_usuarios, COLUMNAS_USUARIOS)
+        # La hoja compartida ya está cargada (la mantiene el hilo en segundo plano);
+        # se copia porque los DataFrames publicados son de solo lectura
+        df_usuarios = get_current_frame(WORKSHEET_USUARIOS)
+        if df_usuarios.empty:
+            df_usuarios = safe_get_sheet_data(sheet_usuarios, COLUMNAS_USUARIOS)
+        df_usuarios = df_usuarios.copy()
         
         # Normalización de datos
         df_usuarios["username"] = df_usuarios["username"].str.strip().str.lower()
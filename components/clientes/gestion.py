@@ -2,9 +2,11 @@
 import streamlit as st
 import pandas as pd
 import uuid
-from utils.date_utils import ahora_argentina, format_fecha, parse_fecha
-from utils.api_manager import api_manager, batch_update_sheet
-from config.settings import SECTORES_DISPONIBLES
+from utils.date_utils import ahora_argentina, format_fecha
+from utils.data_manager import append_rows, build_row, get_search_index, update_row
+from utils.claim_archive import get_claims_history
+from utils.search_index import LIMITE_RESULTADOS
+from config.settings import ARCHIVE_HISTORY_MONTHS, SECTORES_DISPONIBLES, WORKSHEET_CLIENTES
 
 # --- FUNCIONES HELPER NUEVAS ---
 def _validar_telefono(telefono):
@@ -51,9 +53,7 @@ def render_gestion_clientes(df_clientes, df_reclamos, sheet_clientes, user_role)
     """
     st.subheader("🛠️ Gestión de Clientes")
 
-    # Normalización de datos - CORREGIDO
-    df_clientes["Nº Cliente"] = df_clientes["Nº Cliente"].astype(str).str.strip()
-
+    # Nº Cliente ya llega sin espacios (normalización del snapshot)
     cambios = False
 
     if user_role == 'admin':
@@ -66,7 +66,8 @@ def render_gestion_clientes(df_clientes, df_reclamos, sheet_clientes, user_role)
     st.markdown('</div>', unsafe_allow_html=True)
     return {
         "cambios": cambios,
-        "needs_refresh": cambios
+        "needs_refresh": cambios,
+        "data_updated": cambios
     }
 
 # --- FUNCIÓN DE EDICIÓN MEJORADA ---
@@ -75,29 +76,42 @@ def _mostrar_edicion_cliente(df_clientes, df_reclamos, sheet_clientes):
     cambios = False
 
     # Filtrar solo clientes con número válido
-    clientes_validos = df_clientes[
-        df_clientes["Nº Cliente"].astype(str).str.strip() != ""
-    ]
+    clientes_validos = df_clientes[df_clientes["Nº Cliente"] != ""]
     
     if clientes_validos.empty:
         st.info("📝 No hay clientes registrados para editar")
         return cambios
 
-    clientes_lista = clientes_validos["Nº Cliente"].astype(str).tolist()
-    
-    cliente_seleccionado = st.selectbox(
-        "🔍 Seleccionar cliente", 
-        clientes_lista,
-        help="Elegí el cliente que querés editar"
+    busqueda = st.text_input(
+        "🔍 Buscar cliente",
+        key="buscar_cliente_edicion",
+        help="Número de cliente, nombre, dirección o teléfono"
     )
+    if not busqueda.strip():
+        st.caption("Escribí al menos parte del número, nombre, dirección o teléfono del cliente")
+        return cambios
 
-    if not cliente_seleccionado:
+    # Solo las mejores coincidencias del índice del snapshot llegan al selector
+    opciones = get_search_index(WORKSHEET_CLIENTES).search(
+        busqueda, LIMITE_RESULTADOS, dentro_de=clientes_validos.index
+    )
+    if not opciones:
+        st.info("🔍 No hay clientes que coincidan con la búsqueda")
         return cambios
 
+    seleccion = st.selectbox(
+        "Seleccionar cliente", 
+        opciones,
+        format_func=lambda i: (
+            f"{clientes_validos.at[i, 'Nº Cliente']} - {clientes_validos.at[i, 'Nombre']} "
+            f"({clientes_validos.at[i, 'Dirección']})"
+        ),
+        help="Elegí el cliente que querés editar"
+    )
+    cliente_seleccionado = clientes_validos.at[seleccion, "Nº Cliente"]
+
     # Búsqueda robusta del cliente
-    cliente_actual = df_clientes[
-        df_clientes["Nº Cliente"].astype(str).str.strip() == str(cliente_seleccionado).strip()
-    ]
+    cliente_actual = df_clientes[df_clientes["Nº Cliente"] == str(cliente_seleccionado).strip()]
     
     if cliente_actual.empty:
         st.error(f"❌ No se encontró el cliente {cliente_seleccionado}")
@@ -106,7 +120,7 @@ def _mostrar_edicion_cliente(df_clientes, df_reclamos, sheet_clientes):
     cliente_actual = cliente_actual.iloc[0]
     st.info(f"📋 Editando: Cliente {cliente_seleccionado} - {cliente_actual.get('Nombre', '')}")
     
-    _mostrar_reclamos_cliente(cliente_seleccionado, df_reclamos)
+    _mostrar_reclamos_cliente(cliente_seleccionado, df_reclamos, sheet_clientes.spreadsheet)
 
     # Formulario de edición con índice seguro - CORREGIDO
     with st.form("form_editar_cliente"):
@@ -219,7 +233,7 @@ def _mostrar_edicion_cliente(df_clientes, df_reclamos, sheet_clientes):
             # Confirmación final
             if st.button("✅ Confirmar cambios", key=f"confirmar_{cliente_seleccionado}"):
                 cambios = _actualizar_cliente(
-                    df_clientes[df_clientes["Nº Cliente"].astype(str) == str(cliente_seleccionado)],
+                    df_clientes[df_clientes["Nº Cliente"] == str(cliente_seleccionado)],
                     sheet_clientes,
                     nuevo_sector,
                     nuevo_nombre.strip(),
@@ -233,15 +247,17 @@ def _mostrar_edicion_cliente(df_clientes, df_reclamos, sheet_clientes):
 
     return cambios
 
-def _mostrar_reclamos_cliente(nro_cliente, df_reclamos):
-    """Muestra los últimos reclamos del cliente"""
+def _mostrar_reclamos_cliente(nro_cliente, df_reclamos, spreadsheet):
+    """Muestra los últimos reclamos del cliente, completando con el archivo si hace falta"""
     df_reclamos_cliente = df_reclamos[
         df_reclamos["Nº Cliente"] == nro_cliente
-    ].copy()
-    
-    df_reclamos_cliente["Fecha y hora"] = df_reclamos_cliente["Fecha y hora"].apply(
-        parse_fecha
-    )
+    ]
+    if len(df_reclamos_cliente) < 3:
+        # Los resueltos viejos ya no están en la hoja de reclamos: solo los últimos meses del archivo
+        desde = (pd.Timestamp(ahora_argentina()) - pd.DateOffset(months=ARCHIVE_HISTORY_MONTHS)).normalize().replace(day=1)
+        df_reclamos_cliente, error = get_claims_history(spreadsheet, desde=desde, nro_cliente=nro_cliente)
+        if error:
+            st.warning(f"⚠️ {error}")
     
     df_reclamos_cliente = df_reclamos_cliente.sort_values(
         "Fecha y hora", 
@@ -318,30 +334,16 @@ def _actualizar_cliente(cliente_row, sheet_clientes, nuevo_sector, nuevo_nombre,
     
     with st.spinner("Actualizando cliente..."):
         try:
-            # VALIDACIÓN 3: Verificar que tenemos un índice válido
-            if cliente_row.index.empty:
-                st.error("❌ Error: No se pudo determinar la posición del cliente en la hoja")
-                return False
-                
-            # Nos aseguramos que el índice sea numérico y válido para Google Sheets
-            index = int(cliente_row.index[0]) + 2
-
             # Convertimos todos los valores a string para evitar problemas
-            updates = [
-                {"range": f"B{index}", "values": [[str(nuevo_sector)]]},
-                {"range": f"C{index}", "values": [[str(nuevo_nombre).upper()]]},
-                {"range": f"D{index}", "values": [[str(nueva_direccion).upper()]]},
-                {"range": f"E{index}", "values": [[str(nuevo_telefono)]]},
-                {"range": f"F{index}", "values": [[str(nuevo_precinto)]]},
-                {"range": f"H{index}", "values": [[format_fecha(ahora_argentina())]]}
-            ]
-
-            success, error = api_manager.safe_sheet_operation(
-                batch_update_sheet,
-                sheet_clientes,
-                updates,
-                is_batch=True
-            )
+            # (la fila se ubica y verifica por Nº Cliente)
+            success, error = update_row(sheet_clientes, cliente_actual["Nº Cliente"], {
+                "Sector": str(nuevo_sector),
+                "Nombre": str(nuevo_nombre).upper(),
+                "Dirección": str(nueva_direccion).upper(),
+                "Teléfono": str(nuevo_telefono),
+                "N° de Precinto": str(nuevo_precinto),
+                "Última Modificación": format_fecha(ahora_argentina())
+            }, columna="Nº Cliente")
 
             if success:
                 st.success("✅ Cliente actualizado correctamente.")
@@ -360,9 +362,6 @@ def _actualizar_cliente(cliente_row, sheet_clientes, nuevo_sector, nuevo_nombre,
                 st.error(f"❌ Error al actualizar: {error}")
                 return False
 
-        except ValueError:
-            st.error("❌ Error: Índice del cliente no es válido")
-            return False
         except Exception as e:
             st.error(f"❌ Error inesperado: {str(e)}")
             return False
@@ -442,8 +441,7 @@ def _guardar_nuevo_cliente(df_clientes, sheet_clientes, nuevo_nro, nuevo_sector,
         return False
         
     # Validar que el número de cliente sea único (comparación robusta)
-    clientes_existentes = df_clientes["Nº Cliente"].astype(str).str.strip()
-    if str(nuevo_nro).strip() in clientes_existentes.values:
+    if str(nuevo_nro).strip() in df_clientes["Nº Cliente"].values:
         st.error("⚠️ Este número de cliente ya existe. Usá otro número.")
         return False
 
@@ -457,21 +455,18 @@ def _guardar_nuevo_cliente(df_clientes, sheet_clientes, nuevo_nro, nuevo_sector,
             nuevo_id = str(uuid.uuid4())
 
             # Preparar datos (teléfono puede estar vacío)
-            nueva_fila = [
-                nuevo_nro.strip(), 
-                str(nuevo_sector),
-                nuevo_nombre.strip().upper(),
-                nueva_direccion.strip().upper(), 
-                nuevo_telefono.strip(),  # Puede estar vacío
-                nuevo_precinto.strip(), 
-                nuevo_id,
-                format_fecha(ahora_argentina())
-            ]
-
-            success, error = api_manager.safe_sheet_operation(
-                sheet_clientes.append_row,
-                nueva_fila
-            )
+            nueva_fila = build_row(sheet_clientes.title, {
+                "Nº Cliente": nuevo_nro.strip(),
+                "Sector": str(nuevo_sector),
+                "Nombre": nuevo_nombre.strip().upper(),
+                "Dirección": nueva_direccion.strip().upper(),
+                "Teléfono": nuevo_telefono.strip(),  # Puede estar vacío
+                "N° de Precinto": nuevo_precinto.strip(),
+                "ID Cliente": nuevo_id,
+                "Última Modificación": format_fecha(ahora_argentina())
+            })
+
+            success, error = append_rows(sheet_clientes, [nueva_fila])
 
             if success:
                 st.success("✅ Nuevo cliente agregado correctamente.")
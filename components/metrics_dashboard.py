@@ -48,25 +48,31 @@ def status_badge(status, count):
     </div>
     """
 
-def render_metrics_dashboard(df_reclamos, is_mobile=False):
-    """Renderiza el dashboard de métricas profesional"""
+def render_metrics_dashboard(df_reclamos, is_mobile=False, archivados=0):
+    """
+    Renderiza el dashboard de métricas profesional
+
+    `archivados` son los reclamos resueltos que ya pasaron a las hojas de
+    archivo: se suman a los resueltos y al total para que no bajen después
+    de cada pasada.
+    """
     try:
-        if df_reclamos.empty:
+        if df_reclamos.empty and not archivados:
             st.warning("No hay datos de reclamos para mostrar")
             return
 
-        df_metricas = df_reclamos.copy()
+        df_metricas = df_reclamos
 
         # Procesamiento de datos
         df_activos = df_metricas[df_metricas["Estado"].isin(["Pendiente", "En curso"])]
         total_activos = len(df_activos)
         pendientes = len(df_activos[df_activos["Estado"] == "Pendiente"])
         en_curso = len(df_activos[df_activos["Estado"] == "En curso"])
-        resueltos = len(df_metricas[df_metricas["Estado"] == "Resuelto"])
-        desconexiones = df_metricas["Estado"].str.strip().str.lower().eq("desconexión").sum()
+        resueltos = len(df_metricas[df_metricas["Estado"] == "Resuelto"]) + archivados
+        desconexiones = (df_metricas["Estado"] == "Desconexión").sum()
         
         # Calcular porcentajes para tendencias
-        total_reclamos = len(df_metricas)
+        total_reclamos = len(df_metricas) + archivados
         porcentaje_activos = (total_activos / total_reclamos * 100) if total_reclamos > 0 else 0
         porcentaje_resueltos = (resueltos / total_reclamos * 100) if total_reclamos > 0 else 0
 
@@ -2,67 +2,75 @@
 
 import streamlit as st
 import pandas as pd
-import time
 from datetime import datetime, timedelta
-from utils.date_utils import ahora_argentina, format_fecha
-from utils.api_manager import api_manager
-from utils.data_manager import safe_get_sheet_data, batch_update_sheet
-from config.settings import NOTIFICATION_TYPES, COLUMNAS_NOTIFICACIONES, MAX_NOTIFICATIONS
-
-@st.cache_data(ttl=10)
-def get_cached_notifications(username, unread_only=True, limit=MAX_NOTIFICATIONS):
-    return st.session_state.notification_manager.get_for_user(username, unread_only, limit)
+from utils.date_utils import ahora_argentina, format_fecha, parse_fechas
+from utils.notification_store import NotificationStore, ids_a_texto
+from utils.unit_of_work import UnitOfWork
+from utils.data_manager import (
+    append_rows,
+    delete_rows,
+    get_current_frame,
+    get_shared_cache,
+    invalidate,
+    locate_row,
+    locate_rows
+)
+from config.settings import (
+    NOTIFICATION_TYPES,
+    COLUMNAS_NOTIFICACIONES,
+    MAX_NOTIFICATIONS,
+    NOTIFICATION_BUFFER_SIZE,
+    NOTIFICATION_MAX_ROWS,
+    NOTIFICATION_COMPACT_EVERY,
+    WORKSHEET_NOTIFICACIONES,
+    WORKSHEET_NOTIFICACIONES_LEIDAS
+)
+
+@st.cache_resource
+def get_notification_store():
+    """Espejo de la hoja de notificaciones compartido por todas las sesiones"""
+    return NotificationStore(NOTIFICATION_BUFFER_SIZE)
 
 class NotificationManager:
-    def __init__(self, sheet_notifications):
+    """
+    Notificaciones sobre la hoja, sin lecturas completas
+    
+    Las altas solo agregan filas (append) con IDs del asignador del proceso;
+    las consultas salen del ring buffer en memoria. Cuando la hoja supera
+    NOTIFICATION_MAX_ROWS + NOTIFICATION_COMPACT_EVERY filas se borran las más
+    viejas de una vez (compactación).
+    
+    Lo leído es por usuario: cada uno tiene una fila en la hoja de lecturas
+    con sus IDs como rangos compactos, así una notificación para 'all' deja
+    de contar solo para quien la marcó.
+    """
+
+    def __init__(self, sheet_notifications, sheet_lecturas):
         self.sheet = sheet_notifications
-        self.max_retries = 3
+        self.sheet_lecturas = sheet_lecturas
+
+    def _store(self):
+        """Store compartido, sincronizado con la última versión publicada de las hojas"""
+        cache = get_shared_cache()
+        store = get_notification_store()
+        store.sync(cache.version(WORKSHEET_NOTIFICACIONES), get_current_frame(WORKSHEET_NOTIFICACIONES))
+        store.sync_read_state(
+            cache.version(WORKSHEET_NOTIFICACIONES_LEIDAS), get_current_frame(WORKSHEET_NOTIFICACIONES_LEIDAS)
+        )
+        return store
 
     def _get_next_id(self):
-        for _ in range(self.max_retries):
-            try:
-                df = safe_get_sheet_data(self.sheet, COLUMNAS_NOTIFICACIONES)
-                return 1 if df.empty else int(df['ID'].max()) + 1
-            except Exception as e:
-                st.error(f"Error al obtener ID: {str(e)}")
-                time.sleep(1)
-        return None
+        return self._store().allocate(1)[0]
 
-    def add(self, notification_type, message, user_target='all', claim_id=None, action=None):
-        """
-        Agrega una notificación general para todos los usuarios ('all')
-        con límite de 10 en total.
-        """
+    @staticmethod
+    def _validar_tipo(notification_type):
         if notification_type not in NOTIFICATION_TYPES:
             raise ValueError(f"Tipo de notificación no válido: {notification_type}. Opciones: {list(NOTIFICATION_TYPES.keys())}")
 
-        try:
-            # Obtener todas las notificaciones actuales dirigidas a 'all'
-            df_notif = safe_get_sheet_data(self.sheet, COLUMNAS_NOTIFICACIONES)
-            df_all = df_notif[df_notif['Usuario_Destino'] == 'all']
-
-            if len(df_all) >= 10:
-                df_all['Fecha_Hora'] = pd.to_datetime(df_all['Fecha_Hora'], errors='coerce')
-                mas_antigua = df_all.sort_values('Fecha_Hora').iloc[0]
-                row_id = df_all.index[0]
-                self._delete_rows([row_id])
-
-            return self._agregar_notificacion_individual(
-                notification_type, message, 'all', claim_id, action
-            )
-
-        except Exception as e:
-            st.error(f"Error al agregar notificación global: {str(e)}")
-            return False
-
-
-    def _agregar_notificacion_individual(self, notification_type, message, user_target, claim_id=None, action=None):
-        new_id = self._get_next_id()
-        if new_id is None:
-            return False
-
-        new_notification = [
-            new_id,
+    @staticmethod
+    def _fila(notif_id, notification_type, message, user_target='all', claim_id=None, action=None):
+        return [
+            notif_id,
             notification_type,
             NOTIFICATION_TYPES[notification_type]['priority'],
             message,
@@ -73,133 +81,211 @@ class NotificationManager:
             action or ""
         ]
 
-        for attempt in range(self.max_retries):
-            success, error = api_manager.safe_sheet_operation(
-                self.sheet.append_row,
-                new_notification
-            )
-            if success:
-                return True
-            time.sleep(1)
+    def build_row(self, notification_type, message, user_target='all', claim_id=None, action=None):
+        """
+        Fila de una notificación nueva, lista para append_rows o una UnitOfWork
+        
+        No lee la hoja: el ID sale del asignador del proceso.
+        """
+        self._validar_tipo(notification_type)
+        return self._fila(self._get_next_id(), notification_type, message, user_target, claim_id, action)
 
-        st.error(f"Fallo al agregar notificación para {user_target}")
-        return False
+    def add(self, notification_type, message, user_target='all', claim_id=None, action=None):
+        """
+        Agrega una notificación general para todos los usuarios ('all')
+        
+        Solo agrega una fila; la UI muestra las MAX_NOTIFICATIONS más recientes
+        y las viejas se borran al compactar. Para varias a la vez usar add_many.
+        """
+        return self.add_many([{
+            'notification_type': notification_type,
+            'message': message,
+            'user_target': 'all',
+            'claim_id': claim_id,
+            'action': action
+        }])
+
+    def add_many(self, notifications):
+        """
+        Agrega varias notificaciones con un único append
+        
+        Los IDs se reservan juntos y la compactación se revisa una sola vez.
+        
+        Args:
+            notifications: lista de dicts con los argumentos de build_row
+                (notification_type, message y opcionalmente user_target, claim_id, action)
+        
+        Returns:
+            bool: True si se guardaron todas
+        """
+        if not notifications:
+            return True
+        for notification in notifications:
+            self._validar_tipo(notification['notification_type'])
 
-    def get_for_user(self, username, unread_only=True, limit=MAX_NOTIFICATIONS):
         try:
-            df = safe_get_sheet_data(self.sheet, COLUMNAS_NOTIFICACIONES)
-            if df.empty:
-                return []
+            ids = self._store().allocate(len(notifications))
+            filas = [self._fila(notif_id, **notification) for notif_id, notification in zip(ids, notifications)]
+            return self._agregar_filas(filas)
 
-            df['Fecha_Hora'] = pd.to_datetime(df['Fecha_Hora'], errors='coerce')
-            df['Leída'] = df['Leída'].astype(str).str.strip().str.upper().map({'FALSE': False, 'TRUE': True}).fillna(False)
+        except Exception as e:
+            st.error(f"Error al agregar notificaciones: {str(e)}")
+            return False
 
-            mask = (df['Usuario_Destino'] == username) | (df['Usuario_Destino'] == 'all')
-            if unread_only:
-                mask &= (df['Leída'] == False)
+    def _agregar_filas(self, filas):
+        # Un append no se repite: safe_sheet_operation ya reintenta solo lo que no duplica filas
+        cache = get_shared_cache()
+        version_antes = cache.version(WORKSHEET_NOTIFICACIONES)
+        success, error = append_rows(self.sheet, filas)
+        if not success:
+            st.error(f"Fallo al agregar {len(filas)} notificación(es): {error}")
+            return False
 
-            notifications = (
-                df[mask]
-                .sort_values('Fecha_Hora', ascending=False)
-                .head(limit)
-            )
+        ahora = ahora_argentina()
+        registros = [dict(zip(COLUMNAS_NOTIFICACIONES, fila), Fecha_Hora=ahora) for fila in filas]
+        get_notification_store().push(registros, version_antes, cache.version(WORKSHEET_NOTIFICACIONES))
+        self._compactar_si_corresponde()
+        return True
 
-            return notifications.to_dict('records')
+    @staticmethod
+    def _destinos(username, rol=None):
+        """Valores de Usuario_Destino que le llegan a un usuario: el suyo, su rol y 'all'"""
+        return {d for d in (username, rol, 'all') if d}
+
+    def get_unread(self, username, rol=None, limit=MAX_NOTIFICATIONS):
+        """
+        No leídas de un usuario desde el índice en memoria
+        
+        Returns:
+            tuple: (cantidad total, las `limit` más recientes)
+        """
+        try:
+            return self._store().unread(self._destinos(username, rol), username, limit)
+
+        except Exception as e:
+            st.error(f"Error al obtener notificaciones: {str(e)}")
+            return 0, []
+
+    def get_for_user(self, username, unread_only=True, limit=MAX_NOTIFICATIONS, rol=None):
+        if unread_only:
+            return self.get_unread(username, rol, limit)[1]
+        try:
+            destinos = self._destinos(username, rol)
+            return self._store().recent(lambda n: n['Usuario_Destino'] in destinos, limit)
 
         except Exception as e:
             st.error(f"Error al obtener notificaciones: {str(e)}")
             return []
 
-    def get_unread_count(self, username):
-        notifications = self.get_for_user(username, unread_only=True)
-        return len(notifications)
+    def get_unread_count(self, username, rol=None):
+        return self.get_unread(username, rol, limit=0)[0]
 
-    def mark_as_read(self, notification_ids):
+    def mark_as_read(self, username, notification_ids):
+        """
+        Marca notificaciones como leídas solo para ese usuario
+        
+        Reescribe la fila del usuario en la hoja de lecturas (o la agrega) con
+        un único batchUpdate. Los IDs anteriores al buffer ya no se muestran
+        y se descartan para que la fila no crezca.
+        """
         if not notification_ids:
             return False
 
         try:
-            df = safe_get_sheet_data(self.sheet, COLUMNAS_NOTIFICACIONES)
-
-            updates = [{
-                'range': f"H{int(row['ID']) + 1}",
-                'values': [[True]]
-            } for _, row in df[df['ID'].isin(notification_ids)].iterrows()]
-
-            if not updates:
+            store = self._store()
+            nuevas = {int(notif_id) for notif_id in notification_ids}
+            leidas = store.read_ids(username) | nuevas
+            minimo = store.oldest_id()
+            if minimo is not None:
+                leidas = {notif_id for notif_id in leidas if notif_id >= minimo}
+
+            cache = get_shared_cache()
+            version_antes = cache.version(WORKSHEET_NOTIFICACIONES_LEIDAS)
+            resultado = UnitOfWork().upsert("lecturas", self.sheet_lecturas, username, {
+                'IDs': ids_a_texto(leidas),
+                'Actualizado': format_fecha(ahora_argentina())
+            }).commit()
+            success, error = resultado["lecturas"]
+            if not success:
+                st.error(f"Error al marcar como leídas: {error}")
                 return False
 
-            success, error = api_manager.safe_sheet_operation(
-                batch_update_sheet,
-                self.sheet,
-                updates,
-                is_batch=True
-            )
-            return success
+            store.mark_read(username, nuevas, version_antes, cache.version(WORKSHEET_NOTIFICACIONES_LEIDAS))
+            return True
 
         except Exception as e:
             st.error(f"Error al marcar como leídas: {str(e)}")
             return False
 
-    def clear_old(self, days=30):
-        try:
-            df = safe_get_sheet_data(self.sheet, COLUMNAS_NOTIFICACIONES)
-            if df.empty:
-                return True
+    def _compactar_si_corresponde(self):
+        self._compactar(minimo=NOTIFICATION_COMPACT_EVERY)
 
-            df['Fecha_Hora'] = pd.to_datetime(df['Fecha_Hora'], errors='coerce')
-            if pd.api.types.is_datetime64tz_dtype(df['Fecha_Hora']):
-                df['Fecha_Hora'] = df['Fecha_Hora'].dt.tz_convert(None)
+    def _compactar(self, days=None, minimo=1):
+        """
+        Borra las filas más viejas de la hoja en un único batchUpdate
+        
+        Como la hoja solo crece por append, las más viejas son las primeras:
+        se borran las que exceden NOTIFICATION_MAX_ROWS y, si se indica `days`,
+        las primeras con fecha anterior al corte. No hace nada si son menos de
+        `minimo`. El lock evita que dos sesiones compacten a la vez; entre
+        procesos, se verifica en la hoja que esas filas sigan siendo las más
+        viejas (si no, otro ya compactó y solo se invalida la hoja).
+        """
+        with get_notification_store().compact_lock:
+            df = get_current_frame(WORKSHEET_NOTIFICACIONES)
+            cantidad = max(0, len(df) - NOTIFICATION_MAX_ROWS)
 
-            df_validas = df[df['Fecha_Hora'].notna()].copy()
-            cutoff_date = ahora_argentina().replace(tzinfo=None) - timedelta(days=days)
-            old_ids = df_validas[df_validas['Fecha_Hora'] < cutoff_date]['ID'].tolist()
+            if days is not None and not df.empty:
+                corte = ahora_argentina() - timedelta(days=days)
+                fechas = parse_fechas(df['Fecha_Hora'])
+                viejas = (fechas < corte).reset_index(drop=True)
+                cantidad = max(cantidad, int(viejas.cummin().sum()))
 
-            if not old_ids:
+            if cantidad < minimo:
+                return True
+
+            # Otro proceso pudo haber compactado ya: se confirma en la hoja dónde
+            # están la primera y la última a borrar antes de tocar nada
+            primera, ultima = str(df['ID'].iloc[0]).strip(), str(df['ID'].iloc[cantidad - 1]).strip()
+            filas, error = locate_rows(self.sheet, [primera, ultima])
+            if error:
+                return False
+            if filas.get(primera) != 2 or filas.get(ultima) != cantidad + 1:
+                invalidate(WORKSHEET_NOTIFICACIONES)
                 return True
 
-            return self._delete_rows(old_ids)
+            # Filas 2..cantidad+1 de la hoja (la 1 es el encabezado): un solo deleteDimension
+            success, error = delete_rows(self.sheet, range(2, cantidad + 2))
+            return success
+
+    def clear_old(self, days=30):
+        try:
+            return self._compactar(days)
 
         except Exception as e:
             st.error(f"Error al limpiar notificaciones: {str(e)}")
             return False
 
-    def _delete_rows(self, row_ids):
-        updates = [{
-            'delete_dimension': {
-                'range': {
-                    'sheetId': self.sheet.id,
-                    'dimension': 'ROWS',
-                    'startIndex': int(row_id),
-                    'endIndex': int(row_id) + 1
-                }
-            }
-        } for row_id in row_ids]
-
-        success, _ = api_manager.safe_sheet_operation(
-            self.sheet.batch_update,
-            {'requests': updates}
-        )
-        return success
-
     def delete_notification_by_id(self, notif_id):
         try:
-            df = safe_get_sheet_data(self.sheet, COLUMNAS_NOTIFICACIONES)
-            fila = df[df['ID'] == notif_id]
-            if fila.empty:
+            fila, error = locate_row(self.sheet, notif_id)
+            if fila is None:
                 return False
 
-            row_id = int(fila.index[0])
-            return self._delete_rows([row_id])
+            success, error = delete_rows(self.sheet, [fila])
+            if not success:
+                return False
+            get_notification_store().remove([int(notif_id)])
+            return True
         except Exception as e:
             st.error(f"Error al eliminar notificación: {str(e)}")
             return False
 
 
 # ✅ FUNCIÓN DE INICIALIZACIÓN — DEBE ESTAR FUERA DE LA CLASE
-def init_notification_manager(sheet_notifications):
+def init_notification_manager(sheet_notifications, sheet_lecturas):
     if 'notification_manager' not in st.session_state:
-        st.session_state.notification_manager = NotificationManager(sheet_notifications)
+        st.session_state.notification_manager = NotificationManager(sheet_notifications, sheet_lecturas)
 
         user = st.session_state.get('auth', {}).get('user_info', {}).get('username', '')
         if user and st.session_state.get('clear_notifications_job') is None:
@@ -1,33 +1,26 @@
 # components/reclamos/cierre.py
 
-import time
-from datetime import datetime
-import pytz
 import pandas as pd
 import streamlit as st
 
-from utils.date_utils import format_fecha, ahora_argentina, parse_fecha
-from utils.api_manager import api_manager
-from utils.data_manager import batch_update_sheet
+from utils.date_utils import format_fecha, ahora_argentina
+from utils.data_manager import get_current_frame, get_enriched_claims, update_row
+from utils.claim_archive import archive_resolved_claims, claims_to_archive
+from components.ui import paginated_list
 from config.settings import (
     SECTORES_DISPONIBLES,
     TECNICOS_DISPONIBLES,
-    COLUMNAS_RECLAMOS,
+    WORKSHEET_RECLAMOS,
+    WORKSHEET_CLIENTES,
+    ARCHIVE_AFTER_DAYS,
     DEBUG_MODE
 )
 
-# === Helpers para mapear nombre de columna -> letra de Excel ===
-def _excel_col_letter(n: int) -> str:
-    letters = ""
-    while n:
-        n, rem = divmod(n - 1, 26)
-        letters = chr(65 + rem) + letters
-    return letters
-
-def _col_letter(col_name: str) -> str:
-    # Usa la lista oficial de columnas de la app
-    idx = COLUMNAS_RECLAMOS.index(col_name) + 1
-    return _excel_col_letter(idx)
+ORDEN_EN_CURSO = {
+    "Fecha de ingreso": ("Fecha y hora", True),
+    "Sector": ("Sector", True),
+    "Técnico": ("Técnico", True)
+}
 
 def mostrar_overlay_cargando(mensaje="Procesando..."):
     """Muestra un spinner simple de Streamlit"""
@@ -40,24 +33,10 @@ def render_cierre_reclamos(df_reclamos, df_clientes, sheet_reclamos, sheet_clien
         'data_updated': False
     }
     
-    # 🚩 Si venimos de un cambio (resuelto/pendiente), forzar refresh de datos
-    if st.session_state.get('force_refresh'):
-        st.session_state['force_refresh'] = False
-        return {
-            'needs_refresh': True,
-            'message': 'Datos actualizados',
-            'data_updated': True
-        }
-
     st.subheader("✅ Cierre de reclamos en curso")
 
     try:
-        # Normalización de datos
-        df_reclamos["ID Reclamo"] = df_reclamos["ID Reclamo"].astype(str).str.strip()
-        df_reclamos["Nº Cliente"] = df_reclamos["Nº Cliente"].astype(str).str.strip()
-        df_reclamos["Técnico"] = df_reclamos["Técnico"].astype(str).fillna("")
-        df_reclamos["Fecha y hora"] = df_reclamos["Fecha y hora"].apply(parse_fecha)
-
+        # Los DataFrames llegan normalizados (IDs limpios, categorías y fechas parseadas)
         # Procesar cada sección
         cambios_tecnicos = _mostrar_reasignacion_tecnico(df_reclamos, sheet_reclamos)
         if cambios_tecnicos:
@@ -68,20 +47,15 @@ def render_cierre_reclamos(df_reclamos, df_clientes, sheet_reclamos, sheet_clien
             })
             return result
 
-        cambios_cierre = _mostrar_reclamos_en_curso(df_reclamos, df_clientes, sheet_reclamos, sheet_clientes)
-        if cambios_cierre:
-            result.update({
-                'needs_refresh': True,
-                'message': 'Estado de reclamos actualizado',
-                'data_updated': True
-            })
-            return result
+        # Fragment: resolver o devolver un reclamo re-ejecuta solo esta lista
+        # (los cambios ya quedan en los datos compartidos, no hace falta un rerun completo)
+        _mostrar_reclamos_en_curso(sheet_reclamos, sheet_clientes)
 
         cambios_limpieza = _mostrar_limpieza_reclamos(df_reclamos, sheet_reclamos)
         if cambios_limpieza:
             result.update({
                 'needs_refresh': True,
-                'message': 'Reclamos antiguos eliminados',
+                'message': 'Reclamos antiguos archivados',
                 'data_updated': True
             })
             return result
@@ -129,22 +103,13 @@ def _mostrar_reasignacion_tecnico(df_reclamos, sheet_reclamos):
     if st.button("💾 Guardar nuevo técnico", key="guardar_tecnico"):
         with st.spinner("Actualizando técnico..."):
             try:
-                fila_index = reclamo.name + 2
                 nuevo_tecnico = ", ".join(nuevo_tecnico_multiselect).upper()
 
-                col_tecnico = _col_letter("Técnico")
-                col_estado  = _col_letter("Estado")
-
-                updates = [{"range": f"{col_tecnico}{fila_index}", "values": [[nuevo_tecnico]]}]
+                cambios = {"Técnico": nuevo_tecnico}
                 if reclamo['Estado'] == "Pendiente":
-                    updates.append({"range": f"{col_estado}{fila_index}", "values": [["En curso"]]})
-
-                success, error = api_manager.safe_sheet_operation(
-                    batch_update_sheet,
-                    sheet_reclamos,
-                    updates,
-                    is_batch=True
-                )
+                    cambios["Estado"] = "En curso"
+
+                success, error = update_row(sheet_reclamos, reclamo["ID Reclamo"], cambios)
                 
                 if success:
                     st.success("✅ Técnico actualizado correctamente.")
@@ -168,8 +133,18 @@ def _mostrar_reasignacion_tecnico(df_reclamos, sheet_reclamos):
 
     return False
 
-def _mostrar_reclamos_en_curso(df_reclamos, df_clientes, sheet_reclamos, sheet_clientes):
-    en_curso = df_reclamos[df_reclamos["Estado"] == "En curso"].copy()
+@st.fragment
+def _mostrar_reclamos_en_curso(sheet_reclamos, sheet_clientes):
+    """
+    Lista de reclamos en curso con sus acciones, como fragment independiente
+    
+    Los filtros y los botones re-ejecutan solo este bloque. Los datos se leen
+    del snapshot publicado (Reclamos ⨝ Clientes compartido), que ya incluye
+    los cierres hechos desde acá; el resto de la página (métricas, resumen)
+    se actualiza en la próxima corrida completa.
+    """
+    df_reclamos = get_enriched_claims(get_current_frame(WORKSHEET_RECLAMOS), get_current_frame(WORKSHEET_CLIENTES))
+    en_curso = df_reclamos[df_reclamos["Estado"] == "En curso"]
     
     filtro_sector = st.selectbox(
         "🔢 Filtrar por sector", 
@@ -186,7 +161,7 @@ def _mostrar_reclamos_en_curso(df_reclamos, df_clientes, sheet_reclamos, sheet_c
         # Limpiar el filtro si no hay reclamos
         if 'filtro_tecnicos_persistente' in st.session_state:
             st.session_state.filtro_tecnicos_persistente = []
-        return False
+        return
 
     # Filtro por técnicos
     tecnicos_unicos = sorted(set(
@@ -252,9 +227,9 @@ def _mostrar_reclamos_en_curso(df_reclamos, df_clientes, sheet_reclamos, sheet_c
 
     st.markdown("### ✏️ Acciones por reclamo:")
     
-    cambios = False
-    
-    for i, row in en_curso.iterrows():
+    for idx, row in paginated_list(en_curso, "cierre_en_curso", ORDEN_EN_CURSO).iterrows():
+        # El ID mantiene la clave al cambiar de página; sin ID se usa la fila
+        clave = row['ID Reclamo'] or idx
         with st.container():
             col1, col2, col3 = st.columns([3, 1, 1])
 
@@ -266,66 +241,48 @@ def _mostrar_reclamos_en_curso(df_reclamos, df_clientes, sheet_reclamos, sheet_c
                 st.markdown(f"📌 {row['Tipo de reclamo']}")
                 st.markdown(f"👷 {row['Técnico']}")
 
-                cliente_id = str(row["Nº Cliente"]).strip()
-                cliente_info = df_clientes[df_clientes["Nº Cliente"] == cliente_id]
-                precinto_actual = cliente_info["N° de Precinto"].values[0] if not cliente_info.empty else ""
+                precinto_actual = row["N° de Precinto_cliente"]
 
-                nuevo_precinto = st.text_input("🔒 Precinto", value=precinto_actual, key=f"precinto_{i}")
+                nuevo_precinto = st.text_input("🔒 Precinto", value=precinto_actual, key=f"precinto_{clave}")
 
             with col2:
-                if st.button("✅ Resuelto", key=f"resolver_{row['ID Reclamo']}", use_container_width=True):
-                    if _cerrar_reclamo(row, nuevo_precinto, precinto_actual, cliente_info, sheet_reclamos, sheet_clientes):
-                        # Guardar el filtro actual antes del rerun
+                if st.button("✅ Resuelto", key=f"resolver_{clave}", use_container_width=True):
+                    if _cerrar_reclamo(row, nuevo_precinto, precinto_actual, sheet_reclamos, sheet_clientes):
+                        # Guardar el filtro actual antes del rerun (el cambio ya está en los datos compartidos)
                         st.session_state.filtro_tecnicos_persistente = tecnicos_seleccionados
-                        st.session_state.force_refresh = True
-                        st.rerun()
+                        st.rerun(scope="fragment")
 
             with col3:
-                if st.button("↩️ Pendiente", key=f"volver_{row['ID Reclamo']}", use_container_width=True):
+                if st.button("↩️ Pendiente", key=f"volver_{clave}", use_container_width=True):
                     if _volver_a_pendiente(row, sheet_reclamos):
-                        # Guardar el filtro actual antes del rerun
+                        # Guardar el filtro actual antes del rerun (el cambio ya está en los datos compartidos)
                         st.session_state.filtro_tecnicos_persistente = tecnicos_seleccionados
-                        st.session_state.force_refresh = True
-                        st.rerun()
+                        st.rerun(scope="fragment")
 
             st.divider()
-    
-    return cambios
 
-def _cerrar_reclamo(row, nuevo_precinto, precinto_actual, cliente_info, sheet_reclamos, sheet_clientes):
+def _cerrar_reclamo(row, nuevo_precinto, precinto_actual, sheet_reclamos, sheet_clientes):
     try:
         with st.spinner("Cerrando reclamo..."):
-            time.sleep(1)
-            fila_index = row.name + 2
-
-            col_estado           = _col_letter("Estado")
-            col_fecha_formateada = _col_letter("Fecha_formateada")
-            col_precinto         = _col_letter("N° de Precinto")
-
             fecha_resolucion = ahora_argentina().strftime('%d/%m/%Y %H:%M')
 
-            updates = [
-                {"range": f"{col_estado}{fila_index}", "values": [["Resuelto"]]},
-                {"range": f"{col_fecha_formateada}{fila_index}", "values": [[fecha_resolucion]]},
-            ]
+            cambios = {
+                "Estado": "Resuelto",
+                "Fecha_formateada": fecha_resolucion
+            }
 
             if nuevo_precinto.strip() and nuevo_precinto != precinto_actual:
-                updates.append({"range": f"{col_precinto}{fila_index}", "values": [[nuevo_precinto.strip()]]})
-
-            success, error = api_manager.safe_sheet_operation(
-                batch_update_sheet,
-                sheet_reclamos,
-                updates,
-                is_batch=True
-            )
+                cambios["N° de Precinto"] = nuevo_precinto.strip()
+
+            success, error = update_row(sheet_reclamos, row["ID Reclamo"], cambios)
             
             if success:
-                if nuevo_precinto.strip() and nuevo_precinto != precinto_actual and not cliente_info.empty:
-                    index_cliente_en_clientes = cliente_info.index[0] + 2
-                    success_precinto, error_precinto = api_manager.safe_sheet_operation(
-                        sheet_clientes.update,
-                        f"F{index_cliente_en_clientes}",
-                        [[nuevo_precinto.strip()]]
+                if nuevo_precinto.strip() and nuevo_precinto != precinto_actual and row["Cliente registrado"]:
+                    success_precinto, error_precinto = update_row(
+                        sheet_clientes,
+                        row["Nº Cliente"],
+                        {"N° de Precinto": nuevo_precinto.strip()},
+                        columna="Nº Cliente"
                     )
                     if not success_precinto:
                         st.warning(f"⚠️ Precinto guardado en reclamo pero no en hoja de clientes: {error_precinto}")
@@ -346,25 +303,11 @@ def _cerrar_reclamo(row, nuevo_precinto, precinto_actual, cliente_info, sheet_re
 def _volver_a_pendiente(row, sheet_reclamos):
     try:
         with st.spinner("Cambiando estado..."):
-            time.sleep(1)
-            fila_index = row.name + 2
-
-            col_estado           = _col_letter("Estado")
-            col_tecnico          = _col_letter("Técnico")
-            col_fecha_formateada = _col_letter("Fecha_formateada")
-
-            updates = [
-                {"range": f"{col_estado}{fila_index}", "values": [["Pendiente"]]},
-                {"range": f"{col_tecnico}{fila_index}", "values": [[""]]},
-                {"range": f"{col_fecha_formateada}{fila_index}", "values": [[""]]},
-            ]
-
-            success, error = api_manager.safe_sheet_operation(
-                batch_update_sheet,
-                sheet_reclamos,
-                updates,
-                is_batch=True
-            )
+            success, error = update_row(sheet_reclamos, row["ID Reclamo"], {
+                "Estado": "Pendiente",
+                "Técnico": "",
+                "Fecha_formateada": ""
+            })
             
             if success:
                 st.success(f"🔄 Reclamo de {row['Nombre']} vuelto a PENDIENTE. Se borró la fecha de cierre.")
@@ -382,33 +325,30 @@ def _volver_a_pendiente(row, sheet_reclamos):
 
 def _mostrar_limpieza_reclamos(df_reclamos, sheet_reclamos):
     st.markdown("---")
-    st.markdown("### 🗑️ Limpieza de reclamos antiguos")
+    st.markdown("### 📦 Archivo de reclamos resueltos")
 
-    tz_argentina = pytz.timezone("America/Argentina/Buenos_Aires")
-    df_resueltos = df_reclamos[df_reclamos["Estado"] == "Resuelto"].copy()
-    df_resueltos["Fecha y hora"] = pd.to_datetime(df_resueltos["Fecha y hora"])
-    
-    if df_resueltos["Fecha y hora"].dt.tz is None:
-        df_resueltos["Fecha y hora"] = df_resueltos["Fecha y hora"].dt.tz_localize(tz_argentina)
-    else:
-        df_resueltos["Fecha y hora"] = df_resueltos["Fecha y hora"].dt.tz_convert(tz_argentina)
-    
-    df_resueltos["Dias_resuelto"] = (datetime.now(tz_argentina) - df_resueltos["Fecha y hora"]).dt.days
-    df_antiguos = df_resueltos[df_resueltos["Dias_resuelto"] > 10]
+    df_antiguos = claims_to_archive(df_reclamos, ARCHIVE_AFTER_DAYS)
 
-    st.markdown(f"📅 **Reclamos resueltos con más de 10 días:** {len(df_antiguos)}")
+    st.markdown(f"📅 **Reclamos resueltos hace más de {ARCHIVE_AFTER_DAYS} días:** {len(df_antiguos)}")
+    st.caption("Se mueven a hojas mensuales de archivo; el historial de cada cliente los sigue mostrando.")
 
     if len(df_antiguos) > 0:
         if st.button("🔍 Ver reclamos antiguos", key="ver_antiguos"):
-            st.dataframe(df_antiguos[["Fecha y hora", "Nº Cliente", "Nombre", "Sector", "Tipo de reclamo", "Dias_resuelto"]])
+            df_vista = df_antiguos.assign(Dias_resuelto=(ahora_argentina() - df_antiguos["_fecha_archivo"]).dt.days)
+            st.dataframe(df_vista[["Fecha y hora", "Nº Cliente", "Nombre", "Sector", "Tipo de reclamo", "Dias_resuelto"]])
         
-        if st.button("🗑️ Eliminar reclamos antiguos", key="eliminar_antiguos"):
-            with st.spinner("Eliminando reclamos antiguos..."):
+        if st.button("📦 Archivar reclamos antiguos", key="archivar_antiguos"):
+            with st.spinner("Archivando reclamos antiguos..."):
                 try:
-                    resultado = _eliminar_reclamos_antiguos(df_antiguos, sheet_reclamos)
-                    return resultado
+                    cantidad, error = archive_resolved_claims(sheet_reclamos, ARCHIVE_AFTER_DAYS)
+                    if error:
+                        st.error(f"❌ Error al archivar reclamos: {error}")
+                        return False
+                    if cantidad:
+                        st.success(f"📦 {cantidad} reclamo(s) archivados")
+                    return cantidad > 0
                 except Exception as e:
-                    st.error(f"❌ Error al eliminar reclamos: {str(e)}")
+                    st.error(f"❌ Error al archivar reclamos: {str(e)}")
                     if DEBUG_MODE:
                         st.exception(e)
     
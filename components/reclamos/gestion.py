@@ -2,9 +2,11 @@
 
 import streamlit as st
 import pandas as pd
-from utils.date_utils import parse_fecha, format_fecha
-from utils.api_manager import api_manager, batch_update_sheet
-from config.settings import SECTORES_DISPONIBLES, DEBUG_MODE
+from utils.date_utils import format_fecha
+from utils.data_manager import get_enriched_claims, get_search_index, update_row
+from utils.search_index import LIMITE_RESULTADOS
+from components.ui import paginated_list
+from config.settings import SECTORES_DISPONIBLES, WORKSHEET_RECLAMOS, DEBUG_MODE
 
 def render_gestion_reclamos(df_reclamos, df_clientes, sheet_reclamos, user):
     """
@@ -73,33 +75,14 @@ def render_gestion_reclamos(df_reclamos, df_clientes, sheet_reclamos, user):
 
 def _preparar_datos(df_reclamos, df_clientes):
     """Prepara y limpia los datos para su visualización"""
-    # Hacer copias para no modificar los dataframes originales
-    df = df_reclamos.copy()
-    df_clientes = df_clientes.copy()
-    
-    # Normalización de datos (una sola vez)
-    df_clientes["Nº Cliente"] = df_clientes["Nº Cliente"].astype(str).str.strip()
-    df["Nº Cliente"] = df["Nº Cliente"].astype(str).str.strip()
-    df["ID Reclamo"] = df["ID Reclamo"].astype(str).str.strip()
-
-    # Optimización: Solo traer las columnas necesarias de clientes
-    cols_clientes = ["Nº Cliente", "N° de Precinto", "Teléfono"]
-    df_clientes = df_clientes[cols_clientes].drop_duplicates(subset=["Nº Cliente"])
-
-    # Merge más eficiente con datos de clientes
-    df = pd.merge(
-        df, 
-        df_clientes,
-        on="Nº Cliente", 
-        how="left", 
-        suffixes=("", "_cliente")
-    )
+    # Reclamos ⨝ Clientes compartido (se calcula una vez por versión de las hojas);
+    # sort_values devuelve un DataFrame nuevo, así que se puede agregar columnas
+    df = get_enriched_claims(df_reclamos, df_clientes).sort_values("Fecha y hora", ascending=False)
 
     # Procesamiento de fechas
     if 'Fecha y hora' in df.columns:
-        df["Fecha y hora"] = df["Fecha y hora"].apply(parse_fecha)
-        df["Fecha_formateada"] = df["Fecha y hora"].apply(
-            lambda x: format_fecha(x, '%d/%m/%Y %H:%M')
+        df["Fecha_formateada"] = (
+            df["Fecha y hora"].dt.strftime('%d/%m/%Y %H:%M').fillna("Fecha no disponible")
         )
 
         # Validación de fechas
@@ -107,7 +90,7 @@ def _preparar_datos(df_reclamos, df_clientes):
             num_fechas_invalidas = df["Fecha y hora"].isna().sum()
             st.warning(f"⚠️ {num_fechas_invalidas} reclamos tienen fechas inválidas o faltantes")
 
-    return df.sort_values("Fecha y hora", ascending=False)
+    return df
 
 def _mostrar_estadisticas(df):
     """Muestra estadísticas visuales de reclamos activos (no produce cambios)"""
@@ -130,6 +113,7 @@ def _mostrar_estadisticas(df):
         # Distribución por tipo
         st.markdown("#### Por tipo de reclamo")
         conteo_por_tipo = df_activos["Tipo de reclamo"].value_counts().sort_index()
+        conteo_por_tipo = conteo_por_tipo[conteo_por_tipo > 0]  # category: omite los tipos sin reclamos
         
         for i in range(0, len(conteo_por_tipo), 4):
             cols = st.columns(4)
@@ -200,36 +184,37 @@ def _mostrar_edicion_reclamo(df, sheet_reclamos):
     st.markdown("---")
     st.markdown("### ✏️ Editar un reclamo puntual")
     
-    # Crear selector mejorado (sin UUID visible)
-    df["selector"] = df.apply(
-        lambda x: f"{x['Nº Cliente']} - {x['Nombre']} ({x['Estado']})", 
-        axis=1
+    # Búsqueda en el índice del snapshot: el selector recibe solo las mejores coincidencias
+    busqueda = st.text_input(
+        "🔍 Buscar por número de cliente, nombre, dirección o teléfono",
+        key="buscar_reclamo_edicion"
     )
-    
-    # Añadir búsqueda por número de cliente o nombre
-    busqueda = st.text_input("🔍 Buscar por número de cliente o nombre")
-    
-    # Filtrar opciones basadas en la búsqueda
-    opciones_filtradas = [""] + df["selector"].tolist()
-    if busqueda:
-        opciones_filtradas = [""] + [
-            opc for opc in df["selector"].tolist() 
-            if busqueda.lower() in opc.lower()
-        ]
-    
+
+    if busqueda.strip():
+        opciones = get_search_index(WORKSHEET_RECLAMOS).search(
+            busqueda, LIMITE_RESULTADOS, dentro_de=df.index
+        )
+        if not opciones:
+            st.info("🔍 No hay reclamos que coincidan con la búsqueda.")
+            return False
+    else:
+        # Sin búsqueda se ofrecen los más recientes (df viene ordenado por fecha)
+        opciones = df.index[:LIMITE_RESULTADOS].tolist()
+
     seleccion = st.selectbox(
         "Seleccioná un reclamo para editar", 
-        opciones_filtradas,
-        index=0
+        [None] + opciones,
+        index=0,
+        format_func=lambda i: "" if i is None else (
+            f"{df.at[i, 'Nº Cliente']} - {df.at[i, 'Nombre']} ({df.at[i, 'Estado']})"
+        )
     )
 
-    if not seleccion:
+    if seleccion is None:
         return False
 
-    # Obtener el ID del reclamo (usando el UUID interno)
-    numero_cliente = seleccion.split(" - ")[0]
-    reclamo_actual = df[df["Nº Cliente"] == numero_cliente].iloc[0]
-    reclamo_id = reclamo_actual["ID Reclamo"]  # <-- Esto sigue usando el UUID internamente
+    reclamo_actual = df.loc[seleccion]
+    reclamo_id = reclamo_actual["ID Reclamo"]
 
     # Mostrar información del reclamo
     with st.expander("📄 Información del reclamo", expanded=True):
@@ -349,35 +334,29 @@ def _actualizar_reclamo(df, sheet_reclamos, reclamo_id, updates, full_update=Fal
     
     with st.spinner("Actualizando reclamo..."):
         try:
-            fila = df[df["ID Reclamo"] == reclamo_id].index[0] + 2
-            updates_list = []
+            cambios = {}
             estado_anterior = df[df["ID Reclamo"] == reclamo_id]["Estado"].values[0]
 
             if full_update:
-                # ✅ Mapeo corregido de columnas según tu hoja
-                updates_list.extend([
-                    {"range": f"E{fila}", "values": [[updates['direccion'].upper()]]},  # Dirección
-                    {"range": f"F{fila}", "values": [[str(updates['telefono'])]]},     # Teléfono
-                    {"range": f"G{fila}", "values": [[updates['tipo_reclamo']]]},      # Tipo reclamo
-                    {"range": f"H{fila}", "values": [[updates['detalles']]]},          # Detalles
-                    {"range": f"K{fila}", "values": [[updates['precinto']]]},          # Precinto
-                    {"range": f"C{fila}", "values": [[str(updates['sector'])]]},       # Sector
-                ])
-
-            # ✅ Estado (columna I)
-            updates_list.append({"range": f"I{fila}", "values": [[updates['estado']]]})
-
-            # Si pasa a pendiente, limpiar columna J (técnico)
+                # ✅ Columnas por nombre según el encabezado de la hoja
+                cambios.update({
+                    "Dirección": updates['direccion'].upper(),
+                    "Teléfono": str(updates['telefono']),
+                    "Tipo de reclamo": updates['tipo_reclamo'],
+                    "Detalles": updates['detalles'],
+                    "N° de Precinto": updates['precinto'],
+                    "Sector": str(updates['sector']),
+                })
+
+            # ✅ Estado
+            cambios["Estado"] = updates['estado']
+
+            # Si pasa a pendiente, limpiar el técnico
             if updates['estado'] == "Pendiente":
-                updates_list.append({"range": f"J{fila}", "values": [[""]]})
+                cambios["Técnico"] = ""
 
             # Guardar en Google Sheets
-            success, error = api_manager.safe_sheet_operation(
-                batch_update_sheet, 
-                sheet_reclamos, 
-                updates_list, 
-                is_batch=True
-            )
+            success, error = update_row(sheet_reclamos, reclamo_id, cambios)
 
             if success:
                 st.success("✅ Reclamo actualizado correctamente.")
@@ -410,8 +389,8 @@ def _gestionar_desconexiones(df, sheet_reclamos):
     st.markdown("### 🔌 Gestión de Desconexiones a Pedido")
 
     desconexiones = df[
-        (df["Tipo de reclamo"].str.strip().str.lower() == "desconexion a pedido") &
-        (df["Estado"].str.strip().str.lower() == "desconexión")
+        (df["Tipo de reclamo"] == "Desconexion a Pedido") &
+        (df["Estado"] == "Desconexión")
     ]
 
     if desconexiones.empty:
@@ -422,7 +401,13 @@ def _gestionar_desconexiones(df, sheet_reclamos):
     
     cambios = False
     
-    for i, row in desconexiones.iterrows():
+    orden = {
+        "Fecha de ingreso": ("Fecha y hora", True),
+        "Sector": ("Sector", True)
+    }
+    for idx, row in paginated_list(desconexiones, "gestion_desconexiones", orden).iterrows():
+        # El ID mantiene la clave al cambiar de página; sin ID se usa la fila
+        clave = row['ID Reclamo'] or idx
         with st.container():
             col1, col2 = st.columns([4, 1])
             
@@ -431,7 +416,7 @@ def _gestionar_desconexiones(df, sheet_reclamos):
                 st.markdown(f"📅 {format_fecha(row['Fecha y hora'])} - Sector {row['Sector']}")
             
             with col2:
-                if st.button("✅ Marcar como resuelto", key=f"resuelto_{i}", use_container_width=True):
+                if st.button("✅ Marcar como resuelto", key=f"resuelto_{clave}", use_container_width=True):
                     if _marcar_desconexion_como_resuelta(row, sheet_reclamos):
                         cambios = True
             
@@ -443,12 +428,7 @@ def _marcar_desconexion_como_resuelta(row, sheet_reclamos):
     """Marca una desconexión como resuelta en la hoja de cálculo"""
     with st.spinner("Actualizando estado..."):
         try:
-            fila = row.name + 2
-            success, error = api_manager.safe_sheet_operation(
-                sheet_reclamos.update, 
-                f"I{fila}", 
-                [["Resuelto"]]
-            )
+            success, error = update_row(sheet_reclamos, row["ID Reclamo"], {"Estado": "Resuelto"})
             
             if success:
                 st.success(f"✅ Desconexión de {row['Nombre']} marcada como resuelta.")
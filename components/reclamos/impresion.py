@@ -9,6 +9,7 @@ from reportlab.pdfgen import canvas
 from utils.date_utils import format_fecha, parse_fecha
 from utils.pdf_utils import agregar_pie_pdf
 from utils.date_utils import ahora_argentina
+from utils.data_manager import get_enriched_claims
 from utils.reporte_diario import *
 
 
@@ -113,33 +114,19 @@ def render_impresion_reclamos(df_reclamos, df_clientes, user):
     return result
 
 def _preparar_datos(df_reclamos, df_clientes, user):
-    """Prepara y combina los datos para impresión incluyendo info de usuario"""
-    df_pdf = df_reclamos.copy()
-    
-    # Procesamiento de fechas
-    df_pdf["Fecha y hora"] = pd.to_datetime(
-        df_pdf["Fecha y hora"], 
-        dayfirst=True, 
-        errors='coerce'
-    )
-    
-    # Agregar información del usuario a los datos
-    df_pdf["Usuario_impresion"] = user.get('nombre', 'Sistema')
+    """
+    Reclamos con los datos de su cliente para impresión (de solo lectura)
     
-    # Merge con clientes (optimizado)
-    return pd.merge(
-        df_pdf,
-        df_clientes[["Nº Cliente", "N° de Precinto"]].drop_duplicates(),
-        on="Nº Cliente",
-        how="left",
-        suffixes=("", "_cliente")
-    )
+    Es el Reclamos ⨝ Clientes compartido: no se copia ni se vuelve a hacer el
+    merge en cada rerun. El usuario que imprime se pasa aparte a cada PDF.
+    """
+    return get_enriched_claims(df_reclamos, df_clientes)
 
 def _mostrar_reclamos_pendientes(df_merged):
     """Muestra tabla de reclamos pendientes con mejor formato"""
     with st.expander("🕒 Reclamos pendientes de resolución", expanded=True):
         df_pendientes = df_merged[
-            df_merged["Estado"].astype(str).str.strip().str.lower() == "pendiente"
+            df_merged["Estado"] == "Pendiente"
         ]
         
         if not df_pendientes.empty:
@@ -189,7 +176,7 @@ def _generar_pdf_todos_pendientes(df_merged, usuario=None):
     
     # Filtrar solo pendientes
     df_pendientes = df_merged[
-        df_merged["Estado"].astype(str).str.strip().str.lower() == "pendiente"
+        df_merged["Estado"] == "Pendiente"
     ]
     
     if df_pendientes.empty:
@@ -243,10 +230,10 @@ def _generar_pdf_por_tipo(df_merged, solo_pendientes, usuario=None):
         return None
 
     # Aplicar filtros
-    df_filtrado = df_merged.copy()
+    df_filtrado = df_merged
     if solo_pendientes:
         df_filtrado = df_filtrado[
-            df_filtrado["Estado"].str.strip().str.lower() == "pendiente"
+            df_filtrado["Estado"] == "Pendiente"
         ]
     
     reclamos_filtrados = df_filtrado[
@@ -284,10 +271,10 @@ def _generar_pdf_manual(df_merged, solo_pendientes, usuario=None):
     """Genera PDF con selección manual de reclamos"""
     st.markdown("### 📋 Selección manual de reclamos")
 
-    df_filtrado = df_merged.copy()
+    df_filtrado = df_merged
     if solo_pendientes:
         df_filtrado = df_filtrado[
-            df_filtrado["Estado"].astype(str).str.strip().str.lower() == "pendiente"
+            df_filtrado["Estado"] == "Pendiente"
         ]
 
     # Selector mejorado con más información
@@ -368,7 +355,7 @@ def _crear_pdf_reclamos(df_reclamos, titulo, usuario=None):
         lineas = [
             f"Fecha: {fecha_pdf}",
             f"Dirección: {reclamo['Dirección']} - Tel: {reclamo['Teléfono']}",
-            f"Sector: {reclamo['Sector']} - Precinto: {reclamo.get('N° de Precinto') or 'N/A'}",
+            f"Sector: {reclamo['Sector']} - Precinto: {reclamo.get('N° de Precinto') or reclamo.get('N° de Precinto_cliente') or 'N/A'}",
             f"Tipo: {reclamo['Tipo de reclamo']}",
             f"Detalles: {reclamo['Detalles'][:100]}..." if len(reclamo['Detalles']) > 100 else f"Detalles: {reclamo['Detalles']}"
         ]
@@ -391,8 +378,8 @@ def _generar_pdf_desconexiones(df_merged, usuario=None):
     st.markdown("### 🔌 Imprimir Desconexiones a Pedido")
 
     df_desconexiones = df_merged[
-        (df_merged["Tipo de reclamo"].str.strip().str.lower() == "desconexion a pedido") &
-        (df_merged["Estado"].str.strip().str.lower() == "desconexión")
+        (df_merged["Tipo de reclamo"] == "Desconexion a Pedido") &
+        (df_merged["Estado"] == "Desconexión")
     ]
 
     if df_desconexiones.empty:
@@ -426,14 +413,14 @@ def _generar_pdf_en_curso_por_tecnico(df_merged, usuario=None):
     st.markdown("### 👷 Imprimir reclamos EN CURSO")
 
     df_en_curso = df_merged[
-        df_merged["Estado"].astype(str).str.strip().str.lower() == "en curso"
+        df_merged["Estado"] == "En curso"
     ].copy()
 
     if df_en_curso.empty:
         st.info("✅ No hay reclamos en curso para imprimir.")
         return None
 
-    df_en_curso["Técnico"] = df_en_curso["Técnico"].fillna("Sin técnico").str.upper()
+    df_en_curso["Técnico"] = df_en_curso["Técnico"].astype(str).replace("", "Sin técnico").str.upper()
     reclamos_por_tecnico = df_en_curso.groupby("Técnico")
 
     if st.button("📄 Generar PDF de reclamos en curso por técnico", key="pdf_en_curso_tecnico"):
@@ -3,8 +3,8 @@ import streamlit as st
 import pandas as pd
 from datetime import datetime
 from utils.date_utils import ahora_argentina, format_fecha, parse_fecha
-from utils.api_manager import api_manager
-from utils.data_manager import batch_update_sheet
+from utils.data_manager import build_row, get_active_claims, get_client_record
+from utils.unit_of_work import UnitOfWork
 from config.settings import (
     SECTORES_DISPONIBLES,
     TIPOS_RECLAMO,
@@ -12,19 +12,6 @@ from config.settings import (
 )
 
 # --- FUNCIONES HELPER NUEVAS ---
-def _normalizar_datos(df_clientes, df_reclamos, nro_cliente):
-    """Normaliza datos solo cuando es necesario"""
-    if not nro_cliente:
-        return df_clientes, df_reclamos
-    
-    df_clientes_normalizado = df_clientes.copy()
-    df_reclamos_normalizado = df_reclamos.copy()
-    
-    df_clientes_normalizado["Nº Cliente"] = df_clientes_normalizado["Nº Cliente"].astype(str).str.strip()
-    df_reclamos_normalizado["Nº Cliente"] = df_reclamos_normalizado["Nº Cliente"].astype(str).str.strip()
-    
-    return df_clientes_normalizado, df_reclamos_normalizado
-
 def _validar_y_normalizar_sector(sector_input):
     """Valida y normaliza el sector ingresado"""
     try:
@@ -39,22 +26,6 @@ def _validar_y_normalizar_sector(sector_input):
     except ValueError:
         return None, f"⚠️ El sector debe ser un número válido. Se ingresó: {sector_input}"
 
-def _verificar_reclamos_activos(nro_cliente, df_reclamos):
-    """Verifica reclamos activos de forma eficiente"""
-    if nro_cliente not in df_reclamos["Nº Cliente"].values:
-        return pd.DataFrame()
-    
-    reclamos_cliente = df_reclamos[df_reclamos["Nº Cliente"] == nro_cliente]
-    
-    # Convertir estados a minúsculas para comparación case-insensitive
-    estados_activos = ["pendiente", "en curso"]
-    reclamos_activos = reclamos_cliente[
-        reclamos_cliente["Estado"].str.strip().str.lower().isin(estados_activos) |
-        (reclamos_cliente["Tipo de reclamo"].str.strip().str.lower() == "Desconexion a Pedido")
-    ]
-    
-    return reclamos_activos
-
 def generar_id_unico():
     """Genera un ID único para reclamos"""
     import uuid
@@ -81,31 +52,24 @@ def render_nuevo_reclamo(df_reclamos, df_clientes, sheet_reclamos, sheet_cliente
     ).strip()
 
     if estado['nro_cliente']:
-        # Normalizar datos solo cuando sea necesario
-        df_clientes_norm, df_reclamos_norm = _normalizar_datos(
-            df_clientes, df_reclamos, estado['nro_cliente']
-        )
-        
-        # Buscar cliente
-        match = df_clientes_norm[df_clientes_norm["Nº Cliente"] == estado['nro_cliente']]
+        # Búsqueda en los índices del snapshot (O(1), sin copiar DataFrames)
+        estado['cliente_existente'] = get_client_record(estado['nro_cliente'])
         
-        if not match.empty:
-            estado['cliente_existente'] = match.iloc[0].to_dict()
+        if estado['cliente_existente']:
             st.success("✅ Cliente reconocido, datos auto-cargados.")
-
         else:
             estado['cliente_nuevo'] = True
             st.info("ℹ️ Este cliente no existe en la base y se cargará como cliente nuevo.")
         
         # Verificar reclamos activos
-        reclamos_activos = _verificar_reclamos_activos(estado['nro_cliente'], df_reclamos_norm)
+        reclamos_activos = get_active_claims(estado['nro_cliente'])
         
-        if not reclamos_activos.empty:
+        if reclamos_activos:
             estado['formulario_bloqueado'] = True
             st.error("⚠️ Este cliente ya tiene un reclamo sin resolver o una desconexión activa.")
             
             # Mostrar reclamos activos
-            for _, reclamo in reclamos_activos.iterrows():
+            for reclamo in reclamos_activos:
                 with st.expander(f"🔍 Reclamo activo - {format_fecha(reclamo['Fecha y hora'], '%d/%m/%Y %H:%M')}"):
                     st.markdown(f"**👤 Cliente:** {reclamo.get('Nombre', 'N/A')}")
                     st.markdown(f"**📌 Tipo:** {reclamo.get('Tipo de reclamo', 'N/A')}")
@@ -115,12 +79,12 @@ def render_nuevo_reclamo(df_reclamos, df_clientes, sheet_reclamos, sheet_cliente
     if estado['reclamo_guardado']:
         st.success("✅ Reclamo registrado correctamente.")
     elif not estado['formulario_bloqueado']:
-        estado = _mostrar_formulario_reclamo(estado, df_clientes, sheet_reclamos, sheet_clientes, current_user)
+        estado = _mostrar_formulario_reclamo(estado, sheet_reclamos, sheet_clientes, current_user)
 
     return estado
 
 # --- FUNCIÓN DE FORMULARIO MEJORADA ---
-def _mostrar_formulario_reclamo(estado, df_clientes, sheet_reclamos, sheet_clientes, current_user):
+def _mostrar_formulario_reclamo(estado, sheet_reclamos, sheet_clientes, current_user):
     """Muestra y procesa el formulario de nuevo reclamo"""
     with st.form("reclamo_formulario", clear_on_submit=False):
         col1, col2 = st.columns(2)
@@ -189,14 +153,14 @@ def _mostrar_formulario_reclamo(estado, df_clientes, sheet_reclamos, sheet_clien
         estado = _procesar_envio_formulario(
             estado, nombre, direccion, telefono, sector, 
             tipo_reclamo, detalles, precinto, atendido_por,
-            df_clientes, sheet_reclamos, sheet_clientes
+            sheet_reclamos, sheet_clientes
         )
     
     return estado
 
 # --- FUNCIÓN DE PROCESAMIENTO OPTIMIZADA ---
 def _procesar_envio_formulario(estado, nombre, direccion, telefono, sector, tipo_reclamo, 
-                              detalles, precinto, atendido_por, df_clientes, sheet_reclamos, sheet_clientes):
+                              detalles, precinto, atendido_por, sheet_reclamos, sheet_clientes):
     """Procesa el envío del formulario de manera optimizada"""
     
     # Validar campos obligatorios
@@ -224,31 +188,42 @@ def _procesar_envio_formulario(estado, nombre, direccion, telefono, sector, tipo
         try:
             # Preparar datos del reclamo
             fecha_hora = ahora_argentina()
-            estado_reclamo = "Desconexión" if tipo_reclamo.lower() == "Desconexion a Pedido" else "Pendiente"
+            estado_reclamo = "Desconexión" if tipo_reclamo == "Desconexion a Pedido" else "Pendiente"
             id_reclamo = generar_id_unico()
 
-            fila_reclamo = [
-                format_fecha(fecha_hora),
-                estado['nro_cliente'],
-                sector_normalizado,
-                nombre.upper(),
-                direccion.upper(),
-                telefono.strip(),
-                tipo_reclamo,
-                detalles.upper(),
-                estado_reclamo,
-                "",  # Técnico (vacío inicialmente)
-                precinto.strip(),
-                atendido_por.upper(),
-                "", "", "",  # Campos adicionales
-                id_reclamo
-            ]
+            fila_reclamo = build_row(sheet_reclamos.title, {
+                "Fecha y hora": format_fecha(fecha_hora),
+                "Nº Cliente": estado['nro_cliente'],
+                "Sector": sector_normalizado,
+                "Nombre": nombre.upper(),
+                "Dirección": direccion.upper(),
+                "Teléfono": telefono.strip(),
+                "Tipo de reclamo": tipo_reclamo,
+                "Detalles": detalles.upper(),
+                "Estado": estado_reclamo,
+                "Técnico": "",  # Vacío inicialmente
+                "N° de Precinto": precinto.strip(),
+                "Atendido por": atendido_por.upper(),
+                "ID Reclamo": id_reclamo
+            })
 
-            # Guardar reclamo
-            success, error = api_manager.safe_sheet_operation(
-                sheet_reclamos.append_row,
-                fila_reclamo
+            # Reclamo, cliente y notificación se confirman juntos en un único pedido a la API
+            uow = UnitOfWork().append("reclamo", sheet_reclamos, [fila_reclamo])
+            accion_cliente = _gestionar_cliente(
+                uow, estado['nro_cliente'], sector_normalizado, nombre,
+                direccion, telefono, precinto, estado['cliente_existente'], sheet_clientes
             )
+            notification_manager = st.session_state.get('notification_manager')
+            if notification_manager:
+                uow.append("notificacion", notification_manager.sheet, [notification_manager.build_row(
+                    notification_type="nuevo_reclamo",
+                    message=f"📝 Nuevo reclamo {id_reclamo} - {tipo_reclamo}",
+                    user_target="all",
+                    claim_id=id_reclamo
+                )])
+
+            resultados = uow.commit()
+            success, error = resultados["reclamo"]
 
             if success:
                 estado.update({
@@ -257,26 +232,24 @@ def _procesar_envio_formulario(estado, nombre, direccion, telefono, sector, tipo
                 })
                 
                 st.success(f"✅ Reclamo guardado - ID: {id_reclamo}")
-                
-                # Gestionar cliente (nuevo o actualización)
-                _gestionar_cliente(
-                    estado['nro_cliente'], sector_normalizado, nombre, 
-                    direccion, telefono, precinto, df_clientes, sheet_clientes
-                )
-                
-                # Notificación
-                if 'notification_manager' in st.session_state:
-                    st.session_state.notification_manager.add(
-                        notification_type="nuevo_reclamo",
-                        message=f"📝 Nuevo reclamo {id_reclamo} - {tipo_reclamo}",
-                        user_target="all",
-                        claim_id=id_reclamo
-                    )
-                
-                st.cache_data.clear()
 
-                # 🔄 Forzar recarga para limpiar el formulario y mostrar reclamo activo
-                st.rerun()
+                completo = True
+                if accion_cliente:
+                    success_cliente, error_cliente = resultados["cliente"]
+                    if success_cliente:
+                        st.info(accion_cliente)
+                    else:
+                        completo = False
+                        st.warning(f"⚠️ No se pudieron guardar los datos del cliente: {error_cliente}")
+                if "notificacion" in resultados and not resultados["notificacion"][0]:
+                    completo = False
+                    st.warning(f"⚠️ No se pudo enviar la notificación: {resultados['notificacion'][1]}")
+                
+                # 🔄 Recargar para limpiar el formulario y mostrar el reclamo activo
+                # (el reclamo ya se agregó a los datos compartidos, no se vuelve a leer la hoja);
+                # si falló alguna parte se deja el aviso a la vista
+                if completo:
+                    st.rerun()
                 
             else:
                 st.error(f"❌ Error al guardar: {error}")
@@ -288,37 +261,36 @@ def _procesar_envio_formulario(estado, nombre, direccion, telefono, sector, tipo
     
     return estado
 
-def _gestionar_cliente(nro_cliente, sector, nombre, direccion, telefono, precinto, df_clientes, sheet_clientes):
-    """Gestiona la creación o actualización del cliente"""
-    cliente_existente = df_clientes[df_clientes["Nº Cliente"] == nro_cliente]
+def _gestionar_cliente(uow, nro_cliente, sector, nombre, direccion, telefono, precinto, cliente_existente, sheet_clientes):
+    """
+    Agrega a la unidad de trabajo el alta o la actualización del cliente
+    
+    Args:
+        cliente_existente: registro del índice de clientes, o None si es nuevo
     
-    if cliente_existente.empty:
+    Returns:
+        str: mensaje para mostrar si se confirma, o None si no hay nada que escribir
+    """
+    campos = {
+        "Sector": sector,
+        "Nombre": nombre.upper(),
+        "Dirección": direccion.upper(),
+        "Teléfono": telefono.strip(),
+        "N° de Precinto": precinto.strip()
+    }
+
+    if not cliente_existente:
         # Crear nuevo cliente
-        fila_cliente = [nro_cliente, sector, nombre.upper(), direccion.upper(), telefono.strip(), precinto.strip()]
-        success, _ = api_manager.safe_sheet_operation(sheet_clientes.append_row, fila_cliente)
-        if success:
-            st.info("ℹ️ Nuevo cliente registrado")
-    else:
-        # Actualizar cliente existente
-        updates = []
-        idx = cliente_existente.index[0] + 2
-        
-        campos_actualizar = {
-            "B": ("Sector", sector),
-            "C": ("Nombre", nombre.upper()),
-            "D": ("Dirección", direccion.upper()),
-            "E": ("Teléfono", telefono.strip()),
-            "F": ("N° de Precinto", precinto.strip())
-        }
-        
-        for col, (campo, nuevo_valor) in campos_actualizar.items():
-            valor_actual = str(cliente_existente.iloc[0][campo]).strip() if campo in cliente_existente.columns else ""
-            if valor_actual != nuevo_valor:
-                updates.append({"range": f"{col}{idx}", "values": [[nuevo_valor]]})
-        
-        if updates:
-            success, _ = api_manager.safe_sheet_operation(
-                batch_update_sheet, sheet_clientes, updates, is_batch=True
-            )
-            if success:
-                st.info("🔁 Datos del cliente actualizados")
\ No newline at end of file
+        uow.upsert("cliente", sheet_clientes, nro_cliente, campos, columna="Nº Cliente")
+        return "ℹ️ Nuevo cliente registrado"
+
+    # Actualizar solo los campos que cambiaron
+    cambios = {
+        campo: nuevo_valor for campo, nuevo_valor in campos.items()
+        if str(cliente_existente.get(campo, "")).strip() != nuevo_valor
+    }
+    if not cambios:
+        return None
+
+    uow.upsert("cliente", sheet_clientes, nro_cliente, cambios, columna="Nº Cliente")
+    return "🔁 Datos del cliente actualizados"
@@ -7,17 +7,27 @@ from datetime import datetime
 from reportlab.lib.pagesizes import A4
 from reportlab.pdfgen import canvas
 from utils.date_utils import parse_fecha, format_fecha
-from utils.api_manager import api_manager, batch_update_sheet
+from utils.data_manager import get_current_frame, get_enriched_claims, update_rows
 from utils.pdf_utils import agregar_pie_pdf
+from components.ui import paginated_list
 from config.settings import (
     SECTORES_DISPONIBLES,
     TECNICOS_DISPONIBLES,
     MATERIALES_POR_RECLAMO,
-    ROUTER_POR_SECTOR
+    ROUTER_POR_SECTOR,
+    WORKSHEET_RECLAMOS,
+    WORKSHEET_CLIENTES,
+    DEBUG_MODE
 )
 
 GRUPOS_POSIBLES = [f"Grupo {letra}" for letra in "ABCDE"]
 
+ORDEN_DISPONIBLES = {
+    "Fecha más reciente": ("Fecha y hora", False),
+    "Sector": ("Sector", True),
+    "Tipo de reclamo": ("Tipo de reclamo", True)
+}
+
 # Mapeo de sectores cercanos por zona
 SECTORES_VECINOS = {
     "Zona 1": ["1", "2", "3", "4"],
@@ -57,7 +67,7 @@ def agrupar_zonas_completas(zonas, grupos, df_reclamos, permitir_redistribucion=
     for zona in zonas:
         sectores_zona = SECTORES_VECINOS.get(zona, [])
         total_reclamos = len(df_reclamos[
-            df_reclamos["Sector"].astype(str).isin(sectores_zona) &
+            df_reclamos["Sector"].isin(sectores_zona) &
             (df_reclamos["Estado"] == "Pendiente")
         ])
         reclamos_por_zona[zona] = total_reclamos
@@ -308,16 +318,12 @@ def _mostrar_reclamos_disponibles(df_reclamos, grupos_activos):
     st.markdown("---")
     st.markdown("### 📋 Reclamos pendientes para asignar")
 
-    df_reclamos.columns = df_reclamos.columns.str.strip()
-    df_reclamos["ID Reclamo"] = df_reclamos["ID Reclamo"].astype(str).str.strip()
-    df_reclamos["Fecha y hora"] = pd.to_datetime(df_reclamos["Fecha y hora"], dayfirst=True, errors='coerce')
-
     # Verificamos si hay IDs vacíos
     if df_reclamos["ID Reclamo"].eq("").any():
         st.error("❌ Hay reclamos con ID vacío. Por favor, corregílos en la hoja antes de continuar.")
         return None
 
-    df_pendientes = df_reclamos[df_reclamos["Estado"] == "Pendiente"].copy()
+    df_pendientes = df_reclamos[df_reclamos["Estado"] == "Pendiente"]
 
     # Filtros
     col1, col2 = st.columns(2)
@@ -332,21 +338,13 @@ def _mostrar_reclamos_disponibles(df_reclamos, grupos_activos):
     if filtro_tipo != "Todos":
         df_pendientes = df_pendientes[df_pendientes["Tipo de reclamo"] == filtro_tipo]
 
-    orden = st.selectbox("🔃 Ordenar reclamos por:", ["Fecha más reciente", "Sector", "Tipo de reclamo"])
-    if orden == "Fecha más reciente":
-        df_pendientes = df_pendientes.sort_values("Fecha y hora", ascending=False)
-    elif orden == "Sector":
-        df_pendientes = df_pendientes.sort_values("Sector")
-    elif orden == "Tipo de reclamo":
-        df_pendientes = df_pendientes.sort_values("Tipo de reclamo")
-
     asignados = [r for reclamos in st.session_state.asignaciones_grupos.values() for r in reclamos]
     df_disponibles = df_pendientes[~df_pendientes["ID Reclamo"].isin(asignados)]
 
     if df_disponibles.empty:
         st.info("🎉 No hay reclamos pendientes disponibles.")
     else:
-        for idx, row in df_disponibles.iterrows():
+        for _, row in paginated_list(df_disponibles, "planificacion_disponibles", ORDEN_DISPONIBLES).iterrows():
             with st.container():
                 col1, *cols_grupo = st.columns([4] + [1] * grupos_activos)
                 resumen = f"📍 Sector {row['Sector']} - {row['Tipo de reclamo'].capitalize()} - {_format_fecha_reclamo(row['Fecha y hora'])}"
@@ -355,11 +353,11 @@ def _mostrar_reclamos_disponibles(df_reclamos, grupos_activos):
             for i, grupo in enumerate(GRUPOS_POSIBLES[:grupos_activos]):
                 tecnicos = st.session_state.tecnicos_grupos[grupo]
                 tecnicos_str = ", ".join(tecnicos[:2]) + ("..." if len(tecnicos) > 2 else "") if tecnicos else "Sin técnicos"
-                button_key = f"asignar_{grupo}_{row['ID Reclamo']}_{idx}"
+                button_key = f"asignar_{grupo}_{row['ID Reclamo']}"
                 if cols_grupo[i].button(f"➡️{grupo[-1]} ({tecnicos_str})", key=button_key):
                     if row["ID Reclamo"] not in asignados:
                         st.session_state.asignaciones_grupos[grupo].append(row["ID Reclamo"])
-                        st.rerun()
+                        st.rerun(scope="fragment")
 
             with col1.expander("🔍 Ver detalles"):
                 _mostrar_detalles_reclamo(row)
@@ -399,7 +397,7 @@ def _limpiar_asignaciones(df_reclamos):
             if str(id) in ids_validos
         ]
 
-def render_planificacion_grupos(df_reclamos, sheet_reclamos, user):
+def render_planificacion_grupos(df_reclamos, df_clientes, sheet_reclamos, user):
     if user.get('rol') != 'admin':
         st.warning("⚠️ Solo los administradores pueden acceder a esta sección")
         return {'needs_refresh': False}
@@ -407,6 +405,8 @@ def render_planificacion_grupos(df_reclamos, sheet_reclamos, user):
     st.subheader("📋 Asignación de reclamos a grupos de trabajo")
 
     try:
+        # Reclamos ⨝ Clientes compartido (de solo lectura): el PDF usa el precinto del cliente
+        df_reclamos = get_enriched_claims(df_reclamos, df_clientes)
         inicializar_estado_grupos()
         _limpiar_asignaciones(df_reclamos)
 
@@ -460,34 +460,51 @@ def render_planificacion_grupos(df_reclamos, sheet_reclamos, user):
                 st.rerun()
 
         if st.button("🔄 Refrescar reclamos"):
-            st.cache_data.clear()
+            # app.py invalida las hojas del componente antes del rerun
             return {'needs_refresh': True}
 
         _mostrar_asignacion_tecnicos(grupos_activos)
-        df_pendientes = _mostrar_reclamos_disponibles(df_reclamos, grupos_activos)
-
-        if df_pendientes is not None:
-            materiales_por_grupo = _mostrar_reclamos_asignados(df_pendientes, grupos_activos)
-            cambios = _mostrar_acciones_finales(
-                df_reclamos, sheet_reclamos, 
-                grupos_activos, materiales_por_grupo, df_pendientes
-            )
-            return {'needs_refresh': cambios}
+        # Fragment: asignar (➡️) o quitar (❌) re-ejecuta solo las listas; guardar
+        # cambia la versión de los datos y ahí sí se re-ejecuta la página completa
+        _mostrar_listas_asignacion(sheet_reclamos, grupos_activos)
 
         return {'needs_refresh': False}
 
     except Exception as e:
         st.error(f"❌ Error en la planificación: {str(e)}")
-        if 'DEBUG_MODE' in globals() and DEBUG_MODE:
+        if DEBUG_MODE:
             st.exception(e)
         return {'needs_refresh': False}
 
+@st.fragment
+def _mostrar_listas_asignacion(sheet_reclamos, grupos_activos):
+    """
+    Reclamos disponibles, asignados por grupo y acciones finales, como fragment
+    
+    Al re-ejecutarse solo, lee el snapshot publicado (Reclamos ⨝ Clientes
+    compartido) en lugar de los DataFrames de la última corrida completa.
+    """
+    try:
+        df_reclamos = get_enriched_claims(get_current_frame(WORKSHEET_RECLAMOS), get_current_frame(WORKSHEET_CLIENTES))
+        df_pendientes = _mostrar_reclamos_disponibles(df_reclamos, grupos_activos)
+        if df_pendientes is None:
+            return
+
+        materiales_por_grupo = _mostrar_reclamos_asignados(df_pendientes, grupos_activos)
+        if _mostrar_acciones_finales(df_reclamos, sheet_reclamos, grupos_activos, materiales_por_grupo, df_pendientes):
+            st.rerun()
+    except Exception as e:
+        st.error(f"❌ Error en la planificación: {str(e)}")
+        if DEBUG_MODE:
+            st.exception(e)
+
 def _mostrar_reclamos_asignados(df_pendientes, grupos_activos):
     """Muestra los reclamos asignados por grupo"""
     st.markdown("---")
     st.markdown("### 📌 Reclamos asignados por grupo")
 
     materiales_por_grupo = {}
+    pendientes_por_id = df_pendientes.drop_duplicates("ID Reclamo").set_index("ID Reclamo", drop=False)
 
     for grupo in GRUPOS_POSIBLES[:grupos_activos]:
         reclamos_ids = st.session_state.asignaciones_grupos[grupo]
@@ -497,7 +514,7 @@ def _mostrar_reclamos_asignados(df_pendientes, grupos_activos):
         reclamos_grupo = df_pendientes[df_pendientes["ID Reclamo"].isin(reclamos_ids)]
 
         if not reclamos_grupo.empty:
-            resumen_tipos = " - ".join([f"{v} {k}" for k, v in reclamos_grupo["Tipo de reclamo"].value_counts().items()])
+            resumen_tipos = " - ".join([f"{v} {k}" for k, v in reclamos_grupo["Tipo de reclamo"].value_counts().items() if v])
             sectores = ", ".join(sorted(set(reclamos_grupo["Sector"].astype(str))))
             st.markdown(resumen_tipos)
             st.markdown(f"Sectores: {sectores}")
@@ -510,20 +527,19 @@ def _mostrar_reclamos_asignados(df_pendientes, grupos_activos):
             for mat, cant in materiales_total.items():
                 st.markdown(f"- {cant} {mat.replace('_', ' ').title()}")
 
-        for idx, reclamo_id in enumerate(reclamos_ids):
-            reclamo_data = df_pendientes[df_pendientes["ID Reclamo"] == reclamo_id]
+        for reclamo_id in paginated_list(reclamos_ids, f"planificacion_{grupo}"):
             col1, col2 = st.columns([5, 1])
 
-            if not reclamo_data.empty:
-                row = reclamo_data.iloc[0]
+            if reclamo_id in pendientes_por_id.index:
+                row = pendientes_por_id.loc[reclamo_id]
                 resumen = f"📍 Sector {row['Sector']} - {row['Tipo de reclamo'].capitalize()} - {_format_fecha_reclamo(row['Fecha y hora'])}"
                 col1.markdown(f"**{resumen}**")
             else:
                 col1.markdown(f"**Reclamo ID: {reclamo_id} (ya no está pendiente)**")
 
-            if col2.button("❌ Quitar", key=f"quitar_{grupo}_{reclamo_id}_{idx}"):
+            if col2.button("❌ Quitar", key=f"quitar_{grupo}_{reclamo_id}"):
                 st.session_state.asignaciones_grupos[grupo].remove(reclamo_id)
-                st.rerun()
+                st.rerun(scope="fragment")
 
             st.divider()
 
@@ -574,7 +590,7 @@ def _guardar_cambios(df_reclamos, sheet_reclamos, grupos_activos):
         return False
 
     with st.spinner("Actualizando reclamos..."):
-        updates = []
+        cambios = {}
         notificaciones = []
 
         for grupo in GRUPOS_POSIBLES[:grupos_activos]:
@@ -584,11 +600,7 @@ def _guardar_cambios(df_reclamos, sheet_reclamos, grupos_activos):
 
             if reclamos_ids:
                 for reclamo_id in reclamos_ids:
-                    fila = df_reclamos[df_reclamos["ID Reclamo"] == reclamo_id]
-                    if not fila.empty:
-                        index = fila.index[0] + 2
-                        updates.append({"range": f"I{index}", "values": [["En curso"]]})
-                        updates.append({"range": f"J{index}", "values": [[tecnicos_str]]})
+                    cambios[reclamo_id] = {"Estado": "En curso", "Técnico": tecnicos_str}
 
                 notificaciones.append({
                     "grupo": grupo,
@@ -596,18 +608,21 @@ def _guardar_cambios(df_reclamos, sheet_reclamos, grupos_activos):
                     "cantidad": len(reclamos_ids)
                 })
 
-        if updates:
-            success, error = api_manager.safe_sheet_operation(batch_update_sheet, sheet_reclamos, updates, is_batch=True)
+        if cambios:
+            # Ubica y verifica todas las filas con una sola lectura y escribe un rango por reclamo
+            success, error = update_rows(sheet_reclamos, cambios)
             if success:
                 st.success("✅ Reclamos actualizados correctamente en la hoja.")
                 if 'notification_manager' in st.session_state:
-                    for n in notificaciones:
-                        mensaje = f"📋 Se asignaron {n['cantidad']} reclamos a {n['grupo']} (Técnicos: {n['tecnicos']})."
-                        st.session_state.notification_manager.add(
-                            notification_type="reclamo_asignado",
-                            message=mensaje,
-                            user_target="all"
-                        )
+                    # Una notificación por grupo, todas en un solo append
+                    st.session_state.notification_manager.add_many([
+                        {
+                            "notification_type": "reclamo_asignado",
+                            "message": f"📋 Se asignaron {n['cantidad']} reclamos a {n['grupo']} (Técnicos: {n['tecnicos']}).",
+                            "user_target": "all"
+                        }
+                        for n in notificaciones
+                    ])
                 return True
             else:
                 st.error("❌ Error al actualizar: " + str(error))
@@ -634,7 +649,7 @@ def _generar_pdf_asignaciones(grupos_activos, materiales_por_grupo, df_pendiente
         y = height - 40
 
         tipos = df_pendientes[df_pendientes["ID Reclamo"].isin(reclamos_ids)]["Tipo de reclamo"].value_counts()
-        resumen_tipos = " - ".join([f"{v} {k}" for k, v in tipos.items()])
+        resumen_tipos = " - ".join([f"{v} {k}" for k, v in tipos.items() if v])
 
         c.setFont("Helvetica-Bold", 16)
         c.drawString(40, y, f"{grupo} - Técnicos: {', '.join(tecnicos)} (Asignado el {hoy})")
@@ -656,7 +671,7 @@ def _generar_pdf_asignaciones(grupos_activos, materiales_por_grupo, df_pendiente
                 lineas = [
                     f"Fecha: {fecha_pdf}",
                     f"Dirección: {reclamo['Dirección']} - Tel: {reclamo['Teléfono']}",
-                    f"Sector: {reclamo['Sector']} - Precinto: {reclamo.get('N° de Precinto', 'N/A')}",
+                    f"Sector: {reclamo['Sector']} - Precinto: {reclamo.get('N° de Precinto') or reclamo.get('N° de Precinto_cliente') or 'N/A'}",
                     f"Tipo: {reclamo['Tipo de reclamo']}",
                     f"Detalles: {reclamo['Detalles'][:100]}..." if len(reclamo['Detalles']) > 100 else f"Detalles: {reclamo['Detalles']}",
                 ]
@@ -13,13 +13,7 @@ def render_resumen_jornada(df_reclamos):
     st.markdown("### 📋 Resumen de la jornada")
 
     try:
-        df_reclamos["Fecha y hora"] = pd.to_datetime(
-            df_reclamos["Fecha y hora"],
-            dayfirst=True,
-            format='mixed',
-            errors='coerce'
-        )
-
+        # Fecha y hora ya llega como datetime64 con zona horaria Argentina
         argentina = pytz.timezone("America/Argentina/Buenos_Aires")
         hoy = datetime.now(argentina).date()
 
@@ -95,7 +89,7 @@ def _notificar_reclamos_no_asignados(df):
     df_filtrado = df[
         (df["Estado"].isin(["Pendiente", "En curso"])) &
         (df["Técnico"].isna() | (df["Técnico"].str.strip() == "")) &
-        (pd.to_datetime(df["Fecha y hora"], errors='coerce') < umbral)
+        (df["Fecha y hora"] < umbral)
     ].copy()
 
     if df_filtrado.empty:
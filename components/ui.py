@@ -215,4 +215,67 @@ def expandable_section(title, content, expanded=False, icon="📦"):
             {content}
         </div>
     </div>
-    """
\ No newline at end of file
+    """
+
+PAGE_SIZES = (10, 25, 50)
+
+def paginated_list(items, key, sort_options=None, page_sizes=PAGE_SIZES):
+    """
+    Lista paginada: dibuja los controles y devuelve solo la página visible
+
+    El tamaño de página, el cursor y el criterio de orden se guardan en
+    st.session_state bajo `key`, así cada lista conserva su posición entre
+    reruns y solo se crean los widgets de las filas visibles. `items` puede
+    ser un DataFrame (ordenable con `sort_options`, {etiqueta: (columna,
+    ascendente)}) o una lista. Las filas deben usar su ID como key de widget,
+    nunca la posición, para que las keys no cambien al pasar de página.
+    """
+    cursor_key = f"{key}_cursor"
+    st.session_state.setdefault(cursor_key, 0)
+
+    def _volver_al_inicio():
+        st.session_state[cursor_key] = 0
+
+    def _mover(delta):
+        st.session_state[cursor_key] += delta
+
+    total = len(items)
+    if total == 0:
+        return items
+
+    col_orden, col_tamano = st.columns([3, 1])
+    if sort_options and total > 1:
+        orden = col_orden.selectbox(
+            "🔃 Ordenar por", list(sort_options), key=f"{key}_orden", on_change=_volver_al_inicio
+        )
+        if hasattr(items, "sort_values"):
+            columna, ascendente = sort_options[orden]
+            items = items.sort_values(columna, ascending=ascendente, kind="stable", na_position="last")
+
+    tamano = st.session_state.get(f"{key}_tamano", page_sizes[0])
+    if total > page_sizes[0]:
+        tamano = col_tamano.selectbox(
+            "Por página", page_sizes, key=f"{key}_tamano", on_change=_volver_al_inicio
+        )
+
+    paginas = max(1, -(-total // tamano))
+    pagina = min(max(st.session_state[cursor_key], 0), paginas - 1)
+    st.session_state[cursor_key] = pagina
+
+    inicio = pagina * tamano
+    fin = min(inicio + tamano, total)
+    visibles = items.iloc[inicio:fin] if hasattr(items, "iloc") else items[inicio:fin]
+
+    if paginas > 1:
+        col_prev, col_info, col_next = st.columns([1, 3, 1])
+        col_prev.button("◀", key=f"{key}_prev", disabled=pagina == 0,
+                        on_click=_mover, args=(-1,), use_container_width=True)
+        col_info.markdown(
+            f"<div style='text-align: center;'>Página {pagina + 1} de {paginas} · "
+            f"mostrando {inicio + 1}–{fin} de {total}</div>",
+            unsafe_allow_html=True
+        )
+        col_next.button("▶", key=f"{key}_next", disabled=pagina >= paginas - 1,
+                        on_click=_mover, args=(1,), use_container_width=True)
+
+    return visibles
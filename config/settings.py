@@ -11,8 +11,45 @@ WORKSHEET_RECLAMOS = "Reclamos"
 WORKSHEET_CLIENTES = "Clientes"
 WORKSHEET_USUARIOS = "usuarios"
 WORKSHEET_NOTIFICACIONES = "Notificaciones"
+WORKSHEET_NOTIFICACIONES_LEIDAS = "Notificaciones_Leidas"  # Una fila por usuario con los IDs que leyó
+
+# Snapshot local de las hojas (SQLite) para sincronización incremental
+SNAPSHOT_DB_PATH = ".cache/snapshots.sqlite3"
+SNAPSHOT_VERIFY_INTERVAL = 300  # Segundos entre verificaciones completas por checksum
+HOJAS_INCREMENTALES = [WORKSHEET_RECLAMOS, WORKSHEET_CLIENTES]  # Hojas que solo crecen: se leen solo las filas nuevas
+# Entre verificaciones completas solo se releen las filas nuevas y las escritas
+# desde este proceso: lo que otra instancia (o alguien en la planilla) edite en
+# filas anteriores puede tardar hasta este intervalo en verse. Por hoja; las
+# que no figuran usan SNAPSHOT_VERIFY_INTERVAL.
+SNAPSHOT_VERIFY_INTERVALS = {
+    WORKSHEET_RECLAMOS: 60,
+}
+DATA_CACHE_TTL = 30  # Segundos que se reutilizan los DataFrames compartidos antes de volver a sincronizar
+
+# Sincronización en segundo plano: segundos entre lecturas de cada hoja
+REFRESH_INTERVALS = {
+    WORKSHEET_RECLAMOS: DATA_CACHE_TTL,
+    WORKSHEET_CLIENTES: 60,
+    WORKSHEET_USUARIOS: 300,
+    WORKSHEET_NOTIFICACIONES: 10,
+    WORKSHEET_NOTIFICACIONES_LEIDAS: DATA_CACHE_TTL
+}
+REFRESH_TICK = 1.0  # Cada cuánto revisa el hilo si alguna hoja venció o quedó modificada
+DATA_STALE_AFTER = 120  # Segundos sin sincronizar a partir de los cuales se avisa si el hilo está fallando
+
+# Archivo de reclamos resueltos (una hoja por mes de ingreso, fuera de la carga inicial)
+ARCHIVE_SHEET_PREFIX = "Reclamos_Archivo_"  # + AAAA_MM
+ARCHIVE_AFTER_DAYS = 30  # Días desde el cierre para pasar un reclamo resuelto al archivo
+ARCHIVE_BATCH_SIZE = 500  # Reclamos que se mueven como máximo en cada pasada
+ARCHIVE_CACHE_TTL = 600  # Segundos que se reutilizan las hojas de archivo leídas
+ARCHIVE_INTERVAL = 3600  # Segundos entre pasadas automáticas del archivo (hilo en segundo plano)
+ARCHIVE_HISTORY_MONTHS = 6  # Meses de archivo que se consultan para el historial de un cliente
 
 MAX_NOTIFICATIONS = 10  # Máximo de notificaciones a mostrar en UI
+NOTIFICATION_BUFFER_SIZE = 200  # Notificaciones recientes que se mantienen en memoria
+NOTIFICATION_MAX_ROWS = 500  # Filas que quedan en la hoja de notificaciones al compactar
+NOTIFICATION_COMPACT_EVERY = 100  # Filas de más que disparan la compactación (se borran juntas)
+NOTIFICATION_REFRESH_SECONDS = 5  # Cada cuánto se vuelve a dibujar la campana de notificaciones
 
 # Tipos de notificación
 NOTIFICATION_TYPES = {
@@ -33,6 +70,9 @@ COLUMNAS_NOTIFICACIONES = [
     "Usuario_Destino", "ID_Reclamo", "Fecha_Hora", "Leída", "Acción"
 ]
 
+# Columnas para la hoja de lecturas por usuario (IDs como rangos, p. ej. "1-40,42")
+COLUMNAS_NOTIFICACIONES_LEIDAS = ["username", "IDs", "Actualizado"]
+
 # --------------------------
 # ESTRUCTURAS DE DATOS
 # --------------------------
@@ -92,6 +132,9 @@ OPCIONES_PERMISOS = {
 # --------------------------
 SECTORES_DISPONIBLES = [str(n) for n in range(1, 18)]
 
+ESTADOS_RECLAMO = ["Pendiente", "En curso", "Resuelto", "Desconexión"]
+ESTADOS_ACTIVOS = ["Pendiente", "En curso", "Desconexión"]  # Bloquean la carga de otro reclamo del mismo cliente
+
 TECNICOS_DISPONIBLES = [
     "Braian", "Conejo", "Juan", "Junior", "Maxi", 
     "Ramon", "Roque", "Viki", "Oficina", "Base"
@@ -161,8 +204,17 @@ MATERIALES_POR_RECLAMO = {
 # --------------------------
 # SEGURIDAD Y API
 # --------------------------
-API_DELAY = 2.0  # Segundos entre llamadas a la API
-BATCH_DELAY = 2.0  # Segundos entre operaciones batch
+API_DELAY = 2.0  # Segundos base del backoff exponencial entre reintentos
+BATCH_DELAY = 2.0  # Segundos base del backoff para operaciones batch
+API_MAX_RETRIES = 5  # Reintentos ante errores transitorios (429 / 5xx)
+API_MAX_BACKOFF = 32.0  # Tope de espera entre reintentos (segundos)
+SHEETS_READS_PER_MINUTE = 60  # Cuota de lecturas por minuto por usuario de la API
+SHEETS_WRITES_PER_MINUTE = 60  # Cuota de escrituras por minuto por usuario de la API
+SHEETS_BURST = 10  # Llamadas que se pueden hacer de golpe antes de esperar
+SHEETS_BACKGROUND_RESERVE = 3  # Tokens que las tareas en segundo plano dejan a los usuarios
+WRITE_FLUSH_INTERVAL = 0.3  # Segundos que la cola de escrituras junta cambios antes de enviarlos
+WRITE_QUEUE_MAX = 500  # Celdas/filas pendientes que fuerzan el envío inmediato
+WRITE_WAIT_TIMEOUT = 60  # Segundos máximos esperando la confirmación de una escritura
 SESSION_TIMEOUT = 1800  # 30 minutos de inactividad para cerrar sesión
 
 # --------------------------
@@ -3,36 +3,203 @@ Módulo para gestión segura de datos con Google Sheets
 Versión 3.2 - Con manejo robusto de errores y compatibilidad con API
 """
 import streamlit as st
+import random
+import threading
 import time
-from typing import List, Dict, Union, Optional
+from concurrent.futures import Future
+from typing import List, Dict, Tuple, Optional
+
+from gspread.utils import a1_to_rowcol, absolute_range_name, rowcol_to_a1
+from requests.exceptions import ConnectionError as RequestsConnectionError, Timeout
+from config.settings import (
+    API_DELAY,
+    BATCH_DELAY,
+    API_MAX_RETRIES,
+    API_MAX_BACKOFF,
+    SHEETS_READS_PER_MINUTE,
+    SHEETS_WRITES_PER_MINUTE,
+    SHEETS_BURST,
+    SHEETS_BACKGROUND_RESERVE,
+    WRITE_FLUSH_INTERVAL,
+    WRITE_QUEUE_MAX
+)
+
+# Métodos de gspread que solo leen datos (el resto se considera escritura)
+OPERACIONES_LECTURA = {
+    "get", "get_all_values", "get_all_records", "get_values", "batch_get",
+    "values_get", "values_batch_get", "acell", "cell", "row_values", "col_values",
+    "fetch_sheet_metadata"
+}
+
+# Métodos que agregan filas: repetirlos tras un 5xx podría duplicar datos
+OPERACIONES_APPEND = {"append_row", "append_rows", "values_append"}
+
+# Códigos HTTP transitorios que conviene reintentar
+CODIGOS_REINTENTABLES = {429, 500, 502, 503, 504}
+
+def _es_lectura(func) -> bool:
+    return getattr(func, "__name__", "") in OPERACIONES_LECTURA
+
+def _hoja_escrita(func, args) -> Optional[str]:
+    """Devuelve el título de la hoja que modifica la operación, o None si es una lectura"""
+    if _es_lectura(func):
+        return None
+    objetivo = getattr(func, "__self__", None)
+    if objetivo is None and args:
+        objetivo = args[0]
+    # Solo los Worksheet tienen referencia a su spreadsheet
+    if hasattr(objetivo, "spreadsheet") and hasattr(objetivo, "title"):
+        return objetivo.title
+    return None
+
+def _status_code(error: Exception) -> Optional[int]:
+    """Código HTTP de un error de gspread/requests, si lo tiene"""
+    response = getattr(error, "response", None)
+    status = getattr(response, "status_code", None)
+    if status is None:
+        status = getattr(error, "code", None)
+    return status if isinstance(status, int) else None
+
+def _retry_after(error: Exception) -> Optional[float]:
+    """Segundos sugeridos por el header Retry-After, si vino en la respuesta"""
+    headers = getattr(getattr(error, "response", None), "headers", None) or {}
+    try:
+        return float(headers.get("Retry-After"))
+    except (TypeError, ValueError):
+        return None
+
+class TokenBucket:
+    """
+    Token bucket thread-safe compartido por todo el proceso.
+
+    Las operaciones en segundo plano solo consumen tokens si quedan más que
+    la reserva y no hay operaciones interactivas esperando.
+    """
+
+    def __init__(self, per_minute: int, capacity: int, reserve: int = 0):
+        self.rate = per_minute / 60.0
+        self.capacity = capacity
+        self.reserve = reserve
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._interactive_waiting = 0
+        self._cond = threading.Condition()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self, priority: str = "interactive") -> float:
+        """Bloquea hasta obtener un token y devuelve los segundos esperados"""
+        background = priority == "background"
+        inicio = time.monotonic()
+        with self._cond:
+            if not background:
+                self._interactive_waiting += 1
+            try:
+                while True:
+                    self._refill()
+                    minimo = 1 + (self.reserve if background else 0)
+                    libre = not background or self._interactive_waiting == 0
+                    if self._tokens >= minimo and libre:
+                        self._tokens -= 1
+                        return time.monotonic() - inicio
+                    faltan = max(minimo - self._tokens, 0)
+                    self._cond.wait(timeout=max(faltan / self.rate, 0.05))
+            finally:
+                if not background:
+                    self._interactive_waiting -= 1
+                    self._cond.notify_all()
+
+    def drain(self):
+        """Vacía el bucket (tras un 429) para que todos los llamadores frenen"""
+        with self._cond:
+            self._refill()
+            self._tokens = min(self._tokens, 0.0)
+            self._updated = time.monotonic()
 
 class ApiManager:
     def __init__(self):
         self.total_calls = 0
         self.error_count = 0
+        self.retry_count = 0
+        self.rate_limited_count = 0
         self.last_call = 0
+        self.last_writes: Dict[str, float] = {}
+        self.read_bucket = TokenBucket(SHEETS_READS_PER_MINUTE, SHEETS_BURST, SHEETS_BACKGROUND_RESERVE)
+        self.write_bucket = TokenBucket(SHEETS_WRITES_PER_MINUTE, SHEETS_BURST, SHEETS_BACKGROUND_RESERVE)
 
-    def safe_sheet_operation(self, func, *args, is_batch=False, **kwargs):
+    def _backoff(self, intento: int, is_batch: bool, error: Exception) -> float:
+        """Espera exponencial con jitter completo, respetando Retry-After si vino"""
+        sugerido = _retry_after(error)
+        if sugerido is not None:
+            return min(sugerido, API_MAX_BACKOFF)
+        base = BATCH_DELAY if is_batch else API_DELAY
+        return random.uniform(0, min(API_MAX_BACKOFF, base * (2 ** intento)))
+
+    @staticmethod
+    def _es_reintentable(func, error: Exception, idempotent: Optional[bool] = None) -> bool:
+        """429 y 5xx (y cortes de red) son transitorios; el resto es permanente"""
+        if idempotent is None:
+            idempotent = getattr(func, "__name__", "") not in OPERACIONES_APPEND
+        if isinstance(error, (RequestsConnectionError, Timeout)):
+            return idempotent
+        status = _status_code(error)
+        if status == 429:
+            return True
+        if status in CODIGOS_REINTENTABLES:
+            return idempotent
+        return False
+
+    def safe_sheet_operation(self, func, *args, is_batch=False, priority="interactive", idempotent=None, **kwargs):
         """
         Ejecuta una operación segura sobre la API de Google Sheets
         
+        Respeta la cuota de lecturas/escrituras con un token bucket y reintenta
+        los errores transitorios (429/5xx) con backoff exponencial.
+        
         Args:
             func: función de gspread a ejecutar
             *args: argumentos posicionales para la función
-            is_batch: bool, si es operación por lote (sólo informativo)
+            is_batch: bool, si es operación por lote (usa BATCH_DELAY como base del backoff)
+            priority: 'interactive' (acción de un usuario) o 'background' (cede el paso)
+            idempotent: si se puede repetir tras un 5xx; None lo deduce del nombre
+                (los appends no se repiten para no duplicar filas)
             **kwargs: argumentos clave
         
         Returns:
             tuple: (resultado, error) donde error es None si fue exitoso
         """
-        try:
-            self.total_calls += 1
-            self.last_call = time.time()
-            result = func(*args, **kwargs)
-            return result, None
-        except Exception as e:
-            self.error_count += 1
-            return None, str(e)
+        bucket = self.read_bucket if _es_lectura(func) else self.write_bucket
+        hoja = _hoja_escrita(func, args)
+
+        for intento in range(API_MAX_RETRIES + 1):
+            try:
+                bucket.acquire(priority)
+                self.total_calls += 1
+                self.last_call = time.time()
+                if hoja:
+                    self.last_writes[hoja] = self.last_call
+                result = func(*args, **kwargs)
+                return result, None
+            except Exception as e:
+                self.error_count += 1
+                if intento >= API_MAX_RETRIES or not self._es_reintentable(func, e, idempotent):
+                    return None, str(e)
+                if _status_code(e) == 429:
+                    self.rate_limited_count += 1
+                    bucket.drain()
+                self.retry_count += 1
+                time.sleep(self._backoff(intento, is_batch, e))
+
+    def register_write(self, worksheet):
+        """Registra una escritura hecha fuera de safe_sheet_operation"""
+        self.last_writes[worksheet.title] = time.time()
+
+    def last_write(self, hoja: str) -> float:
+        """Momento de la última escritura conocida sobre una hoja (0 si nunca)"""
+        return self.last_writes.get(hoja, 0.0)
 
     def get_api_stats(self):
         """
@@ -41,33 +208,231 @@ class ApiManager:
         return {
             "total_calls": self.total_calls,
             "error_count": self.error_count,
+            "retry_count": self.retry_count,
+            "rate_limited_count": self.rate_limited_count,
             "last_call": self.last_call
         }
 
-def batch_update_sheet(worksheet, updates: List[Dict[str, Union[str, List[List[str]]]]]) -> bool:
+# Instancia única global
+api_manager = ApiManager()
+
+def updates_to_cells(updates: List[Dict]) -> Dict:
+    """Convierte updates {"range": "C12:K12", "values": [[...]]} en {(fila, col): valor}"""
+    celdas = {}
+    for update in updates:
+        inicio = update["range"].split("!")[-1].split(":")[0]
+        fila_inicio, col_inicio = a1_to_rowcol(inicio)
+        for i, fila in enumerate(update["values"]):
+            for j, valor in enumerate(fila):
+                celdas[(fila_inicio + i, col_inicio + j)] = valor
+    return celdas
+
+def coalesce_cells(celdas: Dict) -> List[Dict]:
+    """
+    Agrupa celdas sueltas {(fila, col): valor} en la menor cantidad de rangos rectangulares
+    
+    Primero une las celdas contiguas de cada fila en tramos (C12:K12) y después
+    une los tramos que ocupan las mismas columnas en filas consecutivas (P2:P51).
+    
+    Returns:
+        list: [{"range": "C12:K12", "values": [[...]]}, ...] ordenados por fila y columna
+    """
+    # 1) Tramos horizontales: (fila, col_inicio, col_fin) -> valores
+    tramos = []
+    for fila, col in sorted(celdas):
+        if tramos and tramos[-1][0] == fila and tramos[-1][2] == col - 1:
+            tramos[-1][2] = col
+            tramos[-1][3].append(celdas[(fila, col)])
+        else:
+            tramos.append([fila, col, col, [celdas[(fila, col)]]])
+
+    # 2) Bloques: tramos con las mismas columnas en filas consecutivas
+    bloques = {}   # (col_inicio, col_fin) -> bloque abierto [fila_inicio, fila_fin, filas_de_valores]
+    resultado = []
+    for fila, col_inicio, col_fin, valores in tramos:
+        clave = (col_inicio, col_fin)
+        bloque = bloques.get(clave)
+        if bloque is not None and bloque[1] == fila - 1:
+            bloque[1] = fila
+            bloque[2].append(valores)
+        else:
+            bloque = [fila, fila, [valores]]
+            bloques[clave] = bloque
+            resultado.append((clave, bloque))
+
+    return [
+        {
+            "range": f"{rowcol_to_a1(bloque[0], col_inicio)}:{rowcol_to_a1(bloque[1], col_fin)}"
+            if (bloque[0], col_inicio) != (bloque[1], col_fin) else rowcol_to_a1(bloque[0], col_inicio),
+            "values": bloque[2]
+        }
+        for (col_inicio, col_fin), bloque in resultado
+    ]
+
+def coalesce_rows(filas) -> List[Tuple[int, int]]:
     """
-    Realiza actualizaciones por lotes en una hoja de cálculo
+    Agrupa números de fila sueltos en tramos consecutivos, de abajo hacia arriba
     
-    Args:
-        worksheet: objeto de hoja de cálculo de gspread
-        updates: lista de diccionarios con formato:
-            [{"range": "A1:B2", "values": [["val1", "val2"], ["val3", "val4"]]}]
+    Borrando en este orden cada tramo no corre las filas de los que faltan,
+    así todos pueden ir en el mismo batchUpdate con los números originales.
     
     Returns:
-        bool: True si la operación fue exitosa
+        list: [(fila_inicio, fila_fin), ...] inclusivos, p. ej. {2, 3, 4, 9} -> [(9, 9), (2, 4)]
+    """
+    tramos: List[List[int]] = []
+    for fila in sorted({int(f) for f in filas}, reverse=True):
+        if tramos and tramos[-1][0] == fila + 1:
+            tramos[-1][0] = fila
+        else:
+            tramos.append([fila, fila])
+    return [(inicio, fin) for inicio, fin in tramos]
+
+class WriteBehindQueue:
     """
-    if not updates:
-        return True
+    Cola de escrituras diferidas compartida por todas las sesiones.
+
+    Junta las actualizaciones de celdas y los appends de cada hoja durante
+    WRITE_FLUSH_INTERVAL segundos (o hasta WRITE_QUEUE_MAX celdas) y los envía
+    juntos: un values:batchUpdate por spreadsheet y un values:append por hoja.
+    Las celdas contiguas se envían como un único rango (ver coalesce_cells).
+    Si dos escrituras tocan la misma celda, gana la última. Si el lote de un
+    spreadsheet falla, cada escritura se reintenta sola y el error le llega
+    solo a las que fallen de nuevo.
+    """
+
+    def __init__(self, flush_interval: float = WRITE_FLUSH_INTERVAL, max_pending: int = WRITE_QUEUE_MAX):
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self._lock = threading.Lock()
+        self._timer: Optional[threading.Timer] = None
+        self._reset()
+
+    def _reset(self):
+        self._celdas: Dict[str, Dict] = {}      # título -> {(fila, col): valor}
+        self._appends: Dict[str, List] = {}     # título -> [fila, ...]
+        self._hojas: Dict[str, object] = {}     # título -> worksheet
+        self._entradas: List[Tuple[Future, str, set, bool]] = []  # (future, título, celdas, agrega filas)
+        self._pendientes = 0
+
+    def _encolar(self, worksheet, celdas: Dict = None, filas: List = None) -> Future:
+        future = Future()
+        flush_ahora = False
+        with self._lock:
+            titulo = worksheet.title
+            self._hojas[titulo] = worksheet
+            if celdas:
+                self._celdas.setdefault(titulo, {}).update(celdas)
+                self._pendientes += len(celdas)
+            if filas:
+                self._appends.setdefault(titulo, []).extend(filas)
+                self._pendientes += len(filas)
+            self._entradas.append((future, titulo, set(celdas or ()), bool(filas)))
+
+            if self._pendientes >= self.max_pending:
+                flush_ahora = True
+            elif self._timer is None:
+                self._timer = threading.Timer(self.flush_interval, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+
+        if flush_ahora:
+            self.flush()
+        return future
+
+    def enqueue_updates(self, worksheet, updates: List[Dict]) -> Future:
+        """
+        Encola actualizaciones con el mismo formato que worksheet.batch_update
         
-    try:
-        worksheet.batch_update(updates)
-        return True
-    except Exception as e:
-        st.error(f"Error en batch_update: {str(e)}")
-        return False
+        Returns:
+            Future: se resuelve con (bool, error) cuando se envía el lote
+        """
+        return self._encolar(worksheet, celdas=updates_to_cells(updates))
 
-# Instancia única global
-api_manager = ApiManager()
+    def enqueue_append(self, worksheet, filas: List[List]) -> Future:
+        """Encola una o más filas para agregar al final de la hoja"""
+        return self._encolar(worksheet, filas=filas)
+
+    def flush(self):
+        """Envía todo lo pendiente y resuelve el future de cada escritura"""
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            celdas, appends = self._celdas, self._appends
+            hojas, entradas = self._hojas, self._entradas
+            self._reset()
+
+        resultados = {}
+        try:
+            self._enviar(celdas, appends, hojas, entradas, resultados)
+        except Exception as e:
+            resultados = {entrada[0]: (False, str(e)) for entrada in entradas}
+        finally:
+            for future, *_ in entradas:
+                future.set_result(resultados.get(future, (True, None)))
+
+    @staticmethod
+    def _escribir_celdas(spreadsheet, celdas_por_hoja: Dict[str, Dict]) -> Optional[str]:
+        """Un values:batchUpdate con las celdas de varias hojas; devuelve el error o None"""
+        data = [
+            {"range": absolute_range_name(titulo, rango["range"]), "values": rango["values"]}
+            for titulo, celdas in celdas_por_hoja.items()
+            for rango in coalesce_cells(celdas)
+        ]
+        _, error = api_manager.safe_sheet_operation(
+            spreadsheet.values_batch_update,
+            {"valueInputOption": "RAW", "data": data},
+            is_batch=True
+        )
+        return error
+
+    @classmethod
+    def _enviar(cls, celdas: Dict, appends: Dict, hojas: Dict, entradas: List, resultados: Dict):
+        """Hace las llamadas a la API de un flush y anota los fallos por escritura"""
+        # Un values:batchUpdate por spreadsheet con todas las celdas de sus hojas
+        por_spreadsheet: Dict[str, List[str]] = {}
+        for titulo in celdas:
+            por_spreadsheet.setdefault(hojas[titulo].spreadsheet.id, []).append(titulo)
+
+        for titulos in por_spreadsheet.values():
+            for titulo in titulos:
+                api_manager.register_write(hojas[titulo])
+            spreadsheet = hojas[titulos[0]].spreadsheet
+            error = cls._escribir_celdas(spreadsheet, {titulo: celdas[titulo] for titulo in titulos})
+            if not error:
+                continue
+
+            # El lote mezcla escrituras de varias sesiones: un rango inválido no
+            # debe hacer fallar a todas, así que cada una se reintenta por separado
+            # (con el valor final de sus celdas, para respetar que gana la última)
+            propias = [(future, titulo, claves) for future, titulo, claves, _ in entradas
+                       if titulo in titulos and claves]
+            if len(propias) == 1:
+                resultados[propias[0][0]] = (False, error)
+                continue
+            for future, titulo, claves in propias:
+                error = cls._escribir_celdas(spreadsheet, {titulo: {c: celdas[titulo][c] for c in claves}})
+                if error:
+                    resultados[future] = (False, error)
+
+        # Un values:append por hoja con todas sus filas nuevas
+        for titulo, filas in appends.items():
+            worksheet = hojas[titulo]
+            api_manager.register_write(worksheet)
+            _, error = api_manager.safe_sheet_operation(
+                worksheet.spreadsheet.values_append,
+                absolute_range_name(titulo, "A1"),
+                {"valueInputOption": "RAW"},
+                {"values": filas},
+                is_batch=True
+            )
+            if error:
+                for future, titulo_entrada, _, agrega in entradas:
+                    if agrega and titulo_entrada == titulo and future not in resultados:
+                        resultados[future] = (False, error)
+
+# Cola única global de escrituras
+write_queue = WriteBehindQueue()
 
 def init_api_session_state():
     """
@@ -0,0 +1,96 @@
+"""
+Sincronización en segundo plano de las hojas compartidas
+Un hilo por proceso mantiene al día el caché; los reruns nunca esperan a la API
+"""
+import logging
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+from utils.shared_cache import SharedSheetCache
+
+class BackgroundRefresher:
+    """
+    Hilo que re-sincroniza cada hoja según su propio intervalo.
+
+    Cada `tick` segundos revisa qué hojas vencieron su intervalo o quedaron
+    marcadas como modificadas (mark_dirty) y las sincroniza juntas con
+    `refrescar`, que publica en el caché las que cambiaron. Las sesiones
+    siguen leyendo la versión publicada anterior mientras tanto: cada
+    publicación reemplaza la referencia de una vez.
+
+    Además corre tareas periódicas registradas con schedule(), después de
+    sincronizar, en el mismo hilo.
+
+    Ejemplo:
+        refresher = BackgroundRefresher(cache, lambda hojas: sincronizar(hojas),
+                                        {"Reclamos": 30, "usuarios": 300})
+        refresher.start()
+    """
+
+    def __init__(self, cache: SharedSheetCache, refrescar: Callable[[List[str]], Optional[str]],
+                 intervalos: Dict[str, float], tick: float = 1.0):
+        self.cache = cache
+        self.intervalos = dict(intervalos)
+        self.tick = tick
+        self.last_error: Optional[str] = None
+        self._refrescar = refrescar
+        self._tareas: Dict[str, Tuple[float, Callable[[], Optional[str]]]] = {}
+        self._ultima_tarea: Dict[str, float] = {}
+        self._despertar = threading.Event()
+        self._hilo = threading.Thread(target=self._run, name="sheets-refresher", daemon=True)
+
+    def start(self) -> "BackgroundRefresher":
+        if not self._hilo.is_alive():
+            self._hilo.start()
+        return self
+
+    def schedule(self, nombre: str, intervalo: float, tarea: Callable[[], Optional[str]]) -> None:
+        """
+        Corre `tarea` cada `intervalo` segundos (la primera vez, en la próxima vuelta)
+
+        Registrar de nuevo el mismo nombre reemplaza la tarea sin reiniciar su
+        intervalo, así que es seguro hacerlo en cada rerun. La tarea devuelve un
+        mensaje de error o None.
+        """
+        self._tareas[nombre] = (intervalo, tarea)
+
+    def wake(self) -> None:
+        """Revisa las hojas ya, sin esperar al próximo tick"""
+        self._despertar.set()
+
+    def pending(self, ahora: Optional[float] = None) -> List[str]:
+        """Hojas con el intervalo vencido o modificadas desde su última sincronización"""
+        ahora = time.time() if ahora is None else ahora
+        sucias = self.cache.dirty()
+        return [
+            hoja for hoja, intervalo in self.intervalos.items()
+            if hoja in sucias or ahora - self.cache.synced_at(hoja) >= intervalo
+        ]
+
+    def _run(self) -> None:
+        while True:
+            hojas = self.pending()
+            if hojas:
+                try:
+                    self.last_error = self._refrescar(hojas)
+                except Exception as e:
+                    self.last_error = str(e)
+                if self.last_error:
+                    logging.warning("Sincronización en segundo plano de %s: %s", ", ".join(hojas), self.last_error)
+            self._correr_tareas()
+            self._despertar.wait(self.tick)
+            self._despertar.clear()
+
+    def _correr_tareas(self) -> None:
+        for nombre, (intervalo, tarea) in list(self._tareas.items()):
+            ahora = time.time()
+            if ahora - self._ultima_tarea.get(nombre, 0.0) < intervalo:
+                continue
+            self._ultima_tarea[nombre] = ahora
+            try:
+                error = tarea()
+            except Exception as e:
+                error = str(e)
+            if error:
+                logging.warning("Tarea en segundo plano %s: %s", nombre, error)
@@ -0,0 +1,299 @@
+"""
+Archivo de reclamos resueltos
+Mueve los reclamos cerrados hace tiempo a hojas mensuales y las lee cuando hace falta historia
+"""
+from collections import defaultdict
+from datetime import date, datetime
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+import pandas as pd
+import streamlit as st
+from gspread.utils import absolute_range_name, rowcol_to_a1
+
+from utils.api_manager import api_manager, coalesce_rows
+from utils.data_manager import (
+    _values_to_dataframe,
+    column_letter,
+    get_column_map,
+    get_current_frame,
+    get_or_create_worksheet,
+    get_snapshot_store,
+    locate_rows,
+    normalize_reclamos
+)
+from utils.date_utils import ahora_argentina
+from utils.unit_of_work import UnitOfWork
+from config.settings import (
+    ARCHIVE_SHEET_PREFIX,
+    ARCHIVE_AFTER_DAYS,
+    ARCHIVE_BATCH_SIZE,
+    ARCHIVE_CACHE_TTL,
+    COLUMNA_ID_RECLAMO,
+    COLUMNAS_RECLAMOS,
+    WORKSHEET_RECLAMOS
+)
+
+Fecha = Union[date, datetime, pd.Timestamp]
+
+def archive_sheet_name(fecha: Fecha) -> str:
+    """Hoja de archivo del mes de la fecha, p. ej. Reclamos_Archivo_2025_03"""
+    return f"{ARCHIVE_SHEET_PREFIX}{fecha.year:04d}_{fecha.month:02d}"
+
+def _mes_de_hoja(hoja: str) -> Optional[Tuple[int, int]]:
+    """(año, mes) de una hoja de archivo; None si el nombre no corresponde"""
+    if not hoja.startswith(ARCHIVE_SHEET_PREFIX):
+        return None
+    try:
+        anio, mes = hoja[len(ARCHIVE_SHEET_PREFIX):].split("_")
+        return int(anio), int(mes)
+    except ValueError:
+        return None
+
+def _fecha_archivo(df: pd.DataFrame) -> pd.Series:
+    """Fecha que decide si un reclamo se archiva: la de cierre o, si falta, la de ingreso"""
+    ingreso = df["Fecha y hora"] if "Fecha y hora" in df.columns else pd.Series(pd.NaT, index=df.index)
+    if "Fecha_formateada" not in df.columns:
+        return ingreso
+    return df["Fecha_formateada"].fillna(ingreso)
+
+def claims_to_archive(df: pd.DataFrame, dias: int = ARCHIVE_AFTER_DAYS) -> pd.DataFrame:
+    """Reclamos resueltos hace más de `dias` días que tienen ID (los más viejos primero)"""
+    if df.empty or "Estado" not in df.columns or COLUMNA_ID_RECLAMO not in df.columns:
+        return df.iloc[0:0]
+    fecha = _fecha_archivo(df)
+    corte = pd.Timestamp(ahora_argentina()) - pd.Timedelta(days=dias)
+    mask = (df["Estado"] == "Resuelto") & fecha.notna() & (fecha < corte) & (df[COLUMNA_ID_RECLAMO] != "")
+    return df[mask].assign(_fecha_archivo=fecha[mask]).sort_values("_fecha_archivo", kind="stable")
+
+def _leer_filas(sheet, filas: List[int], ancho: int) -> Tuple[Dict[int, List[str]], Optional[str]]:
+    """Valores crudos de esas filas con un único values:batchGet (un rango por tramo consecutivo)"""
+    ultima_columna = rowcol_to_a1(1, ancho).rstrip("0123456789")
+    tramos = sorted(coalesce_rows(filas))
+    rangos = [absolute_range_name(sheet.title, f"A{inicio}:{ultima_columna}{fin}") for inicio, fin in tramos]
+    respuesta, error = api_manager.safe_sheet_operation(
+        sheet.spreadsheet.values_batch_get, rangos, is_batch=True
+    )
+    if error:
+        return {}, error
+
+    valores = {}
+    for (inicio, _), value_range in zip(tramos, respuesta.get("valueRanges", [])):
+        for desplazamiento, fila in enumerate(value_range.get("values", [])):
+            valores[inicio + desplazamiento] = list(fila) + [""] * (ancho - len(fila))
+    return valores, None
+
+def archive_resolved_claims(sheet_reclamos, dias: int = ARCHIVE_AFTER_DAYS,
+                            limite: int = ARCHIVE_BATCH_SIZE) -> Tuple[int, Optional[str]]:
+    """
+    Mueve al archivo los reclamos resueltos hace más de `dias` días
+
+    Las filas se ubican con locate_rows y se leen tal cual están en la hoja;
+    cada una va a la hoja de archivo del mes de ingreso del reclamo (las que
+    ya existen salen de list_archive_sheets; solo se crean las que faltan).
+    Las altas en el archivo y el borrado de la hoja de reclamos viajan en un
+    único batchUpdate (UnitOfWork), así un reclamo nunca queda en las dos
+    hojas ni en ninguna. El hilo en segundo plano lo corre cada
+    ARCHIVE_INTERVAL segundos.
+
+    Args:
+        sheet_reclamos: worksheet de reclamos
+        dias: antigüedad mínima desde el cierre
+        limite: reclamos que se mueven como máximo en esta pasada
+
+    Returns:
+        tuple: (cantidad de reclamos archivados, error)
+    """
+    candidatos = claims_to_archive(get_current_frame(WORKSHEET_RECLAMOS), dias)
+    candidatos = candidatos.drop_duplicates(COLUMNA_ID_RECLAMO).head(limite)
+    if candidatos.empty:
+        return 0, None
+
+    filas, error = locate_rows(sheet_reclamos, candidatos[COLUMNA_ID_RECLAMO])
+    if error:
+        return 0, error
+    if not filas:
+        return 0, None
+
+    encabezado = get_snapshot_store().headers(WORKSHEET_RECLAMOS) or COLUMNAS_RECLAMOS
+    valores, error = _leer_filas(sheet_reclamos, list(filas.values()), len(encabezado))
+    if error:
+        return 0, error
+
+    col_id = get_column_map(WORKSHEET_RECLAMOS)[COLUMNA_ID_RECLAMO] - 1
+    por_id = candidatos.set_index(COLUMNA_ID_RECLAMO)
+    fechas = por_id["Fecha y hora"].fillna(por_id["_fecha_archivo"])
+    por_hoja: Dict[str, List[List[str]]] = defaultdict(list)
+    mover = []
+    for id_reclamo, fila in filas.items():
+        fila_valores = valores.get(fila)
+        # Se mueve solo si la fila leída sigue siendo ese reclamo
+        if fila_valores is None or str(fila_valores[col_id]).strip() != id_reclamo:
+            continue
+        por_hoja[archive_sheet_name(fechas[id_reclamo])].append(fila_valores)
+        mover.append(fila)
+    if not mover:
+        return 0, None
+
+    spreadsheet = sheet_reclamos.spreadsheet
+    existentes, error = list_archive_sheets(spreadsheet)
+    if error:
+        return 0, error
+    uow = UnitOfWork()
+    for hoja, filas_hoja in sorted(por_hoja.items()):
+        sheet = existentes.get(hoja)
+        if sheet is None:
+            # Solo las hojas de meses que todavía no tienen archivo cuestan una llamada más
+            sheet, error = api_manager.safe_sheet_operation(get_or_create_worksheet, spreadsheet, hoja, encabezado)
+            if error:
+                return 0, error
+        uow.append(hoja, sheet, filas_hoja)
+    uow.delete_rows(WORKSHEET_RECLAMOS, sheet_reclamos, mover)
+
+    resultados = uow.commit()
+    _hojas_archivo.clear()
+    _leer_archivo.clear()
+    _contar_archivo.clear()
+    for _, (success, error) in resultados.items():
+        if not success:
+            return 0, error
+    return len(mover), None
+
+# Los lectores cacheados lanzan la excepción en vez de devolver el error, así
+# no queda guardado; las funciones públicas lo devuelven como texto (corren
+# también en el hilo en segundo plano, donde st.error no se ve)
+@st.cache_resource(ttl=ARCHIVE_CACHE_TTL)
+def _hojas_archivo(_spreadsheet, spreadsheet_id: str) -> Dict[str, Any]:
+    worksheets, error = api_manager.safe_sheet_operation(_spreadsheet.worksheets)
+    if error:
+        raise RuntimeError(error)
+    return {ws.title: ws for ws in sorted(worksheets, key=lambda ws: ws.title) if _mes_de_hoja(ws.title) is not None}
+
+def list_archive_sheets(spreadsheet) -> Tuple[Dict[str, Any], Optional[str]]:
+    """
+    Hojas de archivo del spreadsheet, de la más vieja a la más nueva
+
+    Returns:
+        tuple: ({nombre: worksheet}, error)
+    """
+    try:
+        return _hojas_archivo(spreadsheet, spreadsheet.id), None
+    except Exception as e:
+        return {}, f"Error al listar el archivo de reclamos: {str(e)}"
+
+@st.cache_data(ttl=ARCHIVE_CACHE_TTL)
+def _leer_archivo(_spreadsheet, hojas: Tuple[str, ...]) -> pd.DataFrame:
+    """Hojas de archivo en un único values:batchGet, ya normalizadas como la hoja de reclamos"""
+    respuesta, error = api_manager.safe_sheet_operation(
+        _spreadsheet.values_batch_get, [absolute_range_name(hoja) for hoja in hojas], is_batch=True
+    )
+    if error:
+        raise RuntimeError(error)
+    frames = [
+        _values_to_dataframe(value_range.get("values", []), COLUMNAS_RECLAMOS)
+        for value_range in respuesta.get("valueRanges", [])
+    ]
+    frames = [df for df in frames if not df.empty]
+    if not frames:
+        return pd.DataFrame(columns=COLUMNAS_RECLAMOS)
+    return normalize_reclamos(pd.concat(frames, ignore_index=True))
+
+@st.cache_data(ttl=ARCHIVE_CACHE_TTL)
+def _contar_archivo(_spreadsheet, hojas: Tuple[str, ...], letra: str) -> int:
+    """Reclamos archivados, leyendo solo la columna de ID de cada hoja"""
+    respuesta, error = api_manager.safe_sheet_operation(
+        _spreadsheet.values_batch_get, [absolute_range_name(hoja, f"{letra}2:{letra}") for hoja in hojas], is_batch=True
+    )
+    if error:
+        raise RuntimeError(error)
+    return sum(
+        1
+        for value_range in respuesta.get("valueRanges", [])
+        for fila in value_range.get("values", [])
+        if fila and str(fila[0]).strip()
+    )
+
+def count_archived_claims(spreadsheet) -> Tuple[int, Optional[str]]:
+    """
+    Cantidad de reclamos en el archivo (todos resueltos), para sumar a los totales históricos
+
+    Las hojas de archivo copian el encabezado de la hoja de reclamos, así que
+    la columna de ID es la misma.
+
+    Returns:
+        tuple: (cantidad, error)
+    """
+    existentes, error = list_archive_sheets(spreadsheet)
+    if error or not existentes:
+        return 0, error
+    try:
+        return _contar_archivo(spreadsheet, tuple(existentes), column_letter(WORKSHEET_RECLAMOS, COLUMNA_ID_RECLAMO)), None
+    except Exception as e:
+        return 0, f"Error al contar el archivo de reclamos: {str(e)}"
+
+def _limite(fecha: Fecha, fechas: pd.Series) -> pd.Timestamp:
+    """La fecha como Timestamp comparable con la columna (misma zona horaria)"""
+    limite = pd.Timestamp(fecha)
+    zona = fechas.dt.tz
+    if limite.tzinfo is None and zona is not None:
+        return limite.tz_localize(zona)
+    if limite.tzinfo is not None and zona is None:
+        return limite.tz_localize(None)
+    return limite
+
+def _mes(fecha: Optional[Fecha]) -> Optional[Tuple[int, int]]:
+    return None if fecha is None else (fecha.year, fecha.month)
+
+def get_claims_history(spreadsheet, desde: Optional[Fecha] = None, hasta: Optional[Fecha] = None,
+                       nro_cliente: Optional[str] = None) -> Tuple[pd.DataFrame, Optional[str]]:
+    """
+    Reclamos de la hoja y del archivo, como si fueran una sola tabla
+
+    Solo se leen las hojas de archivo de los meses entre `desde` y `hasta`
+    (todas si no se indican, así que conviene acotar). Si un reclamo aparece
+    en las dos (una pasada interrumpida) gana la hoja de reclamos. Si el
+    archivo no se puede leer se devuelven solo los de la hoja, con el error.
+
+    Args:
+        spreadsheet: objeto Spreadsheet de gspread
+        desde, hasta: límites (inclusive) sobre "Fecha y hora"
+        nro_cliente: si se indica, solo los reclamos de ese cliente
+
+    Returns:
+        tuple: (DataFrame, error)
+    """
+    df = get_current_frame(WORKSHEET_RECLAMOS)
+    if nro_cliente is not None:
+        df = df[df["Nº Cliente"].astype(str) == str(nro_cliente)]
+    existentes, error = list_archive_sheets(spreadsheet)
+    mes_desde, mes_hasta = _mes(desde), _mes(hasta)
+    hojas = tuple(
+        hoja for hoja in existentes
+        if (mes_desde is None or _mes_de_hoja(hoja) >= mes_desde)
+        and (mes_hasta is None or _mes_de_hoja(hoja) <= mes_hasta)
+    )
+    archivo = None
+    if hojas:
+        try:
+            archivo = _leer_archivo(spreadsheet, hojas)
+        except Exception as e:
+            error = f"Error al leer el archivo de reclamos: {str(e)}"
+    if archivo is not None:
+        if nro_cliente is not None:
+            archivo = archivo[archivo["Nº Cliente"].astype(str) == str(nro_cliente)]
+        archivo = archivo[~archivo[COLUMNA_ID_RECLAMO].isin(df[COLUMNA_ID_RECLAMO]) | (archivo[COLUMNA_ID_RECLAMO] == "")]
+        df = pd.concat([df, archivo], ignore_index=True)
+
+    if df.empty or (desde is None and hasta is None):
+        return df, error
+
+    fechas = pd.to_datetime(df["Fecha y hora"], errors="coerce")
+    if desde is not None:
+        df = df[fechas >= _limite(desde, fechas)]
+        fechas = fechas[df.index]
+    if hasta is not None:
+        # Una fecha sin hora incluye todo ese día
+        if not isinstance(hasta, datetime):
+            df = df[fechas < _limite(hasta, fechas) + pd.Timedelta(days=1)]
+        else:
+            df = df[fechas <= _limite(hasta, fechas)]
+    return df, error
@@ -2,9 +2,176 @@
 Gestor de datos para operaciones con Google Sheets
 Versión mejorada con manejo robusto de datos
 """
+import time
+from functools import partial
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple
+
 import pandas as pd
 import streamlit as st
-from utils.api_manager import api_manager
+from gspread.exceptions import WorksheetNotFound
+from gspread.utils import a1_range_to_grid_range, absolute_range_name, rowcol_to_a1
+from utils.api_manager import api_manager, write_queue, coalesce_rows, updates_to_cells
+from utils.background_refresher import BackgroundRefresher
+from utils.shared_cache import SharedSheetCache
+from utils.row_locator import RowLocator
+from utils.search_index import SearchIndex
+from utils.snapshot_store import SnapshotStore, checksum_fila
+from utils.date_utils import parse_fechas
+from config.settings import (
+    SNAPSHOT_DB_PATH,
+    REFRESH_INTERVALS,
+    REFRESH_TICK,
+    WRITE_WAIT_TIMEOUT,
+    SNAPSHOT_VERIFY_INTERVAL,
+    SNAPSHOT_VERIFY_INTERVALS,
+    HOJAS_INCREMENTALES,
+    WORKSHEET_RECLAMOS,
+    WORKSHEET_CLIENTES,
+    WORKSHEET_USUARIOS,
+    WORKSHEET_NOTIFICACIONES,
+    WORKSHEET_NOTIFICACIONES_LEIDAS,
+    COLUMNAS_RECLAMOS,
+    COLUMNAS_CLIENTES,
+    COLUMNAS_USUARIOS,
+    COLUMNAS_NOTIFICACIONES,
+    COLUMNAS_NOTIFICACIONES_LEIDAS,
+    COLUMNA_ID_RECLAMO,
+    COLUMNA_ID_CLIENTE,
+    ESTADOS_RECLAMO,
+    ESTADOS_ACTIVOS,
+    TIPOS_RECLAMO
+)
+
+class SheetsBundle(NamedTuple):
+    """DataFrames de todas las hojas que necesita la página"""
+    reclamos: pd.DataFrame
+    clientes: pd.DataFrame
+    usuarios: pd.DataFrame
+    notificaciones: pd.DataFrame
+    notificaciones_leidas: pd.DataFrame
+
+# Columna que identifica cada registro en las hojas donde se escribe por ID
+COLUMNAS_ID = {
+    WORKSHEET_RECLAMOS: COLUMNA_ID_RECLAMO,
+    WORKSHEET_CLIENTES: COLUMNA_ID_CLIENTE,
+    WORKSHEET_NOTIFICACIONES: "ID",
+    WORKSHEET_NOTIFICACIONES_LEIDAS: "username"
+}
+
+# Orden de carga: (hoja, columnas) en el mismo orden que los campos de SheetsBundle
+HOJAS_BOOTSTRAP = [
+    (WORKSHEET_RECLAMOS, COLUMNAS_RECLAMOS),
+    (WORKSHEET_CLIENTES, COLUMNAS_CLIENTES),
+    (WORKSHEET_USUARIOS, COLUMNAS_USUARIOS),
+    (WORKSHEET_NOTIFICACIONES, COLUMNAS_NOTIFICACIONES),
+    (WORKSHEET_NOTIFICACIONES_LEIDAS, COLUMNAS_NOTIFICACIONES_LEIDAS)
+]
+
+def _values_to_dataframe(data: List[List[str]], columnas=None) -> pd.DataFrame:
+    """Convierte una matriz de valores (con encabezado) en DataFrame con las columnas pedidas"""
+    if len(data) <= 1:
+        return pd.DataFrame(columns=columnas)
+
+    # La API omite las celdas vacías al final de cada fila: rellenamos igual que get_all_values
+    ancho = max(len(fila) for fila in data)
+    data = [list(fila) + [""] * (ancho - len(fila)) for fila in data]
+
+    headers = data[0]
+    rows = data[1:]
+    df = pd.DataFrame(rows, columns=headers)
+
+    if columnas is None:
+        return df
+
+    for col in columnas:
+        if col not in df.columns:
+            df[col] = None
+
+    return df[columnas]
+
+# --------------------------
+# NORMALIZACIÓN (una vez por snapshot)
+# --------------------------
+def _texto(serie: pd.Series) -> pd.Series:
+    """Columna de texto sin espacios sobrantes y sin nulos (string dtype)"""
+    return serie.astype("string").fillna("").str.strip()
+
+def _categoria(serie: pd.Series, canonico: Optional[Callable[[str], str]] = None) -> pd.Series:
+    """
+    Columna de texto como category; canonico() se aplica una vez por valor distinto
+
+    Los nulos quedan como "" para que fillna/== sobre la columna no necesiten
+    agregar categorías nuevas.
+    """
+    texto = _texto(serie)
+    if canonico is not None:
+        texto = texto.map({valor: canonico(valor) for valor in texto.unique()})
+    return texto.astype("category")
+
+def _canonico_por_nombre(opciones: List[str]) -> Callable[[str], str]:
+    """Lleva cada valor a la opción de configuración que coincide sin importar mayúsculas"""
+    por_minuscula = {opcion.lower(): opcion for opcion in opciones}
+    return lambda valor: por_minuscula.get(valor.lower(), valor)
+
+def _canonico_sector(valor: str) -> str:
+    """'05' o '5.0' -> '5'; lo que no es número queda igual"""
+    try:
+        return str(int(float(valor)))
+    except ValueError:
+        return valor
+
+def normalize_reclamos(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Tipa la hoja de reclamos para que los componentes filtren sin volver a limpiarla
+
+    - Identificadores (Nº Cliente, ID Reclamo, N° de Precinto): string sin espacios
+    - Estado, Tipo de reclamo, Sector y Técnico: category con el valor canónico
+      ("pendiente " -> "Pendiente", "05" -> "5"), de modo que == compara enteros
+    - Fecha y hora y Fecha_formateada: datetime64 con zona horaria Argentina
+    """
+    if df.empty:
+        return df
+    df = df.copy()
+    for col in ("Nº Cliente", "ID Reclamo", "N° de Precinto"):
+        if col in df.columns:
+            df[col] = _texto(df[col])
+    categorias = {
+        "Estado": _canonico_por_nombre(ESTADOS_RECLAMO),
+        "Tipo de reclamo": _canonico_por_nombre(TIPOS_RECLAMO),
+        "Sector": _canonico_sector,
+        "Técnico": None
+    }
+    for col, canonico in categorias.items():
+        if col in df.columns:
+            df[col] = _categoria(df[col], canonico)
+    for col in ("Fecha y hora", "Fecha_formateada"):
+        if col in df.columns:
+            df[col] = parse_fechas(df[col])
+    return df
+
+def normalize_clientes(df: pd.DataFrame) -> pd.DataFrame:
+    """Igual que normalize_reclamos para la hoja de clientes"""
+    if df.empty:
+        return df
+    df = df.copy()
+    for col in ("Nº Cliente", "ID Cliente", "N° de Precinto"):
+        if col in df.columns:
+            df[col] = _texto(df[col])
+    if "Sector" in df.columns:
+        df["Sector"] = _categoria(df["Sector"], _canonico_sector)
+    return df
+
+# Normalización que se aplica a cada hoja antes de publicarla
+NORMALIZADORES = {
+    WORKSHEET_RECLAMOS: normalize_reclamos,
+    WORKSHEET_CLIENTES: normalize_clientes
+}
+
+def _dataframe_desde_snapshot(hoja: str, columnas) -> pd.DataFrame:
+    """DataFrame de la hoja a partir del snapshot local, ya normalizado"""
+    df = _values_to_dataframe(get_snapshot_store().get_values(hoja), columnas)
+    normalizar = NORMALIZADORES.get(hoja)
+    return normalizar(df) if normalizar else df
 
 @st.cache_data(ttl=30)
 def safe_get_sheet_data(_sheet, columnas=None):
@@ -14,24 +181,583 @@ def safe_get_sheet_data(_sheet, columnas=None):
         if error:
             st.error(f"Error al obtener datos: {error}")
             return pd.DataFrame(columns=columnas)
-        
-        if len(data) <= 1:
-            return pd.DataFrame(columns=columnas)
-        
-        headers = data[0]
-        rows = data[1:]
-        df = pd.DataFrame(rows, columns=headers)
 
-        for col in columnas:
-            if col not in df.columns:
-                df[col] = None
-        
-        return df[columnas]
+        return _values_to_dataframe(data, columnas)
     
     except Exception as e:
         st.error(f"Error crítico al cargar datos: {str(e)}")
         return pd.DataFrame(columns=columnas)
 
+def get_or_create_worksheet(spreadsheet, hoja: str, columnas: List[str]):
+    """
+    Worksheet con ese nombre; si no existe la crea con el encabezado
+
+    Para las hojas auxiliares que agrega la aplicación (p. ej. lecturas de
+    notificaciones): el batchGet de load_bootstrap_data falla si falta alguna.
+    """
+    try:
+        return spreadsheet.worksheet(hoja)
+    except WorksheetNotFound:
+        sheet = spreadsheet.add_worksheet(title=hoja, rows=100, cols=len(columnas))
+        sheet.update([columnas], "A1", value_input_option="RAW")
+        return sheet
+
+@st.cache_resource
+def get_snapshot_store() -> SnapshotStore:
+    """Snapshot local en disco compartido por todo el proceso"""
+    return SnapshotStore(SNAPSHOT_DB_PATH)
+
+@st.cache_resource
+def get_shared_cache() -> SharedSheetCache:
+    """DataFrames de cada hoja compartidos por todas las sesiones, con su versión"""
+    return SharedSheetCache()
+
+def get_data_versions() -> dict:
+    """Versión publicada de cada hoja; las sesiones la guardan junto a la referencia"""
+    return get_shared_cache().versions()
+
+# Cachés construidos a partir de cada hoja: {hoja: {nombre: función que los limpia}}
+_DERIVADOS: Dict[str, Dict[str, Callable[[], None]]] = {}
+
+def register_derived(hoja: str, nombre: str, clear_fn: Callable[[], None]) -> None:
+    """
+    Registra un caché derivado de una hoja para que invalidate() lo descarte
+    
+    Registrar dos veces el mismo nombre reemplaza la entrada anterior, así que
+    es seguro hacerlo en cada rerun.
+    """
+    _DERIVADOS.setdefault(hoja, {})[nombre] = clear_fn
+
+# safe_get_sheet_data solo usa las columnas como clave de caché
+register_derived(WORKSHEET_USUARIOS, "safe_get_sheet_data", partial(safe_get_sheet_data.clear, None, COLUMNAS_USUARIOS))
+register_derived(WORKSHEET_NOTIFICACIONES, "safe_get_sheet_data", partial(safe_get_sheet_data.clear, None, COLUMNAS_NOTIFICACIONES))
+
+def invalidate(*hojas: str) -> None:
+    """
+    Invalida solo las hojas indicadas y los datos derivados de ellas
+    
+    La próxima carga vuelve a leer esas hojas completas (verificando por
+    checksum) y publica una versión nueva si cambiaron; el resto de las
+    hojas y sus cachés no se tocan.
+    
+    Args:
+        *hojas: nombres de las hojas, p. ej. invalidate(WORKSHEET_RECLAMOS)
+    """
+    cache = get_shared_cache()
+    store = get_snapshot_store()
+    for hoja in hojas:
+        store.mark_stale(hoja)
+        cache.mark_dirty(hoja)
+        for clear_fn in _DERIVADOS.get(hoja, {}).values():
+            clear_fn()
+
+def _plan_sync(store: SnapshotStore, hoja: str):
+    """
+    Decide qué rangos leer de una hoja
+    
+    Una escritura que se aplicó al snapshot no obliga a releer la hoja: se
+    leen solo las filas que escribió (pendientes) junto con el final. Se lee
+    completa si vence la verificación periódica o si hubo una escritura que
+    no llegó a aplicarse localmente (falló o sigue en curso). La verificación
+    vence según SNAPSHOT_VERIFY_INTERVALS (SNAPSHOT_VERIFY_INTERVAL por defecto).
+    
+    Returns:
+        tuple: (modo, rangos) donde modo es 'completa' o 'incremental'; en
+        'incremental' el primer rango es el final y el resto, las pendientes
+    """
+    info = store.info(hoja)
+    if info is None or info["filas"] == 0 or hoja not in HOJAS_INCREMENTALES:
+        return "completa", [absolute_range_name(hoja)]
+
+    intervalo = SNAPSHOT_VERIFY_INTERVALS.get(hoja, SNAPSHOT_VERIFY_INTERVAL)
+    vencida = time.time() - info["ultima_verificacion"] > intervalo
+    ultima_escritura = api_manager.last_write(hoja)
+    sin_aplicar = ultima_escritura >= info["ultima_verificacion"] and ultima_escritura > info["aplicado"]
+    if vencida or sin_aplicar:
+        return "completa", [absolute_range_name(hoja)]
+
+    # Desde la última fila conocida (para verificar que no cambió) hasta el final
+    ultima_fila = info["filas"] + 1
+    ultima_columna = rowcol_to_a1(1, max(info["columnas"], 1)).rstrip("0123456789")
+    rangos = [absolute_range_name(hoja, f"A{ultima_fila}:{ultima_columna}")]
+    pendientes = [fila for fila in info["pendientes"] if fila < ultima_fila]
+    rangos += [
+        absolute_range_name(hoja, f"A{inicio}:{ultima_columna}{fin}")
+        for inicio, fin in sorted(coalesce_rows(pendientes))
+    ]
+    return "incremental", rangos
+
+def _filas_leidas(rango: str, valores: List[List[str]]) -> Dict[int, List[str]]:
+    """{número de fila: valores} de un rango A{inicio}:X{fin}; las filas vacías del final vienen como []"""
+    grilla = a1_range_to_grid_range(rango.split("!")[-1])
+    inicio = grilla["startRowIndex"] + 1
+    return {
+        fila: (valores[fila - inicio] if fila - inicio < len(valores) else [])
+        for fila in range(inicio, grilla["endRowIndex"] + 1)
+    }
+
+def _sync_snapshots(store: SnapshotStore, spreadsheet, hojas: Optional[List[str]] = None,
+                    priority: str = "interactive") -> set:
+    """
+    Sincroniza el snapshot local de las hojas (todas por defecto) con un único values:batchGet
+    
+    Returns:
+        set: hojas cuyo contenido cambió
+    """
+    hojas = hojas or [hoja for hoja, _ in HOJAS_BOOTSTRAP]
+    planes = [_plan_sync(store, hoja) for hoja in hojas]
+
+    respuesta, error = api_manager.safe_sheet_operation(
+        spreadsheet.values_batch_get, [rango for _, rangos in planes for rango in rangos],
+        is_batch=True, priority=priority
+    )
+    if error:
+        raise RuntimeError(error)
+
+    leidos = iter(respuesta.get("valueRanges", []))
+    cambiadas, releer = set(), []
+    for hoja, (modo, rangos) in zip(hojas, planes):
+        value_ranges = [next(leidos, {}) for _ in rangos]
+        valores = value_ranges[0].get("values", [])
+        if modo == "completa":
+            if store.reconcile(hoja, valores):
+                cambiadas.add(hoja)
+            continue
+
+        # La primera fila leída tiene que ser la última que ya conocíamos
+        info = store.info(hoja)
+        if not valores or checksum_fila(valores[0]) != info["checksum_ultima_fila"]:
+            releer.append(hoja)
+            continue
+        # Filas escritas localmente: se comparan solo esas
+        escritas = {}
+        for rango, value_range in zip(rangos[1:], value_ranges[1:]):
+            escritas.update(_filas_leidas(rango, value_range.get("values", [])))
+        if store.verify_rows(hoja, escritas):
+            cambiadas.add(hoja)
+        if len(valores) > 1:
+            store.append(hoja, valores[1:])
+            cambiadas.add(hoja)
+
+    if releer:
+        # Se editaron o borraron filas: se vuelve a leer completa solo esa hoja
+        respuesta, error = api_manager.safe_sheet_operation(
+            spreadsheet.values_batch_get, [absolute_range_name(hoja) for hoja in releer],
+            is_batch=True, priority=priority
+        )
+        if error:
+            raise RuntimeError(error)
+        for hoja, value_range in zip(releer, respuesta.get("valueRanges", [])):
+            if store.reconcile(hoja, value_range.get("values", [])):
+                cambiadas.add(hoja)
+
+    return cambiadas
+
+def load_bootstrap_data(spreadsheet, force: bool = False) -> SheetsBundle:
+    """
+    DataFrames de todas las hojas de la página, sin esperar a la API
+    
+    Los DataFrames se comparten entre todas las sesiones y los mantiene al día
+    el hilo de get_background_refresher: cada hoja se sincroniza según
+    REFRESH_INTERVALS o apenas una sesión la marca como modificada, y solo se
+    publica (con una versión nueva) si su contenido cambió. De las hojas que
+    solo crecen se leen únicamente las filas nuevas y las escritas desde esta
+    aplicación, con una verificación completa por checksum cada
+    SNAPSHOT_VERIFY_INTERVALS segundos según la hoja.
+    
+    Al arrancar el proceso se publica el snapshot guardado en disco; solo se
+    espera un values:batchGet si alguna hoja no tiene snapshot todavía.
+    
+    Args:
+        spreadsheet: objeto Spreadsheet de gspread
+        force: sincronizar ya, esperando la respuesta (p. ej. después de una migración)
+    
+    Returns:
+        SheetsBundle: un DataFrame por hoja (de solo lectura); vacío (con columnas) si hubo error
+    """
+    cache = get_shared_cache()
+    hojas = [hoja for hoja, _ in HOJAS_BOOTSTRAP]
+
+    if force or any(cache.get(hoja) is None for hoja in hojas):
+        with cache.sync_lock:
+            if not force:
+                # Otra sesión pudo haber cargado mientras esperábamos
+                _publicar_guardadas(cache, [hoja for hoja in hojas if cache.get(hoja) is None])
+            faltantes = hojas if force else [hoja for hoja in hojas if cache.get(hoja) is None]
+            if faltantes:
+                error = _refresh_shared_cache(cache, spreadsheet, faltantes)
+                if error:
+                    st.error(error)
+    get_background_refresher(spreadsheet)
+
+    frames = []
+    for hoja, columnas in HOJAS_BOOTSTRAP:
+        df = cache.get(hoja)
+        frames.append(df if df is not None else pd.DataFrame(columns=columnas))
+    return SheetsBundle(*frames)
+
+def get_data_timestamp() -> float:
+    """Momento (epoch) de la sincronización más vieja entre las hojas de la página; 0 si alguna nunca se sincronizó"""
+    cache = get_shared_cache()
+    return min(cache.synced_at(hoja) for hoja, _ in HOJAS_BOOTSTRAP)
+
+def get_current_frame(hoja: str) -> pd.DataFrame:
+    """
+    Último DataFrame publicado de la hoja (normalizado, de solo lectura), sin sincronizar
+    
+    Lo usan los st.fragment: al re-ejecutarse solos reciben los argumentos de la
+    última corrida completa, así que leen de acá los datos que ya incluyen sus
+    propias escrituras.
+    """
+    df = get_shared_cache().get(hoja)
+    return df if df is not None else pd.DataFrame(columns=dict(HOJAS_BOOTSTRAP).get(hoja))
+
+def _publicar_guardadas(cache: SharedSheetCache, hojas: List[str]) -> None:
+    """Publica las hojas que ya tienen snapshot en disco, sin marcarlas como sincronizadas"""
+    store = get_snapshot_store()
+    columnas_por_hoja = dict(HOJAS_BOOTSTRAP)
+    for hoja in hojas:
+        if store.info(hoja) is not None:
+            cache.publish(hoja, _dataframe_desde_snapshot(hoja, columnas_por_hoja[hoja]))
+
+def _refresh_shared_cache(cache: SharedSheetCache, spreadsheet, hojas: Optional[List[str]] = None,
+                          priority: str = "interactive") -> Optional[str]:
+    """
+    Sincroniza el snapshot local de las hojas (todas por defecto) y publica las que cambiaron
+    
+    Solo las hojas que se sincronizaron de verdad quedan marcadas como
+    sincronizadas: si la API falla conservan su hora anterior (y siguen
+    marcadas como modificadas), así el hilo las reintenta en la próxima vuelta
+    y la página no muestra como recientes datos viejos.
+    
+    Returns:
+        str: mensaje de error para mostrar, o None
+    """
+    hojas = hojas or [hoja for hoja, _ in HOJAS_BOOTSTRAP]
+    store = get_snapshot_store()
+    error = None
+    try:
+        cambiadas = _sync_snapshots(store, spreadsheet, hojas, priority)
+        sincronizadas = set(hojas)
+    except Exception as e:
+        # Si la API falla se muestran los últimos datos guardados
+        error = f"Error al obtener datos: {str(e)}"
+        cambiadas, sincronizadas = set(), set()
+
+    for hoja, columnas in HOJAS_BOOTSTRAP:
+        if hoja not in hojas or (hoja not in cambiadas and cache.get(hoja) is not None):
+            continue
+        try:
+            cache.publish(hoja, _dataframe_desde_snapshot(hoja, columnas))
+        except Exception as e:
+            error = f"Error crítico al cargar datos: {str(e)}"
+            cache.publish(hoja, pd.DataFrame(columns=columnas))
+            sincronizadas.discard(hoja)
+    cache.mark_synced([hoja for hoja in hojas if hoja in sincronizadas])
+    return error
+
+# Hilo de get_background_refresher, para despertarlo después de cada escritura
+_REFRESHER: Optional[BackgroundRefresher] = None
+
+@st.cache_resource
+def get_background_refresher(_spreadsheet) -> BackgroundRefresher:
+    """Hilo único por proceso que sincroniza las hojas compartidas en segundo plano"""
+    global _REFRESHER
+    cache = get_shared_cache()
+
+    def refrescar(hojas):
+        with cache.sync_lock:
+            return _refresh_shared_cache(cache, _spreadsheet, hojas, priority="background")
+
+    _REFRESHER = BackgroundRefresher(cache, refrescar, REFRESH_INTERVALS, tick=REFRESH_TICK).start()
+    return _REFRESHER
+
+def _avisar_escritura(hoja: str) -> None:
+    """Marca la hoja como modificada y despierta al hilo para que verifique ya lo escrito"""
+    get_shared_cache().mark_dirty(hoja)
+    if _REFRESHER is not None:
+        _REFRESHER.wake()
+
+def _publicar_desde_snapshot(hoja: str) -> None:
+    """Vuelve a publicar el DataFrame compartido de la hoja a partir del snapshot local"""
+    columnas = dict(HOJAS_BOOTSTRAP).get(hoja)
+    cache = get_shared_cache()
+    if columnas is None or cache.get(hoja) is None:
+        cache.mark_dirty(hoja)
+        return
+    cache.publish(hoja, _dataframe_desde_snapshot(hoja, columnas))
+
+def apply_local_updates(hoja: str, updates) -> None:
+    """
+    Aplica al snapshot y a los DataFrames compartidos una escritura ya confirmada
+    
+    La interfaz muestra el cambio en el próximo rerun sin volver a leer la hoja;
+    el hilo en segundo plano relee enseguida solo las filas escritas para
+    verificarlas contra Google Sheets.
+    """
+    if get_snapshot_store().patch(hoja, updates_to_cells(updates)):
+        _publicar_desde_snapshot(hoja)
+    _avisar_escritura(hoja)
+
+def apply_local_append(hoja: str, rows) -> None:
+    """Igual que apply_local_updates, para filas agregadas al final de la hoja"""
+    filas = [["" if valor is None else str(valor) for valor in fila] for fila in rows]
+    if get_snapshot_store().append_local(hoja, filas):
+        _publicar_desde_snapshot(hoja)
+    _avisar_escritura(hoja)
+
+def apply_local_delete(hoja: str, filas) -> None:
+    """Igual que apply_local_updates, para filas (números de fila de la hoja) ya borradas"""
+    if get_snapshot_store().delete_rows(hoja, filas):
+        _publicar_desde_snapshot(hoja)
+    _avisar_escritura(hoja)
+
+def get_column_map(hoja: str) -> Dict[str, int]:
+    """
+    Nombre de columna -> número de columna (1 = A) según el encabezado real de la hoja
+    
+    Se arma una vez por versión del snapshot. Si la hoja todavía no tiene
+    snapshot se usa el orden de columnas de la configuración.
+    """
+    def _construir(_df):
+        encabezados = get_snapshot_store().headers(hoja) or dict(HOJAS_BOOTSTRAP).get(hoja, [])
+        mapa = {}
+        for numero, nombre in enumerate(encabezados, start=1):
+            nombre = str(nombre).strip()
+            if nombre and nombre not in mapa:
+                mapa[nombre] = numero
+        return mapa
+    return get_shared_cache().derived(hoja, "column_map", _construir)
+
+def column_letter(hoja: str, nombre: str) -> str:
+    """Letra de la columna con ese encabezado, p. ej. column_letter('Reclamos', 'Estado') -> 'I'"""
+    return rowcol_to_a1(1, get_column_map(hoja)[nombre]).rstrip("0123456789")
+
+def build_row(hoja: str, valores: Dict[str, Any]) -> List:
+    """
+    Arma una fila completa para agregar a la hoja ubicando cada valor por nombre de columna
+    
+    Raises:
+        ValueError: si alguna columna no existe en la hoja
+    """
+    mapa = get_column_map(hoja)
+    faltantes = [nombre for nombre in valores if nombre not in mapa]
+    if faltantes:
+        raise ValueError(f"La hoja {hoja} no tiene las columnas: {', '.join(faltantes)}")
+    fila = [""] * max(mapa.values(), default=0)
+    for nombre, valor in valores.items():
+        fila[mapa[nombre] - 1] = valor
+    return fila
+
+# Columnas de la hoja de clientes que se agregan a cada reclamo (con sufijo _cliente)
+COLUMNAS_CLIENTE_EN_RECLAMOS = ["N° de Precinto", "Teléfono"]
+
+def _enriquecer_reclamos(df_reclamos: pd.DataFrame, df_clientes: pd.DataFrame) -> pd.DataFrame:
+    """
+    Reclamos con los datos de su cliente, sin cambiar el índice ni el orden
+    
+    Equivale a un merge left por Nº Cliente (primer cliente si hay repetidos),
+    pero con Series.map, que no reindexa ni duplica filas.
+    """
+    if df_reclamos.empty or "Nº Cliente" not in df_reclamos.columns:
+        return df_reclamos
+    if "Nº Cliente" in df_clientes.columns:
+        clientes = df_clientes.drop_duplicates(subset=["Nº Cliente"]).set_index("Nº Cliente")
+    else:
+        clientes = pd.DataFrame(columns=COLUMNAS_CLIENTE_EN_RECLAMOS)
+    claves = df_reclamos["Nº Cliente"]
+    columnas = {"Cliente registrado": claves.isin(clientes.index)}
+    for col in COLUMNAS_CLIENTE_EN_RECLAMOS:
+        origen = clientes[col] if col in clientes.columns else pd.Series(dtype="string")
+        columnas[f"{col}_cliente"] = claves.map(origen).astype("string").fillna("")
+    return df_reclamos.assign(**columnas)
+
+def get_enriched_claims(df_reclamos: pd.DataFrame, df_clientes: pd.DataFrame) -> pd.DataFrame:
+    """
+    Reclamos ⨝ Clientes (N° de Precinto_cliente, Teléfono_cliente, Cliente registrado)
+    
+    Si los DataFrames son los publicados en el caché compartido, el resultado
+    se calcula una vez por par de versiones y lo comparten todas las páginas y
+    sesiones: es de solo lectura.
+    """
+    cache = get_shared_cache()
+    if cache.get(WORKSHEET_RECLAMOS) is df_reclamos and cache.get(WORKSHEET_CLIENTES) is df_clientes:
+        return cache.derived_join(
+            (WORKSHEET_RECLAMOS, WORKSHEET_CLIENTES), "reclamos_enriquecidos", _enriquecer_reclamos
+        )
+    return _enriquecer_reclamos(df_reclamos, df_clientes)
+
+def get_row_locator(hoja: str, columna: Optional[str] = None) -> RowLocator:
+    """Índice valor -> fila de la hoja, construido una vez por versión del snapshot"""
+    columna = columna or COLUMNAS_ID[hoja]
+    return get_shared_cache().derived(
+        hoja, f"row_locator:{columna}", lambda df: RowLocator.from_dataframe(df, columna)
+    )
+
+def _registros_por_cliente(df: pd.DataFrame) -> Dict[str, List[dict]]:
+    """{Nº Cliente: [registros]} conservando el orden de la hoja"""
+    indice: Dict[str, List[dict]] = {}
+    if "Nº Cliente" not in df.columns:
+        return indice
+    for registro in df.to_dict("records"):
+        if registro["Nº Cliente"]:
+            indice.setdefault(registro["Nº Cliente"], []).append(registro)
+    return indice
+
+def get_client_record(nro_cliente: str) -> Optional[dict]:
+    """
+    Registro del cliente por Nº Cliente en O(1), o None si no está en el snapshot
+    
+    El índice se construye una vez por versión de la hoja de clientes y se
+    comparte entre sesiones: el dict devuelto es de solo lectura. Si el número
+    está repetido se usa el primero, igual que RowLocator.
+    """
+    indice = get_shared_cache().derived(
+        WORKSHEET_CLIENTES, "clientes_por_numero",
+        lambda df: {nro: registros[0] for nro, registros in _registros_por_cliente(df).items()}
+    )
+    return indice.get(str(nro_cliente).strip())
+
+def get_active_claims(nro_cliente: str) -> List[dict]:
+    """
+    Reclamos activos (ESTADOS_ACTIVOS) del cliente en O(1), de solo lectura
+    
+    Sirve de control de duplicados al cargar un reclamo nuevo. El índice se
+    construye una vez por versión de la hoja de reclamos.
+    """
+    indice = get_shared_cache().derived(
+        WORKSHEET_RECLAMOS, "reclamos_activos_por_cliente",
+        lambda df: _registros_por_cliente(df[df["Estado"].isin(ESTADOS_ACTIVOS)]) if "Estado" in df.columns else {}
+    )
+    return indice.get(str(nro_cliente).strip(), [])
+
+# Columnas sobre las que buscan los selectores de reclamos y clientes
+COLUMNAS_BUSQUEDA = ["Nº Cliente", "Nombre", "Dirección", "Teléfono"]
+
+def get_search_index(hoja: str) -> SearchIndex:
+    """Índice de búsqueda (prefijos y trigramas) de la hoja, construido una vez por versión del snapshot"""
+    return get_shared_cache().derived(
+        hoja, "search_index", lambda df: SearchIndex.from_dataframe(df, COLUMNAS_BUSQUEDA)
+    )
+
+def locate_rows(sheet, valores, columna: Optional[str] = None) -> Tuple[Dict[str, int], Optional[str]]:
+    """
+    Filas de la hoja donde están los registros con esos valores en la columna clave
+    
+    Las filas salen del índice del snapshot y se confirman leyendo solo la celda
+    clave de cada una (un único values:batchGet). Si alguna no coincide porque se
+    insertaron o borraron filas, se relee solo la columna clave, se reconstruye el
+    índice y se invalida la hoja para que la próxima carga la sincronice.
+    
+    Args:
+        sheet: worksheet de gspread
+        valores: IDs a ubicar (por defecto de la columna de COLUMNAS_ID)
+        columna: columna clave alternativa, p. ej. "Nº Cliente"
+    
+    Returns:
+        tuple: ({valor: fila}, error) con solo los valores encontrados
+    """
+    hoja = sheet.title
+    columna = columna or COLUMNAS_ID[hoja]
+    valores = list(dict.fromkeys(str(v).strip() for v in valores if str(v).strip()))
+    if not valores:
+        return {}, None
+
+    if columna not in get_column_map(hoja):
+        return {}, f"La hoja {hoja} no tiene la columna {columna}"
+    letra = column_letter(hoja, columna)
+
+    locator = get_row_locator(hoja, columna)
+    filas = {valor: locator.row(valor) for valor in valores if locator.row(valor) is not None}
+
+    verificadas = {}
+    if filas:
+        rangos = [absolute_range_name(hoja, f"{letra}{fila}") for fila in filas.values()]
+        respuesta, error = api_manager.safe_sheet_operation(
+            sheet.spreadsheet.values_batch_get, rangos, is_batch=True
+        )
+        if error:
+            return {}, error
+        for (valor, fila), value_range in zip(filas.items(), respuesta.get("valueRanges", [])):
+            celda = value_range.get("values", [[""]])
+            if celda and celda[0] and str(celda[0][0]).strip() == valor:
+                verificadas[valor] = fila
+
+    if len(verificadas) == len(valores):
+        return verificadas, None
+
+    # El índice quedó desactualizado: se relee solo la columna clave
+    respuesta, error = api_manager.safe_sheet_operation(
+        sheet.spreadsheet.values_get, absolute_range_name(hoja, f"{letra}2:{letra}")
+    )
+    if error:
+        return verificadas, error
+    locator = RowLocator.from_column(columna, (fila[0] if fila else "" for fila in respuesta.get("values", [])))
+    if len(verificadas) < len(filas):
+        invalidate(hoja)
+    for valor in valores:
+        if valor not in verificadas and locator.row(valor) is not None:
+            verificadas[valor] = locator.row(valor)
+    return verificadas, None
+
+def locate_row(sheet, valor, columna: Optional[str] = None) -> Tuple[Optional[int], Optional[str]]:
+    """
+    Fila verificada de un único registro (ver locate_rows)
+    
+    Returns:
+        tuple: (fila, error); fila es None si no se encontró
+    """
+    filas, error = locate_rows(sheet, [valor], columna)
+    fila = filas.get(str(valor).strip())
+    if fila is None and error is None:
+        error = f"No se encontró {columna or COLUMNAS_ID[sheet.title]} = {valor} en la hoja {sheet.title}"
+    return fila, error
+
+def update_rows(sheet, cambios: Dict[Any, Dict[str, Any]], columna: Optional[str] = None) -> Tuple[bool, Optional[str]]:
+    """
+    Actualiza varios registros por ID y nombre de columna
+    
+    Ubica las filas con locate_rows (una lectura de verificación para todas) y
+    encola las celdas; la cola las une en un rango por fila.
+    
+    Args:
+        sheet: worksheet de gspread
+        cambios: {id: {"Estado": "En curso", "Técnico": "..."}}
+        columna: columna clave alternativa (por defecto la de COLUMNAS_ID)
+    
+    Returns:
+        tuple: (success, error)
+    """
+    if not cambios:
+        return True, None
+    hoja = sheet.title
+    mapa = get_column_map(hoja)
+    faltantes = sorted({nombre for valores in cambios.values() for nombre in valores} - set(mapa))
+    if faltantes:
+        return False, f"La hoja {hoja} no tiene las columnas: {', '.join(faltantes)}"
+
+    filas, error = locate_rows(sheet, cambios.keys(), columna)
+    if error:
+        return False, error
+    no_encontrados = [str(id_valor) for id_valor in cambios if str(id_valor).strip() not in filas]
+    if no_encontrados:
+        return False, f"No se encontraron en la hoja {hoja}: {', '.join(no_encontrados)}"
+
+    updates = [
+        {"range": rowcol_to_a1(filas[str(id_valor).strip()], mapa[nombre]), "values": [[valor]]}
+        for id_valor, valores in cambios.items()
+        for nombre, valor in valores.items()
+    ]
+    return batch_update_sheet(sheet, updates)
+
+def update_row(sheet, id_valor, valores: Dict[str, Any], columna: Optional[str] = None) -> Tuple[bool, Optional[str]]:
+    """
+    Actualiza un registro por ID y nombre de columna
+    
+    Ejemplo: update_row(sheet_reclamos, id_reclamo, {"Estado": "En curso", "Técnico": "JUAN"})
+    """
+    return update_rows(sheet, {id_valor: valores}, columna)
+
 def safe_normalize(df, column):
     """Normaliza una columna de forma segura"""
     if column in df.columns:
@@ -75,12 +801,81 @@ def update_sheet_data(sheet, data, is_batch=True):
     except Exception as e:
         return False, str(e)
 
-def batch_update_sheet(sheet, updates):
-    """Realiza múltiples actualizaciones en batch"""
+def build_delete_requests(sheet, filas) -> List[Dict]:
+    """
+    Pedidos deleteDimension para borrar esas filas en un único batchUpdate
+    
+    Las filas consecutivas se unen en un solo rango y los rangos van de abajo
+    hacia arriba (ver coalesce_rows), así cada borrado no corre a los siguientes.
+    
+    Raises:
+        ValueError: si se incluye el encabezado (fila 1)
+    """
+    tramos = coalesce_rows(filas)
+    if tramos and tramos[-1][0] < 2:
+        raise ValueError("No se puede borrar el encabezado de la hoja")
+    return [
+        {
+            "deleteDimension": {
+                "range": {
+                    "sheetId": sheet.id,
+                    "dimension": "ROWS",
+                    "startIndex": inicio - 1,
+                    "endIndex": fin
+                }
+            }
+        }
+        for inicio, fin in tramos
+    ]
+
+def delete_rows(sheet, filas) -> Tuple[bool, Optional[str]]:
+    """
+    Borra filas de la hoja en un único batchUpdate (ver build_delete_requests)
+    
+    Antes se envía lo pendiente en la cola de escrituras, que usa números de
+    fila. Borrar no es idempotente: no se reintenta ante errores 5xx.
+    
+    Args:
+        sheet: worksheet de gspread
+        filas: números de fila de la hoja (1 = encabezado), p. ej. de locate_rows
+    
+    Returns:
+        tuple: (success, error)
+    """
+    filas = sorted({int(fila) for fila in filas})
+    if not filas:
+        return True, None
+
     try:
-        result, error = api_manager.safe_sheet_operation(
-            sheet.batch_update, updates, is_batch=True
+        pedidos = build_delete_requests(sheet, filas)
+        write_queue.flush()
+        api_manager.register_write(sheet)
+        _, error = api_manager.safe_sheet_operation(
+            sheet.spreadsheet.batch_update, {"requests": pedidos}, is_batch=True, idempotent=False
         )
-        return result is not None, error
+        if error:
+            return False, error
+        apply_local_delete(sheet.title, filas)
+        return True, None
+    except Exception as e:
+        return False, str(e)
+
+def batch_update_sheet(sheet, updates):
+    """Realiza múltiples actualizaciones en batch a través de la cola de escrituras"""
+    try:
+        success, error = write_queue.enqueue_updates(sheet, updates).result(timeout=WRITE_WAIT_TIMEOUT)
+        if success:
+            apply_local_updates(sheet.title, updates)
+        return success, error
     except Exception as e:
-        return False, str(e)
\ No newline at end of file
+        return False, str(e)
+
+def append_rows(sheet, rows):
+    """Agrega filas al final de la hoja a través de la cola de escrituras"""
+    try:
+        success, error = write_queue.enqueue_append(sheet, rows).result(timeout=WRITE_WAIT_TIMEOUT)
+        if success:
+            apply_local_append(sheet.title, rows)
+        return success, error
+    except Exception as e:
+        return False, str(e)
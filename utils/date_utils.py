@@ -10,6 +10,20 @@ from typing import Union, Optional
 # Configuración de zona horaria (constante global)
 ARGENTINA_TZ = pytz.timezone("America/Argentina/Buenos_Aires")
 
+# Formatos de fecha compatibles (ordenados por probabilidad de uso)
+FORMATOS_FECHA = [
+    '%d/%m/%Y %H:%M:%S',  # 25/12/2023 14:30:45
+    '%d-%m-%Y %H:%M:%S',  # 25-12-2023 14:30:45
+    '%d/%m/%Y %H:%M',     # 25/12/2023 14:30
+    '%d-%m-%Y %H:%M',     # 25-12-2023 14:30
+    '%Y-%m-%d %H:%M:%S',  # 2023-12-25 14:30:45 (ISO)
+    '%Y/%m/%d %H:%M:%S',  # 2023/12/25 14:30:45
+    '%d/%m/%Y',           # 25/12/2023
+    '%d-%m-%Y',           # 25-12-2023
+    '%Y%m%d %H:%M:%S',    # 20231225 14:30:45
+    '%Y%m%d',             # 20231225
+]
+
 def ahora_argentina() -> datetime:
     """Devuelve la fecha y hora actual en zona horaria Argentina"""
     return datetime.now(ARGENTINA_TZ)
@@ -49,22 +63,8 @@ def parse_fecha(
     if not fecha_str:
         return pd.NaT
     
-    # Lista de formatos compatibles (ordenados por probabilidad de uso)
-    formatos = [
-        '%d/%m/%Y %H:%M:%S',  # 25/12/2023 14:30:45
-        '%d-%m-%Y %H:%M:%S',  # 25-12-2023 14:30:45
-        '%d/%m/%Y %H:%M',     # 25/12/2023 14:30
-        '%d-%m-%Y %H:%M',     # 25-12-2023 14:30
-        '%Y-%m-%d %H:%M:%S',  # 2023-12-25 14:30:45 (ISO)
-        '%Y/%m/%d %H:%M:%S',  # 2023/12/25 14:30:45
-        '%d/%m/%Y',           # 25/12/2023
-        '%d-%m-%Y',           # 25-12-2023
-        '%Y%m%d %H:%M:%S',    # 20231225 14:30:45
-        '%Y%m%d',             # 20231225
-    ]
-    
     # Intentar con cada formato
-    for fmt in formatos:
+    for fmt in FORMATOS_FECHA:
         try:
             dt = datetime.strptime(fecha_str, fmt)
             # Si el formato no incluye hora, establecer medianoche
@@ -88,6 +88,66 @@ def parse_fecha(
     
     return pd.NaT
 
+def _encaja(texto: str, fmt: str) -> bool:
+    try:
+        datetime.strptime(texto, fmt)
+        return True
+    except ValueError:
+        return False
+
+def parse_fechas(serie: pd.Series, dayfirst: bool = True) -> pd.Series:
+    """
+    Versión vectorizada de parse_fecha para una columna entera.
+    
+    Agrupa los valores por su "forma" (los dígitos reemplazados por 9, p. ej.
+    99/99/9999 99:99), detecta el formato de cada grupo con un solo valor de
+    muestra, parsea cada grupo con pd.to_datetime(format=...) y localiza a hora
+    argentina de una sola vez. Solo los valores que no encajan en ningún
+    formato pasan por parse_fecha.
+    
+    Args:
+        serie: Columna con fechas (strings, datetimes o ya datetime64)
+        dayfirst: Igual que en parse_fecha, para los valores sin formato conocido
+    
+    Returns:
+        Serie datetime64 con zona horaria Argentina (NaT donde no se pudo parsear)
+    """
+    tipo_tz = pd.DatetimeTZDtype(tz=ARGENTINA_TZ)
+
+    # Ya viene parseada: solo se ajusta la zona horaria
+    if pd.api.types.is_datetime64_any_dtype(serie):
+        if serie.dt.tz is None:
+            return serie.dt.tz_localize(ARGENTINA_TZ, ambiguous="NaT", nonexistent="shift_forward")
+        return serie.dt.tz_convert(ARGENTINA_TZ)
+
+    textos = serie.astype("string").str.strip()
+    textos = textos.mask(textos.isin(["", "NaT", "nan", "None"]))
+    pendientes = textos.notna()
+    naive = pd.Series(pd.NaT, index=serie.index, dtype="datetime64[ns]")
+
+    formas = textos[pendientes].str.replace(r"\d", "9", regex=True)
+    for forma in formas.unique():
+        grupo = formas.index[formas == forma]
+        muestra = textos[grupo[0]]
+        fmt = next((fmt for fmt in FORMATOS_FECHA if _encaja(muestra, fmt)), None)
+        if fmt is None:
+            continue
+        parseadas = pd.to_datetime(textos[grupo], format=fmt, errors="coerce")
+        ok = grupo[parseadas.notna().to_numpy()]
+        naive.loc[ok] = parseadas[ok]
+        pendientes.loc[ok] = False
+
+    resultado = naive.dt.tz_localize(ARGENTINA_TZ, ambiguous="NaT", nonexistent="shift_forward")
+
+    # Lo que no encajó en ningún formato (datetimes sueltos, ISO con "T", etc.) va fila por fila
+    if pendientes.any() or (serie.notna() & textos.isna()).any():
+        resto = pendientes | (serie.notna() & textos.isna())
+        sueltas = serie[resto].map(lambda valor: parse_fecha(valor, dayfirst=dayfirst))
+        sueltas = pd.to_datetime(sueltas, errors="coerce", utc=True).dt.tz_convert(ARGENTINA_TZ)
+        resultado.loc[sueltas.index] = sueltas
+
+    return resultado.astype(tipo_tz)
+
 def format_fecha(
     fecha: Union[datetime, pd.Timestamp, str, None], 
     formato: str = '%d/%m/%Y %H:%M',
@@ -174,4 +234,31 @@ def diferencia_fechas(
         
         return unidades.get(unidad.lower(), segundos / 3600)
     except Exception:
-        return None
\ No newline at end of file
+        return None
+
+if __name__ == "__main__":
+    # Benchmark: parse_fechas contra el .apply(parse_fecha) que se usaba antes
+    # Uso: python -m utils.date_utils [cantidad_de_filas]
+    import sys
+    import time
+    import numpy as np
+
+    filas = int(sys.argv[1]) if len(sys.argv) > 1 else 50_000
+    rng = np.random.default_rng(0)
+    base = pd.Timestamp("2023-01-01") + pd.to_timedelta(rng.integers(0, 3 * 365 * 24 * 60, filas), unit="m")
+    formatos = rng.choice(["%d/%m/%Y %H:%M", "%d/%m/%Y %H:%M:%S", "%Y-%m-%d %H:%M:%S", "%d/%m/%Y"], filas, p=[0.7, 0.2, 0.08, 0.02])
+    valores = pd.Series([fecha.strftime(fmt) for fecha, fmt in zip(base, formatos)], dtype=object)
+    valores[rng.choice(filas, filas // 100, replace=False)] = ""
+
+    inicio = time.perf_counter()
+    esperado = valores.apply(parse_fecha)
+    tiempo_apply = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    obtenido = parse_fechas(valores)
+    tiempo_vectorizado = time.perf_counter() - inicio
+
+    esperado = pd.to_datetime(esperado, utc=True).dt.tz_convert(ARGENTINA_TZ).astype(obtenido.dtype)
+    assert esperado.equals(obtenido), "parse_fechas no coincide con parse_fecha"
+    print(f"{filas} filas | apply(parse_fecha): {tiempo_apply:.3f}s | parse_fechas: {tiempo_vectorizado:.3f}s "
+          f"| x{tiempo_apply / tiempo_vectorizado:.1f}")
@@ -0,0 +1,239 @@
+"""
+Espejo en memoria de la hoja de notificaciones
+Asigna IDs dentro del proceso, guarda las notificaciones recientes en un ring buffer
+y mantiene un índice de no leídas por destinatario y de leídas por usuario
+"""
+import heapq
+import threading
+from collections import defaultdict, deque
+from itertools import islice
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+import pandas as pd
+
+from utils.date_utils import parse_fechas
+
+def _leida(valor) -> bool:
+    return valor is True or str(valor).strip().upper() == "TRUE"
+
+def registros_desde_dataframe(df: pd.DataFrame) -> List[Dict]:
+    """Filas de la hoja -> notificaciones con ID entero, Leída bool y Fecha_Hora parseada"""
+    if df.empty or "ID" not in df.columns:
+        return []
+    df = df.assign(
+        ID=pd.to_numeric(df["ID"], errors="coerce"),
+        Fecha_Hora=parse_fechas(df["Fecha_Hora"]),
+        **{"Leída": df["Leída"].map(_leida)}
+    )
+    df = df[df["ID"].notna()].astype({"ID": int})
+    return df.to_dict("records")
+
+def ids_a_texto(ids: Iterable[int]) -> str:
+    """Conjunto de IDs -> rangos compactos, p. ej. {1, 2, 3, 7} -> 1-3,7"""
+    partes = []
+    inicio = anterior = None
+    for notif_id in sorted(set(ids)):
+        if anterior is not None and notif_id == anterior + 1:
+            anterior = notif_id
+            continue
+        if inicio is not None:
+            partes.append(str(inicio) if inicio == anterior else f"{inicio}-{anterior}")
+        inicio = anterior = notif_id
+    if inicio is not None:
+        partes.append(str(inicio) if inicio == anterior else f"{inicio}-{anterior}")
+    return ",".join(partes)
+
+def ids_desde_texto(texto) -> Set[int]:
+    """Inversa de ids_a_texto; ignora los tramos mal formados"""
+    ids = set()
+    for parte in str(texto or "").split(","):
+        desde, _, hasta = parte.strip().partition("-")
+        try:
+            ids.update(range(int(desde), int(hasta or desde) + 1))
+        except ValueError:
+            continue
+    return ids
+
+def leidas_desde_dataframe(df: pd.DataFrame) -> Dict[str, Set[int]]:
+    """Filas de la hoja de lecturas -> {username: IDs leídos}"""
+    if df.empty or "username" not in df.columns or "IDs" not in df.columns:
+        return {}
+    leidas: Dict[str, Set[int]] = defaultdict(set)
+    for username, texto in zip(df["username"], df["IDs"]):
+        username = str(username).strip()
+        if username:
+            leidas[username] |= ids_desde_texto(texto)
+    return dict(leidas)
+
+class NotificationStore:
+    """
+    Notificaciones recientes e IDs, compartidos por todas las sesiones del proceso.
+
+    El ring buffer refleja las últimas `capacidad` filas de la hoja publicada
+    (en orden de alta) y se reconstruye solo cuando la hoja cambia por fuera;
+    las altas y lecturas propias se aplican en el lugar. Los IDs salen de un
+    contador que se siembra con el máximo de la hoja y nunca retrocede, así
+    dos altas simultáneas no repiten ID.
+
+    Las notificaciones del buffer sin la marca global Leída (de la versión
+    anterior) se indexan por Usuario_Destino (un usuario, un rol o 'all').
+    Lo que leyó cada usuario es un conjunto de IDs propio, espejo de la hoja
+    de lecturas: las no leídas de un usuario son la diferencia entre los
+    grupos de sus destinos y ese conjunto, sin recorrer el buffer.
+    """
+
+    def __init__(self, capacidad: int):
+        self._lock = threading.RLock()
+        self.compact_lock = threading.Lock()
+        self._buffer: deque = deque(maxlen=capacidad)
+        self._por_id: Dict[int, Dict] = {}
+        self._no_leidas: Dict[str, Dict[int, Dict]] = defaultdict(dict)
+        self._leidas: Dict[str, Set[int]] = {}
+        self._siguiente_id = 1
+        self._version: Optional[int] = None
+        self._version_leidas: Optional[int] = None
+
+    def sync(self, version: int, df: pd.DataFrame) -> None:
+        """Reconstruye el buffer si la versión publicada no es la que refleja"""
+        with self._lock:
+            if version == self._version:
+                return
+            registros = registros_desde_dataframe(df)
+            self._buffer.clear()
+            self._por_id.clear()
+            self._no_leidas.clear()
+            self._agregar(registros)
+            if registros:
+                self._siguiente_id = max(self._siguiente_id, max(r["ID"] for r in registros) + 1)
+            self._version = version
+
+    def _agregar(self, registros: Iterable[Dict]) -> None:
+        for registro in registros:
+            if len(self._buffer) == self._buffer.maxlen:
+                self._quitar_del_indice(self._buffer[0])
+            self._buffer.append(registro)
+            self._por_id[registro["ID"]] = registro
+            if not registro["Leída"]:
+                self._no_leidas[str(registro["Usuario_Destino"])][registro["ID"]] = registro
+
+    def _quitar_del_indice(self, registro: Dict) -> None:
+        self._por_id.pop(registro["ID"], None)
+        self._quitar_no_leida(registro)
+
+    def _quitar_no_leida(self, registro: Dict) -> None:
+        destino = str(registro["Usuario_Destino"])
+        pendientes = self._no_leidas.get(destino)
+        if pendientes is not None:
+            pendientes.pop(registro["ID"], None)
+            if not pendientes:
+                del self._no_leidas[destino]
+
+    def sync_read_state(self, version: int, df: pd.DataFrame) -> None:
+        """Recarga las lecturas por usuario si la versión publicada no es la que refleja"""
+        with self._lock:
+            if version == self._version_leidas:
+                return
+            self._leidas = leidas_desde_dataframe(df)
+            self._version_leidas = version
+
+    @staticmethod
+    def _adoptada(actual: Optional[int], version_antes: Optional[int],
+                  version_despues: Optional[int]) -> Optional[int]:
+        """
+        Si la única publicación entre las dos versiones fue la escritura propia,
+        el espejo ya está al día y adopta la nueva; si no, se reconstruye en el
+        próximo sync
+        """
+        if version_antes is None or version_despues is None:
+            return actual
+        if actual == version_antes and version_despues == version_antes + 1:
+            return version_despues
+        return actual
+
+    def _adoptar(self, version_antes: Optional[int], version_despues: Optional[int]) -> None:
+        self._version = self._adoptada(self._version, version_antes, version_despues)
+
+    def allocate(self, cantidad: int = 1) -> List[int]:
+        """Reserva `cantidad` IDs consecutivos"""
+        with self._lock:
+            inicio = self._siguiente_id
+            self._siguiente_id += cantidad
+            return list(range(inicio, inicio + cantidad))
+
+    def push(self, registros: Iterable[Dict], version_antes: Optional[int] = None,
+             version_despues: Optional[int] = None) -> None:
+        """
+        Agrega notificaciones ya escritas en la hoja
+
+        Un sync concurrente pudo haber reconstruido el buffer con estas filas
+        ya incluidas: las que tienen un ID conocido se saltean.
+        """
+        with self._lock:
+            self._agregar([r for r in registros if r["ID"] not in self._por_id])
+            self._adoptar(version_antes, version_despues)
+
+    def read_ids(self, username: str) -> Set[int]:
+        """Copia de los IDs que leyó el usuario"""
+        with self._lock:
+            return set(self._leidas.get(username, ()))
+
+    def oldest_id(self) -> Optional[int]:
+        """ID más chico del buffer; las lecturas anteriores ya no se consultan"""
+        with self._lock:
+            return min(self._por_id) if self._por_id else None
+
+    def mark_read(self, username: str, ids: Iterable[int], version_antes: Optional[int] = None,
+                  version_despues: Optional[int] = None) -> None:
+        """Registra lecturas del usuario ya escritas en la hoja de lecturas"""
+        with self._lock:
+            self._leidas.setdefault(username, set()).update(ids)
+            self._version_leidas = self._adoptada(self._version_leidas, version_antes, version_despues)
+
+    def remove(self, ids: Iterable[int]) -> None:
+        ids = set(ids)
+        with self._lock:
+            if not ids & self._por_id.keys():
+                return
+            restantes = [r for r in self._buffer if r["ID"] not in ids]
+            for notif_id in ids:
+                registro = self._por_id.get(notif_id)
+                if registro is not None:
+                    self._quitar_del_indice(registro)
+            self._buffer.clear()
+            self._buffer.extend(restantes)
+
+    def unread(self, destinos: Iterable[str], username: str,
+               limite: Optional[int] = None) -> Tuple[int, List[Dict]]:
+        """
+        No leídas por el usuario entre las enviadas a sus destinos (p. ej. usuario, rol y 'all')
+
+        Returns:
+            tuple: (cantidad total, las `limite` más nuevas primero, como copias)
+        """
+        with self._lock:
+            leidas = self._leidas.get(username, set())
+            grupos = [self._no_leidas[d] for d in set(destinos) if d in self._no_leidas]
+            pendientes = [grupo.keys() - leidas for grupo in grupos]
+            cantidad = sum(len(ids) for ids in pendientes)
+            # Cada grupo está en orden de alta; se mezclan de la más nueva a la más vieja
+            recientes = heapq.merge(
+                *(filter(lambda r, ids=ids: r["ID"] in ids, reversed(grupo.values()))
+                  for grupo, ids in zip(grupos, pendientes)),
+                key=lambda r: r["ID"], reverse=True
+            )
+            return cantidad, [dict(r) for r in islice(recientes, limite)]
+
+    def recent(self, filtro: Optional[Callable[[Dict], bool]] = None,
+               limite: Optional[int] = None) -> List[Dict]:
+        """Notificaciones del buffer que cumplen el filtro, las más nuevas primero (copias)"""
+        resultado = []
+        with self._lock:
+            for registro in reversed(self._buffer):
+                if filtro is None or filtro(registro):
+                    resultado.append(dict(registro))
+                    if limite is not None and len(resultado) >= limite:
+                        break
+        return resultado
+
+    def __len__(self) -> int:
+        return len(self._buffer)
@@ -0,0 +1,49 @@
+"""
+Índice de filas por ID para escribir en la fila correcta de cada hoja
+Reemplaza el cálculo df.index + 2, que se rompe con merges o filas insertadas/borradas
+"""
+from typing import Dict, Iterable, Optional
+
+import pandas as pd
+
+class RowLocator:
+    """
+    Mapa valor de la columna clave -> número de fila en Google Sheets.
+
+    Se construye una vez por snapshot a partir del DataFrame publicado, cuyo
+    índice i corresponde a la fila i + 2 de la hoja. Si un valor aparece más
+    de una vez se conserva la primera fila, igual que las búsquedas de la UI.
+    """
+
+    def __init__(self, columna: str, filas: Dict[str, int]):
+        self.columna = columna
+        self._filas = filas
+
+    @classmethod
+    def from_dataframe(cls, df: pd.DataFrame, columna: str) -> "RowLocator":
+        if columna not in df.columns:
+            return cls(columna, {})
+        valores = df[columna].astype(str).str.strip()
+        return cls.from_values(columna, zip(valores, df.index + 2))
+
+    @classmethod
+    def from_column(cls, columna: str, valores: Iterable, primera_fila: int = 2) -> "RowLocator":
+        """Construye el índice desde una columna leída de la hoja (sin encabezado)"""
+        return cls.from_values(columna, (
+            (str(valor).strip(), primera_fila + i) for i, valor in enumerate(valores)
+        ))
+
+    @classmethod
+    def from_values(cls, columna: str, pares: Iterable) -> "RowLocator":
+        filas = {}
+        for valor, fila in pares:
+            if valor and valor not in ("nan", "None") and valor not in filas:
+                filas[valor] = int(fila)
+        return cls(columna, filas)
+
+    def row(self, valor) -> Optional[int]:
+        """Fila de la hoja donde está el valor, o None si no está en el snapshot"""
+        return self._filas.get(str(valor).strip())
+
+    def __len__(self) -> int:
+        return len(self._filas)
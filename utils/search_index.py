@@ -0,0 +1,162 @@
+"""
+Índice de búsqueda en memoria para los selectores de reclamos y clientes
+Se construye una vez por snapshot y responde cada tecla sin recorrer el DataFrame
+"""
+import heapq
+import re
+import unicodedata
+from collections import defaultdict
+from typing import Dict, Hashable, Iterable, List, Optional, Set
+
+import pandas as pd
+
+PREFIJO_MAX = 12  # Largo máximo de los prefijos indexados por token
+LIMITE_RESULTADOS = 20  # Coincidencias que se muestran en un selector
+
+_NO_ALFANUMERICO = re.compile(r"[^0-9a-z]+")
+
+# Puntaje de cada término de la consulta según cómo coincide con el token
+PUNTAJE_EXACTO = 3
+PUNTAJE_PREFIJO = 2
+PUNTAJE_SUBCADENA = 1
+
+def normalizar(texto) -> str:
+    """Minúsculas, sin acentos y con separadores reducidos a un espacio"""
+    if texto is None or (not isinstance(texto, str) and pd.isna(texto)):
+        return ""
+    texto = unicodedata.normalize("NFKD", str(texto).lower())
+    texto = "".join(c for c in texto if not unicodedata.combining(c))
+    return _NO_ALFANUMERICO.sub(" ", texto).strip()
+
+def tokens(texto) -> List[str]:
+    """
+    Tokens normalizados de un valor
+
+    Si el valor es un número partido por separadores (teléfonos como
+    "11-4567-8901") se agrega también la versión compacta, para que buscar
+    "1145678901" lo encuentre.
+    """
+    partes = normalizar(texto).split()
+    if len(partes) > 1:
+        compacto = "".join(partes)
+        if compacto.isdigit():
+            partes.append(compacto)
+    return partes
+
+def _trigramas(token: str) -> Set[str]:
+    return {token[i:i + 3] for i in range(len(token) - 2)}
+
+class SearchIndex:
+    """
+    Postings por token exacto, prefijo y trigrama sobre las columnas de búsqueda.
+
+    Las claves de los resultados son las etiquetas del índice del DataFrame
+    de origen. Cada término de la consulta tiene que coincidir (AND) como
+    token exacto, prefijo de token o subcadena de un token; las subcadenas
+    (3 caracteres o más) solo se buscan cuando el término tiene menos
+    prefijos que el límite pedido. El término más selectivo sale de los
+    postings y los demás se verifican sobre esos candidatos. Los resultados
+    se ordenan por puntaje y, a igual puntaje, por el orden del DataFrame.
+    """
+
+    def __init__(self):
+        self._etiquetas: List[Hashable] = []
+        self._tokens: List[Set[str]] = []
+        self._exactos: Dict[str, Set[int]] = defaultdict(set)
+        self._prefijos: Dict[str, Set[int]] = defaultdict(set)
+        self._trigramas: Dict[str, Set[int]] = defaultdict(set)
+
+    @classmethod
+    def from_dataframe(cls, df: pd.DataFrame, columnas: Iterable[str]) -> "SearchIndex":
+        indice = cls()
+        columnas = [c for c in columnas if c in df.columns]
+        if not columnas:
+            return indice
+        for etiqueta, valores in zip(df.index, df[columnas].itertuples(index=False, name=None)):
+            indice._agregar(etiqueta, {t for valor in valores for t in tokens(valor)})
+        return indice
+
+    def _agregar(self, etiqueta: Hashable, tokens_doc: Set[str]):
+        doc = len(self._etiquetas)
+        self._etiquetas.append(etiqueta)
+        self._tokens.append(tokens_doc)
+        for token in tokens_doc:
+            self._exactos[token].add(doc)
+            for largo in range(1, min(len(token), PREFIJO_MAX) + 1):
+                self._prefijos[token[:largo]].add(doc)
+            for trigrama in _trigramas(token):
+                self._trigramas[trigrama].add(doc)
+
+    def _con_prefijo(self, termino: str) -> Set[int]:
+        if len(termino) <= PREFIJO_MAX:
+            return self._prefijos.get(termino, set())
+        # Prefijos más largos que los indexados: se filtra con el prefijo máximo
+        return {
+            doc for doc in self._prefijos.get(termino[:PREFIJO_MAX], ())
+            if any(t.startswith(termino) for t in self._tokens[doc])
+        }
+
+    def _candidatos(self, termino: str, limite: int) -> Dict[int, int]:
+        """{doc: puntaje} de los documentos donde aparece el término"""
+        prefijo = self._con_prefijo(termino)
+        puntajes = dict.fromkeys(prefijo, PUNTAJE_PREFIJO)
+        puntajes.update(dict.fromkeys(self._exactos.get(termino, ()), PUNTAJE_EXACTO))
+
+        if len(prefijo) < limite and len(termino) >= 3:
+            listas = sorted((self._trigramas.get(t, set()) for t in _trigramas(termino)), key=len)
+            posibles = set.intersection(*listas) if listas[0] else set()
+            for doc in posibles - prefijo:
+                if any(termino in t for t in self._tokens[doc]):
+                    puntajes[doc] = PUNTAJE_SUBCADENA
+        return puntajes
+
+    def _puntaje(self, doc: int, termino: str) -> int:
+        """Puntaje de un término contra un documento ya candidato (0 si no coincide)"""
+        tokens_doc = self._tokens[doc]
+        if termino in tokens_doc:
+            return PUNTAJE_EXACTO
+        if any(t.startswith(termino) for t in tokens_doc):
+            return PUNTAJE_PREFIJO
+        if len(termino) >= 3 and any(termino in t for t in tokens_doc):
+            return PUNTAJE_SUBCADENA
+        return 0
+
+    def search(self, consulta: str, limite: int = LIMITE_RESULTADOS,
+               dentro_de: Optional[Iterable[Hashable]] = None) -> List[Hashable]:
+        """
+        Etiquetas de las mejores `limite` coincidencias para la consulta
+
+        Args:
+            consulta: texto libre; cada palabra tiene que coincidir
+            limite: cantidad máxima de resultados
+            dentro_de: si se indica, solo se devuelven esas etiquetas
+                (p. ej. el índice de un DataFrame ya filtrado, tal cual:
+                un pd.Index se consulta sin copiarlo a un set)
+        """
+        terminos = sorted(
+            set(normalizar(consulta).split()),
+            key=lambda t: len(self._prefijos.get(t[:PREFIJO_MAX], ()))
+        )
+        if not terminos:
+            return []
+
+        puntajes = self._candidatos(terminos[0], limite)
+        for termino in terminos[1:]:
+            if not puntajes:
+                return []
+            siguientes = {}
+            for doc, puntaje in puntajes.items():
+                extra = self._puntaje(doc, termino)
+                if extra:
+                    siguientes[doc] = puntaje + extra
+            puntajes = siguientes
+
+        if dentro_de is not None:
+            admitidas = dentro_de if isinstance(dentro_de, (set, frozenset, pd.Index)) else set(dentro_de)
+            puntajes = {doc: p for doc, p in puntajes.items() if self._etiquetas[doc] in admitidas}
+
+        mejores = heapq.nsmallest(limite, puntajes.items(), key=lambda item: (-item[1], item[0]))
+        return [self._etiquetas[doc] for doc, _ in mejores]
+
+    def __len__(self) -> int:
+        return len(self._etiquetas)
@@ -0,0 +1,129 @@
+"""
+Caché de DataFrames compartido entre todas las sesiones
+Cada hoja tiene un único DataFrame publicado y un número de versión creciente
+"""
+import threading
+import time
+from typing import Any, Callable, Dict, Optional, Set, Tuple
+
+import pandas as pd
+
+class SharedSheetCache:
+    """
+    Último DataFrame publicado de cada hoja, compartido por todo el proceso.
+
+    Los DataFrames publicados son de solo lectura: quien necesite modificarlos
+    debe trabajar sobre una copia. Cada publicación incrementa la versión de la
+    hoja, de modo que las sesiones solo guardan la referencia y la versión y
+    detectan los cambios en el siguiente rerun.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self.sync_lock = threading.Lock()
+        self._entradas: Dict[str, Tuple[int, pd.DataFrame]] = {}
+        self._derivados: Dict[Tuple[str, str], Tuple[int, Any]] = {}
+        self._combinados: Dict[Tuple[Tuple[str, ...], str], Tuple[Tuple[int, ...], Any]] = {}
+        self._sucias: Set[str] = set()
+        self._sincronizadas: Dict[str, float] = {}
+
+    # --------------------------
+    # LECTURA
+    # --------------------------
+    def get(self, hoja: str) -> Optional[pd.DataFrame]:
+        """DataFrame publicado de la hoja (no modificar), o None si aún no se cargó"""
+        with self._lock:
+            entrada = self._entradas.get(hoja)
+            return entrada[1] if entrada else None
+
+    def version(self, hoja: str) -> int:
+        """Versión publicada de la hoja (0 si nunca se cargó)"""
+        with self._lock:
+            entrada = self._entradas.get(hoja)
+            return entrada[0] if entrada else 0
+
+    def versions(self) -> Dict[str, int]:
+        """Versión publicada de cada hoja"""
+        with self._lock:
+            return {hoja: version for hoja, (version, _) in self._entradas.items()}
+
+    def derived(self, hoja: str, nombre: str, builder: Callable[[pd.DataFrame], Any]) -> Any:
+        """
+        Objeto calculado a partir del DataFrame publicado de la hoja (índices, merges...)
+        
+        Se construye una vez por versión y se comparte entre sesiones; al publicar
+        una versión nueva de la hoja se vuelve a construir en el primer acceso.
+        """
+        clave = (hoja, nombre)
+        with self._lock:
+            version, df = self._entradas.get(hoja, (0, None))
+            memo = self._derivados.get(clave)
+            if memo is not None and memo[0] == version:
+                return memo[1]
+
+        valor = builder(df if df is not None else pd.DataFrame())
+        with self._lock:
+            if self.version(hoja) == version:
+                self._derivados[clave] = (version, valor)
+        return valor
+
+    def derived_join(self, hojas: Tuple[str, ...], nombre: str, builder: Callable[..., Any]) -> Any:
+        """
+        Como derived, pero calculado a partir de varias hojas (p. ej. un merge)
+        
+        builder recibe un DataFrame por hoja, en el orden de hojas. El resultado
+        se guarda junto con la versión de cada hoja y se reconstruye cuando
+        cualquiera de ellas publica una versión nueva.
+        """
+        hojas = tuple(hojas)
+        clave = (hojas, nombre)
+        with self._lock:
+            entradas = [self._entradas.get(hoja, (0, None)) for hoja in hojas]
+            versiones = tuple(version for version, _ in entradas)
+            memo = self._combinados.get(clave)
+            if memo is not None and memo[0] == versiones:
+                return memo[1]
+
+        valor = builder(*[df if df is not None else pd.DataFrame() for _, df in entradas])
+        with self._lock:
+            if tuple(self.version(hoja) for hoja in hojas) == versiones:
+                self._combinados[clave] = (versiones, valor)
+        return valor
+
+    def synced_at(self, hoja: str) -> float:
+        """Momento (epoch) de la última sincronización de la hoja con Google Sheets; 0 si nunca"""
+        with self._lock:
+            return self._sincronizadas.get(hoja, 0.0)
+
+    def dirty(self) -> Set[str]:
+        """Hojas marcadas como modificadas desde su última sincronización"""
+        with self._lock:
+            return set(self._sucias)
+
+    # --------------------------
+    # ESCRITURA
+    # --------------------------
+    def publish(self, hoja: str, df: pd.DataFrame) -> int:
+        """Publica un nuevo DataFrame para la hoja y devuelve su versión"""
+        with self._lock:
+            version = self.version(hoja) + 1
+            self._entradas[hoja] = (version, df)
+            # Los derivados de la versión anterior ya no sirven
+            for clave in [clave for clave in self._derivados if clave[0] == hoja]:
+                del self._derivados[clave]
+            for clave in [clave for clave in self._combinados if hoja in clave[0]]:
+                del self._combinados[clave]
+            return version
+
+    def mark_dirty(self, hoja: str):
+        """Marca la hoja como modificada: la próxima carga la vuelve a sincronizar"""
+        with self._lock:
+            self._sucias.add(hoja)
+
+    def mark_synced(self, hojas):
+        """Registra que esas hojas se acaban de sincronizar"""
+        ahora = time.time()
+        with self._lock:
+            for hoja in hojas:
+                self._sucias.discard(hoja)
+                self._sincronizadas[hoja] = ahora
@@ -0,0 +1,376 @@
+"""
+Almacén local de snapshots de las hojas de Google Sheets
+Guarda en SQLite la última copia conocida de cada hoja para sincronizar solo los cambios
+"""
+import bisect
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional
+
+def _normalizar_fila(fila: List) -> List[str]:
+    """Quita las celdas vacías del final para que el checksum no dependa del relleno"""
+    fila = ["" if valor is None else str(valor) for valor in fila]
+    while fila and fila[-1] == "":
+        fila.pop()
+    return fila
+
+def checksum_fila(fila: List) -> str:
+    """Checksum corto y estable de una fila de valores"""
+    contenido = json.dumps(_normalizar_fila(fila), ensure_ascii=False)
+    return hashlib.blake2b(contenido.encode("utf-8"), digest_size=8).hexdigest()
+
+class SnapshotStore:
+    """
+    Copia local (SQLite + memoria) de cada hoja.
+
+    Cada hoja se guarda como encabezado + filas de datos en el mismo orden que en la hoja,
+    de modo que la fila de datos i corresponde a la fila i + 2 de Google Sheets.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        directorio = os.path.dirname(path)
+        if directorio:
+            os.makedirs(directorio, exist_ok=True)
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._memoria: Dict[str, Dict] = {}
+        self._crear_tablas()
+
+    def _crear_tablas(self):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS hojas ("
+                " nombre TEXT PRIMARY KEY,"
+                " encabezados TEXT NOT NULL,"
+                " filas INTEGER NOT NULL,"
+                " ultima_verificacion REAL NOT NULL)"
+            )
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS filas ("
+                " hoja TEXT NOT NULL,"
+                " numero INTEGER NOT NULL,"
+                " valores TEXT NOT NULL,"
+                " checksum TEXT NOT NULL,"
+                " PRIMARY KEY (hoja, numero))"
+            )
+
+    # --------------------------
+    # LECTURA
+    # --------------------------
+    def _cargar(self, hoja: str) -> Optional[Dict]:
+        """Devuelve el snapshot en memoria, leyéndolo de SQLite la primera vez"""
+        if hoja in self._memoria:
+            return self._memoria[hoja]
+
+        meta = self._conn.execute(
+            "SELECT encabezados, ultima_verificacion FROM hojas WHERE nombre = ?", (hoja,)
+        ).fetchone()
+        if meta is None:
+            return None
+
+        filas, checksums = [], []
+        for valores, checksum in self._conn.execute(
+            "SELECT valores, checksum FROM filas WHERE hoja = ? ORDER BY numero", (hoja,)
+        ):
+            filas.append(json.loads(valores))
+            checksums.append(checksum)
+
+        snapshot = {
+            "encabezados": json.loads(meta[0]),
+            "filas": filas,
+            "checksums": checksums,
+            "ultima_verificacion": meta[1],
+            "pendientes": set(),
+            "aplicado": 0.0
+        }
+        self._memoria[hoja] = snapshot
+        return snapshot
+
+    def info(self, hoja: str) -> Optional[Dict]:
+        """
+        Cantidad de filas de datos y momento de la última verificación completa
+
+        Incluye las filas escritas localmente que todavía no se compararon con
+        la hoja ("pendientes", números de fila de la hoja) y el momento de la
+        última escritura aplicada ("aplicado").
+        """
+        with self._lock:
+            snapshot = self._cargar(hoja)
+            if snapshot is None:
+                return None
+            return {
+                "filas": len(snapshot["filas"]),
+                "columnas": len(snapshot["encabezados"]),
+                "ultima_verificacion": snapshot["ultima_verificacion"],
+                "checksum_ultima_fila": snapshot["checksums"][-1] if snapshot["checksums"] else None,
+                "pendientes": sorted(snapshot["pendientes"]),
+                "aplicado": snapshot["aplicado"]
+            }
+
+    def headers(self, hoja: str) -> List[str]:
+        """Fila de encabezados tal como está en la hoja"""
+        with self._lock:
+            snapshot = self._cargar(hoja)
+            return list(snapshot["encabezados"]) if snapshot else []
+
+    def get_values(self, hoja: str) -> List[List[str]]:
+        """Encabezado + filas, en el mismo formato que get_all_values (sin relleno)"""
+        with self._lock:
+            snapshot = self._cargar(hoja)
+            if snapshot is None:
+                return []
+            return [snapshot["encabezados"]] + snapshot["filas"]
+
+    # --------------------------
+    # ESCRITURA
+    # --------------------------
+    def _guardar_meta(self, hoja: str, snapshot: Dict):
+        self._conn.execute(
+            "INSERT OR REPLACE INTO hojas (nombre, encabezados, filas, ultima_verificacion) VALUES (?, ?, ?, ?)",
+            (hoja, json.dumps(snapshot["encabezados"], ensure_ascii=False),
+             len(snapshot["filas"]), snapshot["ultima_verificacion"])
+        )
+
+    def replace(self, hoja: str, data: List[List[str]]):
+        """Reemplaza el snapshot completo de una hoja (data incluye el encabezado)"""
+        encabezados = list(data[0]) if data else []
+        filas = [list(fila) for fila in data[1:]]
+        snapshot = {
+            "encabezados": encabezados,
+            "filas": filas,
+            "checksums": [checksum_fila(fila) for fila in filas],
+            "ultima_verificacion": time.time(),
+            "pendientes": set(),
+            "aplicado": 0.0
+        }
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM filas WHERE hoja = ?", (hoja,))
+            self._conn.executemany(
+                "INSERT INTO filas (hoja, numero, valores, checksum) VALUES (?, ?, ?, ?)",
+                [(hoja, i, json.dumps(fila, ensure_ascii=False), checksum)
+                 for i, (fila, checksum) in enumerate(zip(filas, snapshot["checksums"]))]
+            )
+            self._guardar_meta(hoja, snapshot)
+            self._memoria[hoja] = snapshot
+
+    def append(self, hoja: str, filas: List[List[str]]):
+        """Agrega filas nuevas al final del snapshot"""
+        if not filas:
+            return
+        with self._lock, self._conn:
+            snapshot = self._cargar(hoja)
+            if snapshot is None:
+                return
+            inicio = len(snapshot["filas"])
+            nuevas = [list(fila) for fila in filas]
+            checksums = [checksum_fila(fila) for fila in nuevas]
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO filas (hoja, numero, valores, checksum) VALUES (?, ?, ?, ?)",
+                [(hoja, inicio + i, json.dumps(fila, ensure_ascii=False), checksum)
+                 for i, (fila, checksum) in enumerate(zip(nuevas, checksums))]
+            )
+            snapshot["filas"].extend(nuevas)
+            snapshot["checksums"].extend(checksums)
+            self._guardar_meta(hoja, snapshot)
+
+    def append_local(self, hoja: str, filas: List[List[str]]) -> bool:
+        """
+        Como append, para filas que escribió la aplicación: quedan pendientes de verificar
+
+        Returns:
+            bool: False si la hoja no tiene snapshot (no se aplicó nada)
+        """
+        with self._lock:
+            snapshot = self._cargar(hoja)
+            if snapshot is None:
+                return False
+            inicio = len(snapshot["filas"]) + 2
+            self.append(hoja, filas)
+            snapshot["pendientes"].update(range(inicio, inicio + len(filas)))
+            snapshot["aplicado"] = time.time()
+            return True
+
+    def reconcile(self, hoja: str, data: List[List[str]]) -> int:
+        """
+        Compara una lectura completa con el snapshot por checksum de fila
+        y reescribe solo las filas que cambiaron.
+
+        Returns:
+            int: cantidad de filas modificadas, agregadas o eliminadas
+        """
+        with self._lock, self._conn:
+            snapshot = self._cargar(hoja)
+            if snapshot is None:
+                self.replace(hoja, data)
+                return max(len(data) - 1, 0)
+
+            encabezados = list(data[0]) if data else []
+            nuevas = [list(fila) for fila in data[1:]]
+            cambios = []
+            for i, fila in enumerate(nuevas):
+                checksum = checksum_fila(fila)
+                if i >= len(snapshot["checksums"]) or snapshot["checksums"][i] != checksum:
+                    cambios.append((hoja, i, json.dumps(fila, ensure_ascii=False), checksum))
+                    if i < len(snapshot["filas"]):
+                        snapshot["filas"][i] = fila
+                        snapshot["checksums"][i] = checksum
+                    else:
+                        snapshot["filas"].append(fila)
+                        snapshot["checksums"].append(checksum)
+
+            sobrantes = len(snapshot["filas"]) - len(nuevas)
+            if sobrantes > 0:
+                self._conn.execute(
+                    "DELETE FROM filas WHERE hoja = ? AND numero >= ?", (hoja, len(nuevas))
+                )
+                del snapshot["filas"][len(nuevas):]
+                del snapshot["checksums"][len(nuevas):]
+
+            if cambios:
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO filas (hoja, numero, valores, checksum) VALUES (?, ?, ?, ?)",
+                    cambios
+                )
+            snapshot["encabezados"] = encabezados
+            snapshot["ultima_verificacion"] = time.time()
+            snapshot["pendientes"] = set()
+            self._guardar_meta(hoja, snapshot)
+            return len(cambios) + max(sobrantes, 0)
+
+    def verify_rows(self, hoja: str, filas: Dict[int, List[str]]) -> int:
+        """
+        Compara con el snapshot solo algunas filas leídas de la hoja y corrige las distintas
+
+        Las filas comparadas dejan de estar pendientes; no cuenta como
+        verificación completa.
+
+        Args:
+            filas: {número de fila de la hoja (1 = encabezado): valores}
+
+        Returns:
+            int: cantidad de filas que no coincidían
+        """
+        with self._lock, self._conn:
+            snapshot = self._cargar(hoja)
+            if snapshot is None:
+                return 0
+
+            cambios = []
+            for fila, valores in filas.items():
+                i = fila - 2
+                snapshot["pendientes"].discard(fila)
+                if i < 0 or i >= len(snapshot["filas"]):
+                    continue
+                valores = list(valores)
+                checksum = checksum_fila(valores)
+                if snapshot["checksums"][i] != checksum:
+                    snapshot["filas"][i] = valores
+                    snapshot["checksums"][i] = checksum
+                    cambios.append((hoja, i, json.dumps(valores, ensure_ascii=False), checksum))
+
+            if cambios:
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO filas (hoja, numero, valores, checksum) VALUES (?, ?, ?, ?)",
+                    cambios
+                )
+            return len(cambios)
+
+    def patch(self, hoja: str, celdas: Dict) -> bool:
+        """
+        Aplica al snapshot celdas ya escritas en la hoja, sin esperar a releerla
+        
+        No cuenta como verificación: las filas quedan pendientes y la próxima
+        sincronización las vuelve a leer (solo esas) para compararlas.
+        
+        Args:
+            celdas: {(fila, columna): valor} con coordenadas de la hoja (1 = encabezado)
+        
+        Returns:
+            bool: False si la hoja no tiene snapshot (no se aplicó nada)
+        """
+        with self._lock, self._conn:
+            snapshot = self._cargar(hoja)
+            if snapshot is None:
+                return False
+
+            tocadas = set()
+            for (fila, col), valor in celdas.items():
+                if fila < 2:
+                    continue
+                i = fila - 2
+                while i >= len(snapshot["filas"]):
+                    snapshot["filas"].append([])
+                    snapshot["checksums"].append(checksum_fila([]))
+                valores = snapshot["filas"][i]
+                if len(valores) < col:
+                    valores.extend([""] * (col - len(valores)))
+                valores[col - 1] = "" if valor is None else str(valor)
+                tocadas.add(i)
+
+            for i in tocadas:
+                snapshot["checksums"][i] = checksum_fila(snapshot["filas"][i])
+            snapshot["pendientes"].update(i + 2 for i in tocadas)
+            snapshot["aplicado"] = time.time()
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO filas (hoja, numero, valores, checksum) VALUES (?, ?, ?, ?)",
+                [(hoja, i, json.dumps(snapshot["filas"][i], ensure_ascii=False), snapshot["checksums"][i])
+                 for i in sorted(tocadas)]
+            )
+            self._guardar_meta(hoja, snapshot)
+            return True
+
+    def delete_rows(self, hoja: str, filas) -> bool:
+        """
+        Quita del snapshot filas ya borradas en la hoja; las de abajo suben
+        
+        Como patch, no cuenta como verificación.
+        
+        Args:
+            filas: números de fila de la hoja (1 = encabezado)
+        
+        Returns:
+            bool: False si la hoja no tiene snapshot (no se aplicó nada)
+        """
+        with self._lock, self._conn:
+            snapshot = self._cargar(hoja)
+            if snapshot is None:
+                return False
+
+            borrar = {fila - 2 for fila in filas if fila >= 2}
+            if not borrar:
+                return True
+            inicio = min(borrar)
+            conservar = [i for i in range(inicio, len(snapshot["filas"])) if i not in borrar]
+            snapshot["filas"][inicio:] = [snapshot["filas"][i] for i in conservar]
+            snapshot["checksums"][inicio:] = [snapshot["checksums"][i] for i in conservar]
+            # Las filas pendientes de abajo suben tantas filas como se borraron encima
+            borradas = sorted(fila + 2 for fila in borrar)
+            snapshot["pendientes"] = {
+                fila - bisect.bisect_left(borradas, fila)
+                for fila in snapshot["pendientes"] if fila - 2 not in borrar
+            }
+            snapshot["aplicado"] = time.time()
+
+            # Se reescriben solo las filas desde la primera borrada
+            self._conn.execute("DELETE FROM filas WHERE hoja = ? AND numero >= ?", (hoja, inicio))
+            self._conn.executemany(
+                "INSERT INTO filas (hoja, numero, valores, checksum) VALUES (?, ?, ?, ?)",
+                [(hoja, i, json.dumps(snapshot["filas"][i], ensure_ascii=False), snapshot["checksums"][i])
+                 for i in range(inicio, len(snapshot["filas"]))]
+            )
+            self._guardar_meta(hoja, snapshot)
+            return True
+
+    def mark_stale(self, hoja: str):
+        """Fuerza una verificación completa en la próxima sincronización"""
+        with self._lock, self._conn:
+            snapshot = self._cargar(hoja)
+            if snapshot is None:
+                return
+            snapshot["ultima_verificacion"] = 0.0
+            self._guardar_meta(hoja, snapshot)
@@ -0,0 +1,187 @@
+"""
+Unidad de trabajo: escrituras de varias hojas confirmadas en un solo pedido
+Junta appends y upserts y los envía en un único spreadsheets.batchUpdate
+"""
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple
+
+from gspread.utils import a1_range_to_grid_range, rowcol_to_a1
+from utils.api_manager import api_manager, coalesce_cells, write_queue
+from utils.data_manager import (
+    COLUMNAS_ID,
+    apply_local_append,
+    apply_local_delete,
+    apply_local_updates,
+    build_delete_requests,
+    build_row,
+    get_column_map,
+    get_row_locator,
+    locate_rows
+)
+
+class _Parte(NamedTuple):
+    nombre: str
+    sheet: Any
+    preparar: Callable[[], Tuple[List[Dict], Callable[[], None]]]
+
+def _celda(valor) -> Dict:
+    """Valor de Python -> CellData de la API, equivalente a valueInputOption RAW"""
+    if isinstance(valor, bool):
+        return {"userEnteredValue": {"boolValue": valor}}
+    if isinstance(valor, (int, float)):
+        return {"userEnteredValue": {"numberValue": valor}}
+    return {"userEnteredValue": {"stringValue": "" if valor is None else str(valor)}}
+
+def _fila(valores: List) -> Dict:
+    return {"values": [_celda(valor) for valor in valores]}
+
+class UnitOfWork:
+    """
+    Escrituras de varias hojas del mismo spreadsheet confirmadas juntas.
+
+    Cada parte (append, upsert o borrado de filas) se registra con un nombre y se prepara al
+    llamar a commit(); las que se pueden preparar viajan en un único
+    spreadsheets.batchUpdate, que la API aplica de forma atómica: o se
+    escriben todas o ninguna. Un upsert sobre un registro existente ubica su
+    fila con locate_rows (una lectura de verificación) solo si hay cambios.
+
+    Ejemplo:
+        uow = UnitOfWork()
+        uow.append("reclamo", sheet_reclamos, [fila])
+        uow.upsert("cliente", sheet_clientes, nro, cambios, columna="Nº Cliente")
+        resultados = uow.commit()   # {"reclamo": (True, None), "cliente": (True, None)}
+    """
+
+    def __init__(self):
+        self._partes: List[_Parte] = []
+
+    def append(self, nombre: str, sheet, filas: List[List]) -> "UnitOfWork":
+        """Agrega filas al final de la hoja (appendCells)"""
+        filas = [list(fila) for fila in filas]
+        self._partes.append(_Parte(nombre, sheet, lambda: self._preparar_append(sheet, filas)))
+        return self
+
+    def upsert(self, nombre: str, sheet, clave, valores: Dict[str, Any],
+               columna: Optional[str] = None) -> "UnitOfWork":
+        """
+        Actualiza el registro con esa clave o, si no está en el snapshot, lo agrega
+
+        Args:
+            nombre: nombre de la parte en el resultado de commit()
+            sheet: worksheet de gspread
+            clave: valor de la columna clave (por defecto la de COLUMNAS_ID)
+            valores: {columna: valor}; al actualizar, solo los campos que cambian
+            columna: columna clave alternativa, p. ej. "Nº Cliente"
+        """
+        hoja = sheet.title
+        columna = columna or COLUMNAS_ID[hoja]
+        valores = dict(valores)
+
+        def preparar():
+            if get_row_locator(hoja, columna).row(clave) is None:
+                fila = build_row(hoja, {columna: clave, **valores})
+                return self._preparar_append(sheet, [fila])
+            if not valores:
+                return [], lambda: None
+
+            mapa = get_column_map(hoja)
+            faltantes = sorted(set(valores) - set(mapa))
+            if faltantes:
+                raise ValueError(f"La hoja {hoja} no tiene las columnas: {', '.join(faltantes)}")
+            filas, error = locate_rows(sheet, [clave], columna)
+            if error:
+                raise RuntimeError(error)
+            fila = filas.get(str(clave).strip())
+            if fila is None:
+                raise LookupError(f"No se encontró {clave} en la hoja {hoja}")
+
+            celdas = {(fila, mapa[nombre_col]): valor for nombre_col, valor in valores.items()}
+            pedidos = [
+                {
+                    "updateCells": {
+                        "range": a1_range_to_grid_range(rango["range"], sheet.id),
+                        "rows": [_fila(valores_fila) for valores_fila in rango["values"]],
+                        "fields": "userEnteredValue"
+                    }
+                }
+                for rango in coalesce_cells(celdas)
+            ]
+            updates = [
+                {"range": rowcol_to_a1(fila, col), "values": [[valor]]}
+                for (fila, col), valor in celdas.items()
+            ]
+            return pedidos, lambda: apply_local_updates(hoja, updates)
+
+        self._partes.append(_Parte(nombre, sheet, preparar))
+        return self
+
+    def delete_rows(self, nombre: str, sheet, filas) -> "UnitOfWork":
+        """
+        Borra filas de la hoja (números de fila, 1 = encabezado), unidas en rangos
+
+        Un append a la misma hoja en el mismo pedido cae debajo de la última
+        fila, así que no corre las que se borran.
+        """
+        filas = sorted({int(fila) for fila in filas})
+
+        def preparar():
+            # La cola de escrituras usa números de fila: se envía antes de borrar
+            write_queue.flush()
+            return build_delete_requests(sheet, filas), lambda: apply_local_delete(sheet.title, filas)
+
+        self._partes.append(_Parte(nombre, sheet, preparar))
+        return self
+
+    @staticmethod
+    def _preparar_append(sheet, filas: List[List]):
+        pedido = {
+            "appendCells": {
+                "sheetId": sheet.id,
+                "rows": [_fila(fila) for fila in filas],
+                "fields": "userEnteredValue"
+            }
+        }
+        return [pedido], lambda: apply_local_append(sheet.title, filas)
+
+    def commit(self) -> Dict[str, Tuple[bool, Optional[str]]]:
+        """
+        Envía todas las partes en un único batchUpdate
+
+        Returns:
+            dict: {nombre: (success, error)} por parte. Las que fallan al
+            prepararse no se envían; las demás comparten el resultado del pedido.
+        """
+        resultados: Dict[str, Tuple[bool, Optional[str]]] = {}
+        pedidos: List[Dict] = []
+        enviadas = []
+        spreadsheet = None
+
+        for parte in self._partes:
+            try:
+                if spreadsheet is not None and parte.sheet.spreadsheet.id != spreadsheet.id:
+                    raise ValueError("Todas las partes tienen que ser del mismo spreadsheet")
+                pedidos_parte, aplicar = parte.preparar()
+            except Exception as e:
+                resultados[parte.nombre] = (False, str(e))
+                continue
+            spreadsheet = spreadsheet or parte.sheet.spreadsheet
+            pedidos.extend(pedidos_parte)
+            enviadas.append((parte, aplicar))
+
+        if pedidos:
+            for parte, _ in enviadas:
+                api_manager.register_write(parte.sheet)
+            _, error = api_manager.safe_sheet_operation(
+                spreadsheet.batch_update, {"requests": pedidos}, is_batch=True, idempotent=False
+            )
+            if error:
+                for parte, _ in enviadas:
+                    resultados[parte.nombre] = (False, error)
+                self._partes = []
+                return resultados
+
+        # Confirmado: se reflejan las escrituras en el snapshot y los DataFrames compartidos
+        for parte, aplicar in enviadas:
+            aplicar()
+            resultados[parte.nombre] = (True, None)
+        self._partes = []
+        return resultados